@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict, deque
+
+from config import (
+    AI_CHARS_PER_TOKEN, AI_CONTEXT_TOKENS, AI_HISTORY_IDLE_TTL, AI_HISTORY_MAX_USERS,
+    AI_HISTORY_TURNS, AI_SUMMARY_CHARS,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Груба оцінка токенів без токенізатора — для кирилиці приблизно 3 символи на токен"""
+    return (len(text or "") + AI_CHARS_PER_TOKEN - 1) // AI_CHARS_PER_TOKEN
+
+
+class _Conversation:
+    __slots__ = ("turns", "summary", "last_seen")
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.last_seen = time.monotonic()
+
+
+class ConversationMemory:
+    """Коротка пам'ять діалогу з AI: кільцевий буфер реплік на користувача з бюджетом токенів"""
+
+    def __init__(self, max_turns=AI_HISTORY_TURNS, budget=AI_CONTEXT_TOKENS,
+                 idle_ttl=AI_HISTORY_IDLE_TTL, max_users=AI_HISTORY_MAX_USERS):
+        self.max_turns = max_turns
+        self.budget = budget
+        self.idle_ttl = idle_ttl
+        self.max_users = max_users
+        self._users = OrderedDict()
+
+    def __len__(self):
+        return len(self._users)
+
+    def _evict(self, now):
+        # Найдавніше активні завжди на початку OrderedDict
+        while self._users:
+            user_id, conv = next(iter(self._users.items()))
+            if len(self._users) <= self.max_users and now - conv.last_seen < self.idle_ttl:
+                break
+            del self._users[user_id]
+
+    def _get(self, user_id, create=False):
+        now = time.monotonic()
+        self._evict(now)
+        conv = self._users.get(user_id)
+        if conv is None:
+            if not create:
+                return None
+            conv = self._users[user_id] = _Conversation(self.max_turns)
+        else:
+            self._users.move_to_end(user_id)
+        conv.last_seen = now
+        return conv
+
+    def add(self, user_id: int, question: str, answer: str):
+        conv = self._get(user_id, create=True)
+        if len(conv.turns) == conv.turns.maxlen:
+            self._summarize(conv, conv.turns[0])
+        conv.turns.append((question, answer))
+
+    def clear(self, user_id: int):
+        self._users.pop(user_id, None)
+
+    def _summarize(self, conv, turn):
+        # Замість окремого виклику моделі лишаємо стислий перелік попередніх тем
+        topic = turn[0].strip().replace("\n", " ")[:80]
+        summary = f"{conv.summary}; {topic}" if conv.summary else topic
+        conv.summary = summary[-AI_SUMMARY_CHARS:]
+
+    def context(self, user_id: int, prompt: str):
+        """Повертає (історія, промпт), що вміщаються в бюджет токенів; зайві старі репліки стискаються"""
+        conv = self._get(user_id)
+        if conv is None:
+            return [], prompt
+
+        def total():
+            used = estimate_tokens(prompt) + estimate_tokens(conv.summary)
+            return used + sum(estimate_tokens(q) + estimate_tokens(a) for q, a in conv.turns)
+
+        while conv.turns and total() > self.budget:
+            self._summarize(conv, conv.turns.popleft())
+
+        if conv.summary:
+            prompt = f"Раніше в розмові: {conv.summary}\n\n{prompt}"
+        return list(conv.turns), prompt
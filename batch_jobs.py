@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+from config import (
+    BATCH_CONCURRENCY, BATCH_DIR, BATCH_KEEP, BATCH_MAX_ITEMS, BATCH_PROGRESS_EVERY, DETAIL_MAX_TOKENS,
+)
+from resilience import GeminiUnavailable
+
+
+def parse_items(text: str, modes, default_mode="assistant"):
+    """Один запит на рядок; `режим: запит` обирає режим, інакше — режим за замовчуванням"""
+    items = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        mode, sep, prompt = line.partition(":")
+        if sep and mode.strip() in modes and prompt.strip():
+            items.append((mode.strip(), prompt.strip()))
+        else:
+            items.append((default_mode, line))
+    return items[:BATCH_MAX_ITEMS]
+
+
+class BatchJob:
+    def __init__(self, job_id, items, chat_id, message_id=None, status="pending", created=None):
+        self.id = job_id
+        self.items = [tuple(item) for item in items]
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.status = status
+        self.created = created or datetime.now().isoformat(timespec="seconds")
+        self.results = {}
+        self.errors = {}
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def done(self):
+        return len(self.results)
+
+    def pending(self):
+        return [i for i in range(self.total) if i not in self.results]
+
+    def progress_text(self):
+        failed = f", помилок: {len(self.errors)}" if self.errors else ""
+        return f"🗂 Завдання {self.id}: {self.done}/{self.total} ({self.status}){failed}"
+
+    def meta(self):
+        return {
+            "id": self.id, "items": self.items, "chat_id": self.chat_id,
+            "message_id": self.message_id, "status": self.status, "created": self.created,
+        }
+
+
+class BatchStore:
+    """Мета завдання — json (атомарний запис), результати — append-only jsonl для відновлення після рестарту"""
+
+    def __init__(self, directory=BATCH_DIR):
+        self.directory = directory
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def save_meta(self, job: BatchJob):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(job.id, ".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job.meta(), f, ensure_ascii=False)
+        os.replace(tmp, self._path(job.id, ".json"))
+
+    def append_result(self, job: BatchJob, index: int, answer=None, error=None):
+        with open(self._path(job.id, ".results.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"i": index, "answer": answer, "error": error}, ensure_ascii=False) + "\n")
+
+    def load_all(self):
+        jobs = []
+        if not os.path.isdir(self.directory):
+            return jobs
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                job = BatchJob(meta.pop("id"), **meta)
+            except Exception:
+                continue
+            try:
+                with open(self._path(job.id, ".results.jsonl"), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            row = json.loads(line)
+                        except ValueError:
+                            # Обірваний останній рядок після падіння процесу
+                            continue
+                        if row.get("answer") is not None:
+                            job.results[row["i"]] = row["answer"]
+                            job.errors.pop(row["i"], None)
+                        elif row["i"] not in job.results:
+                            job.errors[row["i"]] = row.get("error")
+            except FileNotFoundError:
+                pass
+            jobs.append(job)
+        return jobs
+
+
+class BatchRunner:
+    def __init__(self, client, store=None, concurrency=BATCH_CONCURRENCY, keep=BATCH_KEEP):
+        self.client = client
+        self.store = store or BatchStore()
+        self.concurrency = concurrency
+        self.keep = keep
+        self.jobs = {job.id: job for job in self.store.load_all()}
+        self.tasks = {}
+        self.evict()
+
+    def submit(self, items, chat_id: int):
+        job = BatchJob(uuid.uuid4().hex[:8], items, chat_id)
+        self.jobs[job.id] = job
+        self.store.save_meta(job)
+        self.evict()
+        return job
+
+    def evict(self):
+        """Завершені завдання понад `keep` найновіших — геть з пам'яті (файли лишаються на диску)"""
+        finished = sorted((job for job in self.jobs.values()
+                           if job.status not in ("pending", "running") and job.id not in self.tasks),
+                          key=lambda j: j.created, reverse=True)
+        for job in finished[self.keep:]:
+            del self.jobs[job.id]
+
+    def recent(self, limit=5):
+        return sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)[:limit]
+
+    def start(self, job, progress=None, finished=None):
+        task = asyncio.create_task(self.run(job, progress, finished))
+        self.tasks[job.id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job.id, None))
+        return task
+
+    def resume(self, progress=None, finished=None):
+        """Продовжує перервані рестартом завдання з місця зупинки.
+
+        "partial" (дійшли до кінця з помилками) не чіпаємо — повтор лише через retry() з адмінки,
+        інакше помилкові пункти питали б знову на кожному старті
+        """
+        return [self.start(job, progress, finished) for job in self.jobs.values()
+                if job.status in ("pending", "running") and job.id not in self.tasks]
+
+    def retry(self, job, progress=None, finished=None):
+        """Повтор лише помилкових пунктів завершеного з помилками завдання; None — нема що повторювати"""
+        if job.status != "partial" or job.id in self.tasks:
+            return None
+        return self.start(job, progress, finished)
+
+    async def run(self, job, progress=None, finished=None):
+        job.status = "running"
+        job.errors.clear()
+        self.store.save_meta(job)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        last_report = 0.0
+
+        async def one(index):
+            nonlocal last_report
+            mode, prompt = job.items[index]
+            async with semaphore:
+                try:
+                    # Без збереженої відповіді: вона записалась би як успіх, і пункт ніколи б не повторився
+                    answer = await asyncio.to_thread(self.client.ask, prompt, mode, DETAIL_MAX_TOKENS, 0.35, None,
+                                                     prompt, fallback=False)
+                    job.results[index] = answer
+                    self.store.append_result(job, index, answer=answer)
+                except Exception as e:
+                    # Будь-який збій пункту — запис помилки, а не завдання, що назавжди лишилось "running"
+                    error = str(e) if isinstance(e, GeminiUnavailable) else f"❌ Помилка: {str(e)[:100]}"
+                    job.errors[index] = error
+                    self.store.append_result(job, index, error=error)
+            if progress and time.monotonic() - last_report >= BATCH_PROGRESS_EVERY:
+                last_report = time.monotonic()
+                await progress(job)
+
+        await asyncio.gather(*(one(i) for i in job.pending()))
+
+        # Помилкові пункти лишаються незробленими — їх підхопить наступний запуск
+        job.status = "done" if not job.pending() else "partial"
+        self.store.save_meta(job)
+        if progress:
+            await progress(job)
+        if finished:
+            await finished(job)
+
+    def mark_delivered(self, job):
+        job.status = "delivered"
+        self.store.save_meta(job)
+
+    def export(self, job):
+        lines = []
+        for index, (mode, prompt) in enumerate(job.items):
+            answer = job.results.get(index) or f"❌ {job.errors.get(index, 'немає відповіді')}"
+            lines.append(json.dumps({"mode": mode, "prompt": prompt, "answer": answer}, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8")
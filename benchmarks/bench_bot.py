@@ -0,0 +1,249 @@
+"""Бенчмарк гарячих шляхів бота через фейковий транспорт.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_bot --output bench.json
+    python -m benchmarks.bench_bot --compare old.json --output new.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import utils
+from bot import TelegramBot
+from config import AI_ICON, BELL_ICON, CLASS_ICON, DAY_ICON, STATS
+from benchmarks.fake_telegram import BENCH_TOKEN, FakeSession, StubGeminiClient, UpdateFactory, temp_journal
+
+# Текст з цим префіксом відправляється як inline-запит, а не повідомлення
+INLINE_PREFIX = "@inline "
+
+# Сценарій: (підготовчі повідомлення, повідомлення, яке міряємо)
+SCENARIOS = {
+    "start": ([], "/start"),
+    "class_select": ([], f"{CLASS_ICON}9-Б"),
+    "day_select": ([f"{CLASS_ICON}9-Б"], f"{DAY_ICON} Понеділок"),
+    "today": ([f"{CLASS_ICON}9-Б"], "📆 Сьогодні"),
+    "tomorrow": ([f"{CLASS_ICON}9-Б"], "📅 Завтра"),
+    "full_week": ([f"{CLASS_ICON}9-Б"], "📋 Весь розклад"),
+    "bells": ([f"{BELL_ICON} Дзвінки"], "🇦 І зміна"),
+    "ai_chat": ([f"{AI_ICON} AI Помічник"], "Поясни закон Ома"),
+    "inline": ([], f"{INLINE_PREFIX}9-Б пн"),
+}
+
+REGRESSION_THRESHOLD = 0.10
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def make_bot():
+    session = FakeSession()
+    # Без черги відправки: її темп (1 повідомлення/с на чат) міряв би ліміти Telegram, а не бота
+    tg_bot = TelegramBot(StubGeminiClient(), BENCH_TOKEN, session=session, sender=False, journal_file=temp_journal())
+    return tg_bot, UpdateFactory(tg_bot.bot), session
+
+
+async def feed(tg_bot, factory, user_id, text):
+    if text.startswith(INLINE_PREFIX):
+        update = factory.inline_query(user_id, text[len(INLINE_PREFIX):])
+    else:
+        update = factory.message(user_id, text)
+    await tg_bot.dp.feed_update(tg_bot.bot, update)
+
+
+async def bench_scenario(name, iterations, users):
+    tg_bot, factory, session = make_bot()
+    setup, text = SCENARIOS[name]
+    user_ids = range(1_000_000, 1_000_000 + users)
+
+    for uid in user_ids:
+        for step in setup:
+            await feed(tg_bot, factory, uid, step)
+    session.calls.clear()
+
+    # Прогрів
+    for uid in user_ids:
+        await feed(tg_bot, factory, uid, text)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        uid = user_ids[i % users]
+        t0 = time.perf_counter()
+        await feed(tg_bot, factory, uid, text)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    # Алокації на апдейт: пікове та залишкове споживання
+    alloc_runs = min(iterations, 200)
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    before = tracemalloc.take_snapshot()
+    for i in range(alloc_runs):
+        uid = user_ids[i % users]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await feed(tg_bot, factory, uid, text)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    return {
+        "iterations": iterations,
+        "updates_per_sec": iterations / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "peak_bytes_per_update": sum(peaks) / len(peaks),
+        "retained_bytes_per_update": retained / alloc_runs,
+        "retained_blocks_per_update": blocks / alloc_runs,
+        "api_calls_per_update": sum(session.calls.values()) / (iterations + users + alloc_runs),
+    }
+
+
+async def bench_memory(users):
+    tg_bot, factory, _ = make_bot()
+    gc.collect()
+    rss_before = rss_bytes()
+    for uid in range(2_000_000, 2_000_000 + users):
+        await feed(tg_bot, factory, uid, "/start")
+    gc.collect()
+    rss_after = rss_bytes()
+    return {
+        "users": users,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "rss_growth": rss_after - rss_before,
+        "bytes_per_user": (rss_after - rss_before) / users if users else 0.0,
+        "tracked_users": len(tg_bot.user_state),
+    }
+
+
+def reset_stats():
+    STATS.__init__()
+
+
+async def run(args):
+    # Анімація завантаження — це свідома пауза для користувача, а не ціна обробки
+    utils.LOADING_FRAME_DELAY = 0
+
+    names = args.scenarios or list(SCENARIOS)
+    results = {}
+    for name in names:
+        reset_stats()
+        results[name] = await bench_scenario(name, args.iterations, args.users_pool)
+        r = results[name]
+        print(f"{name:14s} {r['updates_per_sec']:9.0f} upd/s  "
+              f"p50 {r['latency_ms']['p50']:.3f} ms  p99 {r['latency_ms']['p99']:.3f} ms  "
+              f"peak {r['peak_bytes_per_update'] / 1024:.1f} KiB")
+
+    memory = None
+    if args.memory_users:
+        reset_stats()
+        memory = await bench_memory(args.memory_users)
+        print(f"RSS +{memory['rss_growth'] / 1024 / 1024:.1f} MiB на {memory['users']} користувачів "
+              f"({memory['bytes_per_user']:.0f} B/користувач)")
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pid": os.getpid(),
+        },
+        "scenarios": results,
+        "memory": memory,
+    }
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """Порівнює два JSON-звіти і повертає список регресій"""
+    regressions = []
+    for name, cur in new["scenarios"].items():
+        prev = old.get("scenarios", {}).get(name)
+        if not prev:
+            continue
+        checks = [
+            ("updates_per_sec", prev["updates_per_sec"], cur["updates_per_sec"], True),
+            ("p99_ms", prev["latency_ms"]["p99"], cur["latency_ms"]["p99"], False),
+            ("peak_bytes", prev["peak_bytes_per_update"], cur["peak_bytes_per_update"], False),
+        ]
+        for metric, before, after, higher_is_better in checks:
+            if not before:
+                continue
+            delta = (after - before) / before
+            worse = -delta if higher_is_better else delta
+            mark = "❌" if worse > threshold else "  "
+            print(f"{mark} {name:14s} {metric:16s} {before:12.3f} → {after:12.3f} ({delta:+.1%})")
+            if worse > threshold:
+                regressions.append((name, metric, delta))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк гарячих шляхів бота")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--users-pool", type=int, default=100)
+    parser.add_argument("--memory-users", type=int, default=100_000)
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS))
+    parser.add_argument("--output", help="куди записати JSON-звіт")
+    parser.add_argument("--compare", help="JSON-звіт попереднього коміту для порівняння")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 Звіт: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if compare(old, report):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Календарні фіди: час збірки всіх (клас, зміна) і ціна запиту — повна відповідь проти 304.
+
+    python -m benchmarks.bench_calendar --requests 20000 --output calendar.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import quote
+
+from calendar_feed import CalendarFeeds
+from config import CALENDAR_PATH
+
+
+async def per_request_us(feeds, target, headers, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        await feeds.handle(target, headers)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def run(args):
+    feeds = CalendarFeeds()
+    started = time.perf_counter()
+    built = feeds.build()
+    build_ms = (time.perf_counter() - started) * 1000
+    sizes = [len(feed.body) for feed in built.values()]
+
+    class_name, shift = next(iter(built))
+    target = f"{CALENDAR_PATH}{quote(class_name)}.ics?shift={shift}"
+    etag = built[(class_name, shift)].etag
+    return {
+        "feeds": len(built),
+        "build_ms": build_ms,
+        "avg_bytes": sum(sizes) / len(sizes),
+        "full_us": await per_request_us(feeds, target, {}, args.requests),
+        "not_modified_us": await per_request_us(feeds, target, {"if-none-match": etag}, args.requests),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк календарних фідів")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"🏗 {report['feeds']} фідів за {report['build_ms']:.1f} мс, у середньому {report['avg_bytes']:.0f} байт")
+    print(f"⚡ Запит: повна відповідь {report['full_us']:.1f} мкс, 304 {report['not_modified_us']:.1f} мкс")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк і перевірка властивостей форматера відповідей AI.
+
+    python -m benchmarks.bench_format --cases 20000 --output format.json
+
+Генерує випадкові "відповіді моделі" з markdown-сміттям (незакриті зірочки, вкладені
+спани, блоки коду, <, >, &) і перевіряє, що кожен шматок після split_chunks — валідний
+Telegram HTML не довший за ліміт (генератор і перевірки — з tests/test_format.py, їх ганяє й pytest).
+Будь-яке порушення завершує процес з кодом 1.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from config import MAX_LEN
+from utils import format_ai_response, split_chunks
+from tests.test_format import long_answers, random_answer, same_text, validate
+
+
+def legacy_format(text):
+    """Стара пара escape + format з кількома проходами — для порівняння"""
+    for char in ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']:
+        text = text.replace(char, f'\\{char}')
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк форматера відповідей AI")
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=34)
+    parser.add_argument("--limit", type=int, default=MAX_LEN)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    answers = [random_answer(rng) for _ in range(args.cases)]
+    answers += long_answers(answers)
+
+    failures = []
+    chunks_total = 0
+    started = time.perf_counter()
+    for answer in answers:
+        formatted = format_ai_response(answer)
+        chunks = list(split_chunks(formatted, args.limit))
+        chunks_total += len(chunks)
+        for chunk in chunks:
+            error = validate(chunk, args.limit)
+            if error:
+                failures.append({"error": error, "input": answer[:300]})
+                break
+        if not same_text(chunks, formatted):
+            failures.append({"error": "втрачено текст при розрізанні", "input": answer[:300]})
+    check_time = time.perf_counter() - started
+
+    total_chars = sum(len(a) for a in answers)
+    t0 = time.perf_counter()
+    for answer in answers:
+        for _ in split_chunks(format_ai_response(answer), args.limit):
+            pass
+    new_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for answer in answers:
+        legacy_format(answer)
+    legacy_time = time.perf_counter() - t0
+
+    report = {
+        "cases": len(answers),
+        "chunks": chunks_total,
+        "failures": len(failures),
+        "examples": failures[:5],
+        "format_split_mb_per_sec": total_chars / new_time / 1e6 if new_time else 0.0,
+        "format_split_us_per_answer": new_time / len(answers) * 1e6,
+        "legacy_escape_us_per_answer": legacy_time / len(answers) * 1e6,
+        "check_seconds": check_time,
+    }
+    print(f"✅ {report['cases'] - report['failures']}/{report['cases']} валідних, шматків: {chunks_total}")
+    print(f"⚡ format+split: {report['format_split_us_per_answer']:.1f} мкс/відповідь "
+          f"({report['format_split_mb_per_sec']:.1f} МБ/с)")
+    for failure in failures[:5]:
+        print(f"❌ {failure['error']}: {failure['input'][:120]!r}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Ціна перевірки ліміту, коли відстежується мільйон користувачів.
+
+    python -m benchmarks.bench_ratelimit --keys 1000000 --output ratelimit.json
+
+Заповнює GCRA мільйоном ключів, потім міряє нс на перевірку для випадкових ключів
+(гарячих і нових), пам'ять на ключ і ціну ротації поколінь; окремо — Lockout на невдачах.
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from ratelimit import GCRA, Lockout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def per_call_ns(fn, keys):
+    started = time.perf_counter_ns()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter_ns() - started) / len(keys)
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    clock = FakeClock()
+    report = {"keys": args.keys}
+
+    gc.collect()
+    tracemalloc.start()
+    bucket = GCRA(6, 3, clock=clock)
+    started = time.perf_counter()
+    for uid in range(args.keys):
+        bucket.check(uid)
+    report["fill_s"] = time.perf_counter() - started
+    report["bytes_per_key"] = tracemalloc.get_traced_memory()[0] / args.keys
+    tracemalloc.stop()
+
+    hot = [rng.randrange(args.keys) for _ in range(args.checks)]
+    fresh = [args.keys + i for i in range(args.checks)]
+    report["check_hot_ns"] = per_call_ns(bucket.check, hot)
+    report["check_new_ns"] = per_call_ns(bucket.check, fresh)
+
+    # Через period старе покоління відкидається цілком — ціна ротації не залежить від числа ключів
+    clock.now += bucket.period
+    started = time.perf_counter_ns()
+    bucket.check(0)
+    report["rotation_ns"] = time.perf_counter_ns() - started
+    clock.now += bucket.period
+    bucket.check(0)
+    report["tracked_after_expiry"] = len(bucket)
+
+    lockout = Lockout(clock=clock)
+    attackers = [rng.randrange(args.keys // 10 or 1) for _ in range(args.checks)]
+    report["lockout_failure_ns"] = per_call_ns(lockout.failure, attackers)
+    report["lockout_wait_ns"] = per_call_ns(lockout.wait, attackers)
+
+    print(f"🔑 {args.keys} ключів: заповнення {report['fill_s']:.2f} с, {report['bytes_per_key']:.0f} байт/ключ")
+    print(f"⚡ Перевірка: відомий ключ {report['check_hot_ns']:.0f} нс, новий {report['check_new_ns']:.0f} нс")
+    print(f"♻️ Ротація поколінь: {report['rotation_ns'] / 1000:.1f} мкс, після двох — {report['tracked_after_expiry']} ключів")
+    print(f"🔒 Lockout: невдача {report['lockout_failure_ns']:.0f} нс, перевірка {report['lockout_wait_ns']:.0f} нс")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк лімітів на користувача")
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
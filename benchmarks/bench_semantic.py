@@ -0,0 +1,105 @@
+"""Семантичний кеш: частка влучань на перефразуваннях, хибні влучання і ціна пошуку на повному індексі.
+
+    python -m benchmarks.bench_semantic --capacity 2000 --output semantic.json
+
+Працює офлайн з локальним HashingEmbedder; поріг можна підібрати через --threshold.
+"""
+import argparse
+import json
+import random
+import time
+
+from semantic_cache import HashingEmbedder, SemanticCache
+
+# (питання, перефразування) — мають влучати
+PARAPHRASES = [
+    ("поясни закон Ома", "що таке закон Ома"),
+    ("що таке фотосинтез", "розкажи про фотосинтез"),
+    ("як розв'язати квадратне рівняння", "розв'язати квадратне рівняння як"),
+    ("теорема Піфагора", "поясни теорему Піфагора"),
+    ("що таке ДНК", "поясніть ДНК будь ласка"),
+    ("причини Першої світової війни", "розкажи причини Першої світової війни"),
+    ("формула площі кола", "яка формула площі кола"),
+    ("що таке інтеграл", "поясни що таке інтеграл"),
+]
+# (питання, інше питання) — не повинні влучати
+DISTINCT = [
+    ("перший закон Ньютона", "другий закон Ньютона"),
+    ("столиця Франції", "столиця Німеччини"),
+    ("поясни закон Ома", "поясни закон Архімеда"),
+    ("що таке фотосинтез", "що таке дихання рослин"),
+    ("формула площі кола", "формула довжини кола"),
+    ("2 + 2", "3 + 3"),
+]
+
+WORDS = ("закон сила струм енергія клітина рівняння функція похідна вектор атом молекула реакція "
+         "війна держава мова вірш роман число множина кут трикутник").split()
+
+
+def hit_rates(threshold):
+    def run(pairs):
+        cache = SemanticCache(HashingEmbedder(), threshold=threshold)
+        hits = 0
+        for first, second in pairs:
+            _, vector = cache.lookup("assistant", first)
+            cache.store("assistant", vector, f"відповідь: {first}")
+            answer, _ = cache.lookup("assistant", second)
+            hits += answer == f"відповідь: {first}"
+        return hits / len(pairs)
+
+    return run(PARAPHRASES), run(DISTINCT)
+
+
+def lookup_cost(capacity, queries, seed):
+    rng = random.Random(seed)
+    embedder = HashingEmbedder()
+    cache = SemanticCache(embedder, capacity=capacity)
+
+    def question():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+
+    for _ in range(capacity):
+        cache.store("assistant", embedder(question()), "відповідь")
+    texts = [question() for _ in range(queries)]
+
+    started = time.perf_counter()
+    vectors = [embedder(text) for text in texts]
+    embed = (time.perf_counter() - started) / queries
+    index = cache.indexes["assistant"]
+    started = time.perf_counter()
+    for vector in vectors:
+        index.top(vector)
+    search = (time.perf_counter() - started) / queries
+
+    started = time.perf_counter()
+    for vector in vectors:
+        cache.store("assistant", vector, "відповідь")
+    store = (time.perf_counter() - started) / queries
+    return {"embed_us": embed * 1e6, "search_us": search * 1e6, "store_evict_us": store * 1e6,
+            "evictions": cache.evictions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк семантичного кешу")
+    parser.add_argument("--capacity", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    threshold = args.threshold if args.threshold is not None else SemanticCache(HashingEmbedder()).threshold
+    hit, false_hit = hit_rates(threshold)
+    report = {"threshold": threshold, "paraphrase_hit_rate": hit, "false_hit_rate": false_hit,
+              **lookup_cost(args.capacity, args.queries, args.seed)}
+
+    print(f"🎯 Поріг {threshold}: влучання на перефразуваннях {hit:.0%}, хибні влучання {false_hit:.0%}")
+    print(f"⚡ Індекс на {args.capacity}: ембединг {report['embed_us']:.0f} мкс, пошук {report['search_us']:.0f} мкс, "
+          f"запис з витісненням {report['store_evict_us']:.0f} мкс")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Холодний старт: що імпортується до того, як піднявся health server, і скільки часу до першого 200 OK.
+
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --budget-ms 150 --health-budget-ms 1000   # у CI: exit 1, якщо бюджет перевищено
+
+1. `python -X importtime -c "import main"` — кумулятивний час імпорту main (усе, що до bind порту),
+   плюс довідково bot і geminiclient (вони вантажаться вже після bind).
+2. Запускає `python main.py` з фейковими токенами на вільному порту і міряє час до першої відповіді health check.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Модулі, які не повинні потрапляти в імпорт main: саме вони робили старт повільним
+HEAVY = ("aiogram", "google.genai", "google.generativeai", "aiohttp", "pydantic")
+# Бюджети старту; tests/test_startup.py перевіряє той самий бюджет імпорту
+IMPORT_BUDGET_MS = 150.0
+HEALTH_BUDGET_MS = 1000.0
+
+
+def importtime(module):
+    """[(self_us, cumulative_us, name)] з виводу -X importtime, або None, якщо імпорт упав"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1]
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows, None
+
+
+def measure_import(module, repeats, top=10):
+    """Найкращий з повторів: перший прогін часто платить за компіляцію .pyc"""
+    best = None
+    for _ in range(repeats):
+        rows, error = importtime(module)
+        if rows is None:
+            return {"module": module, "error": error}
+        total = next(cum for _, cum, name in reversed(rows) if name.strip() == module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+    names = {name.strip() for _, _, name in rows}
+    return {
+        "module": module,
+        "ms": total / 1000,
+        "modules": len(rows),
+        "heavy": sorted(h for h in HEAVY if h in names),
+        "top": [{"name": name.strip(), "self_ms": s / 1000, "cumulative_ms": c / 1000}
+                for s, c, name in sorted(rows, key=lambda r: r[0], reverse=True)[:top]],
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def health_ok(port):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.2) as s:
+            s.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            return s.recv(64).startswith(b"HTTP/1.1 200")
+    except OSError:
+        return False
+
+
+def time_to_health(timeout=30.0):
+    """Секунди від запуску процесу до першого 200 OK від health check"""
+    port = free_port()
+    env = dict(os.environ, BOT_TOKEN="123456:BENCH", API_KEY="bench", PORT=str(port), WEBHOOK_URL="", REDIS_URL="")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if health_ok(port):
+                return time.perf_counter() - started
+            if proc.poll() is not None and not health_ok(port):
+                return None
+            time.sleep(0.005)
+        return None
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старту")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="бюджет на import main")
+    parser.add_argument("--health-budget-ms", type=float, default=HEALTH_BUDGET_MS, help="бюджет до першого 200 OK")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = {"imports": [measure_import(m, args.repeats, args.top) for m in ("main", "bot", "geminiclient")]}
+    for row in report["imports"]:
+        if "error" in row:
+            print(f"⚠️ import {row['module']}: {row['error']}")
+            continue
+        heavy = f", важкі: {', '.join(row['heavy'])}" if row["heavy"] else ""
+        print(f"📦 import {row['module']}: {row['ms']:.1f} мс, {row['modules']} модулів{heavy}")
+    for item in report["imports"][0].get("top", []):
+        print(f"    {item['self_ms']:7.2f} мс  {item['name']}")
+
+    seconds = min(filter(None, (time_to_health() for _ in range(args.repeats))), default=None)
+    report["health_ms"] = seconds * 1000 if seconds is not None else None
+    print(f"🌐 До першого health 200 OK: {report['health_ms']:.0f} мс" if seconds is not None
+          else "🌐 Health server так і не відповів")
+
+    main_import = report["imports"][0]
+    failures = []
+    if "error" in main_import or main_import["ms"] > args.budget_ms:
+        failures.append(f"import main {main_import.get('ms', float('inf')):.1f} мс > {args.budget_ms:.0f} мс")
+    if main_import.get("heavy"):
+        failures.append(f"import main тягне {', '.join(main_import['heavy'])}")
+    if report["health_ms"] is None or report["health_ms"] > args.health_budget_ms:
+        failures.append(f"health {report['health_ms'] or float('inf'):.0f} мс > {args.health_budget_ms:.0f} мс")
+    report["failures"] = failures
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    for failure in failures:
+        print(f"❌ Бюджет старту: {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Старт у бюджеті")
+
+
+if __name__ == "__main__":
+    main()
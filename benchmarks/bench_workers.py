@@ -0,0 +1,124 @@
+"""Поріг винесення форматування в пул процесів і хвіст затримок event loop під змішаним навантаженням.
+
+    python -m benchmarks.bench_workers --processes 2 --output workers.json
+
+1. Для кожного розміру відповіді міряє format+split на місці і через пул (з передачею туди й назад);
+   перший розмір, де пул не повільніший, — рекомендований OFFLOAD_MIN_CHARS.
+2. Запускає "тікер" кожну 1 мс і паралельно форматує великі відповіді: на місці vs через пул,
+   і порівнює p99 / max запізнення тікера — саме його відчувають інші користувачі.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from benchmarks.bench_format import random_answer
+from workers import WorkerPool, format_and_split
+
+SIZES = [1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000]
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1] if len(values) > 1 else sum(values)
+
+
+def make_text(rng, size):
+    parts = []
+    total = 0
+    while total < size:
+        part = random_answer(rng)
+        parts.append(part)
+        total += len(part) + 2
+    return "\n\n".join(parts)[:size]
+
+
+async def cutover(pool, texts, repeats):
+    rows = []
+    loop = asyncio.get_running_loop()
+    for size, text in texts.items():
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            format_and_split(text)
+        inline = (time.perf_counter() - t0) / repeats
+
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            await loop.run_in_executor(pool.executor(), format_and_split, text)
+        offloaded = (time.perf_counter() - t0) / repeats
+        rows.append({"chars": size, "inline_ms": inline * 1000, "pool_ms": offloaded * 1000})
+    return rows
+
+
+async def loop_lag(pool, text, jobs, offload):
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t0 - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    pool.threshold = 0 if offload else float("inf")
+    started = time.perf_counter()
+    for _ in range(jobs):
+        await pool.run(format_and_split, text, size=len(text))
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    return {
+        "seconds": elapsed,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags) * 1000 if lags else 0.0,
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    texts = {size: make_text(rng, size) for size in SIZES}
+    pool = WorkerPool(processes=args.processes)
+    print(f"🚀 Піднімаємо {args.processes} процес(и): {await pool.warmup():.2f} с")
+
+    rows = await cutover(pool, texts, args.repeats)
+    recommended = next((row["chars"] for row in rows if row["pool_ms"] <= row["inline_ms"]), None)
+    for row in rows:
+        print(f"{row['chars']:>8} символів: на місці {row['inline_ms']:8.2f} мс, пул {row['pool_ms']:8.2f} мс")
+    print(f"🎯 Рекомендований OFFLOAD_MIN_CHARS: {recommended}")
+
+    big = texts[args.lag_size]
+    report = {
+        "processes": args.processes,
+        "cutover": rows,
+        "recommended_threshold": recommended,
+        "inline": await loop_lag(pool, big, args.jobs, offload=False),
+        "offloaded": await loop_lag(pool, big, args.jobs, offload=True),
+    }
+    for name in ("inline", "offloaded"):
+        lag = report[name]
+        print(f"⏱ {name}: lag p99 {lag['lag_p99_ms']:.2f} мс, max {lag['lag_max_ms']:.2f} мс, {lag['seconds']:.2f} с")
+    pool.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пулу процесів для форматування")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--lag-size", type=int, default=100_000, choices=SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
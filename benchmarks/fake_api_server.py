@@ -0,0 +1,104 @@
+"""Локальний фейковий Bot API сервер: віддає апдейти через getUpdates і приймає відповіді бота"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict, deque
+
+from aiohttp import web
+
+MESSAGE_METHODS = {"sendmessage", "senddocument", "editmessagetext"}
+
+
+class FakeTelegramServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.base_url = None
+        self.pending = deque()
+        self.calls = Counter()
+        self.completed = []  # (час ін'єкції, час відповіді, шлях)
+        self._inflight = defaultdict(deque)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+        self._runner = None
+
+    # ---------- API для генератора ----------
+
+    def inject(self, user_id: int, text: str, tag=None):
+        now = time.perf_counter()
+        self.pending.append({
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                "text": text,
+            },
+        })
+        self._inflight[user_id].append((now, tag))
+        self._new_updates.set()
+
+    def backlog(self):
+        return len(self.pending) + sum(len(q) for q in self._inflight.values())
+
+    # ---------- Bot API ----------
+
+    async def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        while self.pending and self.pending[0]["update_id"] < offset:
+            self.pending.popleft()
+        if not self.pending and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(itertools.islice(self.pending, 0, limit))
+
+    def _message_result(self, params):
+        chat_id = int(params.get("chat_id") or 0)
+        # Відповіддю на апдейт вважаємо повідомлення з клавіатурою — анімація завантаження її не має
+        if params.get("reply_markup") and self._inflight.get(chat_id):
+            injected, tag = self._inflight[chat_id].popleft()
+            self.completed.append((injected, time.perf_counter(), tag))
+        return {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    async def handle(self, request: web.Request):
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        params = dict(await request.post())
+        if method == "getupdates":
+            result = await self._get_updates(params)
+        elif method == "getme":
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        elif method in MESSAGE_METHODS:
+            result = self._message_result(params)
+        else:
+            result = True
+        return web.Response(text=json.dumps({"ok": True, "result": result}), content_type="application/json")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{self.host}:{self.port}"
+        return self.base_url
+
+    async def stop(self):
+        self._new_updates.set()
+        if self._runner:
+            await self._runner.cleanup()
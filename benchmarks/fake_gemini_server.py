@@ -0,0 +1,131 @@
+"""Локальний фейковий Gemini API для перевірки повторів, хеджування, запобіжника і кешу контексту.
+
+    python -m benchmarks.fake_gemini_server --port 8089 --latency 0.8 --error-rate 0.2 --quota-rate 0.1
+    GEMINI_BASE_URL=http://127.0.0.1:8089 API_KEY=fake BOT_TOKEN=... python main.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+
+class FakeGeminiServer:
+    def __init__(self, latency=0.5, jitter=0.5, error_rate=0.0, quota_rate=0.0, retry_delay=2, seed=None,
+                 limited_keys=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_rate = quota_rate
+        self.retry_delay = retry_delay
+        # Ключі, які завжди отримують 429 — для перевірки перемикання між ключами
+        self.limited_keys = set(limited_keys)
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.caches = {}
+        self._cache_ids = itertools.count(1)
+
+    @staticmethod
+    def _error(code, status, message, headers=None, details=None):
+        body = {"error": {"code": code, "message": message, "status": status, "details": details or []}}
+        return web.json_response(body, status=code, headers=headers)
+
+    async def generate(self, request: web.Request):
+        model, _, action = request.match_info["target"].partition(":")
+        self.calls[action] += 1
+        body = await request.json()
+        # Хвіст затримок — як у живого API під навантаженням
+        delay = self.latency * (1 + self.rng.expovariate(1 / self.jitter) if self.jitter else 1)
+        await asyncio.sleep(delay)
+
+        roll = self.rng.random()
+        if roll < self.quota_rate or request.headers.get("x-goog-api-key") in self.limited_keys:
+            self.calls["429"] += 1
+            return self._error(
+                429, "RESOURCE_EXHAUSTED", "Quota exceeded",
+                headers={"Retry-After": str(self.retry_delay)},
+                details=[{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{self.retry_delay}s"}],
+            )
+        if roll < self.quota_rate + self.error_rate:
+            self.calls["503"] += 1
+            return self._error(503, "UNAVAILABLE", "The model is overloaded")
+
+        if action == "batchEmbedContents":
+            texts = [item["content"]["parts"][0]["text"] for item in body["requests"]]
+            return web.json_response({"embeddings": [{"values": [float(len(text)), 1.0, 0.0]} for text in texts]})
+
+        cached = (body.get("cachedContent") or "").strip()
+        if cached and cached not in self.caches:
+            return self._error(404, "NOT_FOUND", f"CachedContent not found: {cached}")
+
+        contents = body.get("contents") or []
+        last = contents[-1]["parts"][0]["text"] if contents else ""
+        text = f"# Відповідь\n\n- модель: {model}\n- реплік в історії: {max(len(contents) - 1, 0)}\n\n**{last[-60:]}**"
+        prompt_tokens, answer_tokens = len(json.dumps(body)) // 4, len(text) // 4
+        return web.json_response({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": answer_tokens,
+                              "totalTokenCount": prompt_tokens + answer_tokens},
+            "modelVersion": model,
+        })
+
+    def _cache_body(self, name):
+        entry = self.caches[name]
+        return {"name": name, "model": entry["model"], "expireTime": entry["expire"].isoformat().replace("+00:00", "Z")}
+
+    @staticmethod
+    def _expiry(ttl):
+        seconds = float((ttl or "3600s").rstrip("s"))
+        return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+    async def create_cache(self, request: web.Request):
+        body = await request.json()
+        self.calls["cachedContents.create"] += 1
+        name = f"cachedContents/fake{next(self._cache_ids)}"
+        self.caches[name] = {"model": body.get("model"), "expire": self._expiry(body.get("ttl"))}
+        return web.json_response(self._cache_body(name))
+
+    async def update_cache(self, request: web.Request):
+        name = f"cachedContents/{request.match_info['cache_id']}"
+        self.calls["cachedContents.update"] += 1
+        if name not in self.caches:
+            return self._error(404, "NOT_FOUND", f"CachedContent not found: {name}")
+        body = await request.json()
+        self.caches[name]["expire"] = self._expiry(body.get("ttl"))
+        return web.json_response(self._cache_body(name))
+
+    async def delete_cache(self, request: web.Request):
+        self.calls["cachedContents.delete"] += 1
+        self.caches.pop(f"cachedContents/{request.match_info['cache_id']}", None)
+        return web.json_response({})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/{version}/models/{target}", self.generate)
+        app.router.add_post("/{version}/cachedContents", self.create_cache)
+        app.router.add_patch("/{version}/cachedContents/{cache_id}", self.update_cache)
+        app.router.add_delete("/{version}/cachedContents/{cache_id}", self.delete_cache)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковий Gemini API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--quota-rate", type=float, default=0.0)
+    parser.add_argument("--retry-delay", type=int, default=2)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.latency, args.jitter, args.error_rate, args.quota_rate, args.retry_delay)
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Фейковий транспорт Telegram і заглушка Gemini для бенчмарків (без мережі)"""
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+
+BENCH_TOKEN = "123456:BENCHMARK-TOKEN-NOT-REAL"
+
+
+def temp_journal():
+    """Окремий журнал апдейтів на прогін: id у бенчмарках щоразу починаються з 1"""
+    return os.path.join(tempfile.mkdtemp(prefix="normai-bench-"), "update_journal.json")
+
+# Методи, які у відповідь повертають Message
+MESSAGE_METHODS = {"SendMessage", "SendDocument", "EditMessageText"}
+
+
+class FakeSession(BaseSession):
+    """Сесія aiogram, яка не ходить в мережу, а відповідає як Bot API"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = Counter()
+        self._message_ids = itertools.count(1)
+
+    def _result(self, name, method):
+        if name in MESSAGE_METHODS:
+            chat_id = getattr(method, "chat_id", None) or 1
+            return {
+                "message_id": getattr(method, "message_id", None) or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": getattr(method, "text", None) or "",
+            }
+        if name == "GetMe":
+            return {"id": 1, "is_bot": True, "first_name": "bench"}
+        return True
+
+    async def make_request(self, bot, method, timeout=None):
+        name = type(method).__name__
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Проганяємо відповідь через справжній парсер aiogram, щоб ціна була чесною
+        content = json.dumps({"ok": True, "result": self._result(name, method)})
+        response = self.check_response(bot=bot, method=method, status_code=200, content=content)
+        return response.result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        if False:
+            yield b""
+
+    async def close(self):
+        pass
+
+
+class StubGeminiClient:
+    """Заглушка GeminiClient з тим самим інтерфейсом, що використовує бот"""
+
+    def __init__(self, answer: str = None, delay: float = 0.0):
+        self.answer = answer or (
+            "*Закон Ома*\n\n• Сила струму прямо пропорційна напрузі\n• I = U / R\n\n"
+            "Приклад: `U = 12 В`, `R = 4 Ом` → *I = 3 А*"
+        )
+        self.delay = delay
+        self.modes = {"assistant": "", "programmer": ""}
+        self.calls = 0
+
+    def get_available_modes(self):
+        return list(self.modes.keys())
+
+    def add_mode(self, mode_name: str, instruction: str):
+        self.modes[mode_name] = instruction
+        return True
+
+    def delete_mode(self, mode_name: str):
+        return self.modes.pop(mode_name, None) is not None
+
+    def ask(self, prompt: str, mode: str = "assistant", max_output_tokens: int = 420, temperature: float = 0.4, history=None,
+            question: str = None, fallback: bool = True) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.answer
+
+
+class UpdateFactory:
+    """Будує синтетичні апдейти так само, як їх розбирає aiogram"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def raw_message(self, user_id: int, text: str) -> dict:
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                "text": text,
+            },
+        }
+
+    def message(self, user_id: int, text: str) -> Update:
+        return Update.model_validate(self.raw_message(user_id, text), context={"bot": self.bot})
+
+    def inline_query(self, user_id: int, query: str) -> Update:
+        raw = {
+            "update_id": next(self._update_ids),
+            "inline_query": {
+                "id": str(next(self._message_ids)),
+                "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                "query": query,
+                "offset": "",
+            },
+        }
+        return Update.model_validate(raw, context={"bot": self.bot})
@@ -0,0 +1,175 @@
+"""Генератор навантаження: відтворює трафік шкільного ранку через фейковий Bot API.
+
+Пошук точки насичення (ступінчасте зростання темпу):
+    python -m benchmarks.load_replay ramp --rates 5 10 20 50 100 200 --step 20
+Відтворення піку перед першим уроком (07:45–08:05), стиснутого в 20 разів:
+    python -m benchmarks.load_replay replay --shift shift_1 --peak-rate 80 --speedup 20
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+from datetime import timedelta
+
+import utils
+from bot import TelegramBot
+from config import BELLS_FILE, STATS
+from benchmarks.bench_bot import percentile
+from benchmarks.fake_api_server import FakeTelegramServer
+from benchmarks.fake_telegram import BENCH_TOKEN, StubGeminiClient, temp_journal
+from benchmarks.traffic import TrafficModel, load_profile, peak_windows
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+
+@contextlib.asynccontextmanager
+async def running_bot(args):
+    server = FakeTelegramServer()
+    base_url = await server.start()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(base_url))
+    STATS.__init__()
+    tg_bot = TelegramBot(StubGeminiClient(delay=args.ai_delay), BENCH_TOKEN, session=session, sender=False,
+                         journal_file=temp_journal())
+    polling = asyncio.create_task(
+        tg_bot.dp.start_polling(tg_bot.bot, handle_signals=False, polling_timeout=1)
+    )
+    try:
+        yield server
+    finally:
+        await tg_bot.dp.stop_polling()
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(polling, 5)
+        await tg_bot.bot.session.close()
+        await server.stop()
+
+
+async def replay(server, events):
+    """Вкидає події в сервер у заплановані моменти; повертає момент старту і тривалість"""
+    started = time.perf_counter()
+    for t, user_id, text, path in events:
+        delay = started + t - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        server.inject(user_id, text, path)
+    return started, time.perf_counter() - started
+
+
+async def settle(server, timeout):
+    deadline = time.perf_counter() + timeout
+    while server.backlog() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+
+def summarize(completed, duration, offered):
+    latencies = [done - injected for injected, done, _ in completed]
+    by_path = {}
+    for injected, done, path in completed:
+        by_path.setdefault(path, []).append(done - injected)
+    return {
+        "offered": offered,
+        "completed": len(completed),
+        "offered_rate": offered / duration if duration else 0.0,
+        "completed_rate": len(completed) / duration if duration else 0.0,
+        "latency_ms": {p: percentile(latencies, p) * 1000 for p in (50, 90, 99)},
+        "by_path_p99_ms": {path: percentile(v, 99) * 1000 for path, v in sorted(by_path.items())},
+    }
+
+
+async def run_ramp(args, model):
+    steps = []
+    saturation = None
+    for rate in args.rates:
+        async with running_bot(args) as server:
+            events = model.timeline(lambda t: rate, args.step)
+            _, duration = await replay(server, events)
+            await settle(server, args.drain)
+            # Відповіді, що не прийшли до кінця дренажу, лишаються в backlog
+            step = summarize(server.completed, duration, len(events))
+            step.update({"target_rate": rate, "unanswered": server.backlog(), "api_calls": dict(server.calls)})
+        steps.append(step)
+        ratio = step["completed"] / step["offered"] if step["offered"] else 1.0
+        saturated = ratio < args.min_completion or step["latency_ms"][99] > args.slo_ms
+        step["saturated"] = saturated
+        print(f"{rate:6.0f} upd/s → виконано {ratio:6.1%}, p50 {step['latency_ms'][50]:7.0f} ms, "
+              f"p99 {step['latency_ms'][99]:7.0f} ms{'  ❌ насичення' if saturated else ''}")
+        if saturated and saturation is None:
+            saturation = rate
+            if not args.keep_going:
+                break
+    last_ok = max((s["target_rate"] for s in steps if not s["saturated"]), default=None)
+    print(f"📈 Точка насичення: {saturation or 'не досягнуто'}; останній стабільний темп: {last_ok}")
+    return {"mode": "ramp", "steps": steps, "saturation_rate": saturation, "max_stable_rate": last_ok}
+
+
+async def run_peak(args, model):
+    with open(BELLS_FILE, "r", encoding="utf-8") as f:
+        windows = peak_windows(json.load(f))
+    start, bell, end = windows[args.shift]
+    total = (end - start).total_seconds() / args.speedup
+    rise = (bell - start).total_seconds() / args.speedup
+
+    def rate_fn(t):
+        # Трикутний профіль: трафік росте до дзвінка і швидко спадає після нього
+        if t <= rise:
+            return args.base_rate + (args.peak_rate - args.base_rate) * t / rise
+        return args.peak_rate - (args.peak_rate - args.base_rate) * (t - rise) / max(total - rise, 1e-6)
+
+    print(f"⏰ {args.shift}: {start:%H:%M}–{end:%H:%M}, дзвінок {bell:%H:%M}, стиснуто до {total:.0f} с")
+    async with running_bot(args) as server:
+        events = model.timeline(rate_fn, total, args.shift)
+        started, duration = await replay(server, events)
+        await settle(server, args.drain)
+        result = summarize(server.completed, duration, len(events))
+        result["unanswered"] = server.backlog()
+        buckets = {}
+        for injected, done, _ in server.completed:
+            minute = int((injected - started) * args.speedup // 60)
+            buckets.setdefault(minute, []).append(done - injected)
+    result["per_minute_p99_ms"] = {m: percentile(v, 99) * 1000 for m, v in sorted(buckets.items())}
+    for m, p99 in result["per_minute_p99_ms"].items():
+        print(f"  {start + timedelta(minutes=m):%H:%M}  p99 {p99:7.0f} ms")
+    print(f"✅ {result['completed']}/{result['offered']}, p99 {result['latency_ms'][99]:.0f} ms")
+    result.update({"mode": "replay", "shift": args.shift})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Відтворення шкільного трафіку через фейковий Telegram API")
+    parser.add_argument("--profile", help="JSON з розподілом шляхів/класів/питань")
+    parser.add_argument("--seed", type=int, default=12)
+    parser.add_argument("--ai-delay", type=float, default=1.5, help="імітація затримки Gemini, с")
+    parser.add_argument("--no-animation", action="store_true", help="вимкнути паузи анімації завантаження")
+    parser.add_argument("--slo-ms", type=float, default=3000)
+    parser.add_argument("--min-completion", type=float, default=0.95)
+    parser.add_argument("--drain", type=float, default=10, help="скільки чекати хвіст відповідей, с")
+    parser.add_argument("--output")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    ramp = sub.add_parser("ramp")
+    ramp.add_argument("--rates", type=float, nargs="+", default=[5, 10, 20, 50, 100, 200, 400])
+    ramp.add_argument("--step", type=float, default=20, help="тривалість кожного кроку, с")
+    ramp.add_argument("--keep-going", action="store_true")
+
+    peak = sub.add_parser("replay")
+    peak.add_argument("--shift", choices=["shift_1", "shift_2"], default="shift_1")
+    peak.add_argument("--peak-rate", type=float, default=80)
+    peak.add_argument("--base-rate", type=float, default=5)
+    peak.add_argument("--speedup", type=float, default=20)
+
+    args = parser.parse_args()
+    if args.no_animation:
+        utils.LOADING_FRAME_DELAY = 0
+
+    model = TrafficModel(load_profile(args.profile), seed=args.seed)
+    runner = run_ramp if args.mode == "ramp" else run_peak
+    report = asyncio.run(runner(args, model))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Модель трафіку: які класи, які шляхи по меню і коли саме користувачі приходять"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from config import AI_ICON, ALL_CLASSES, BELL_ICON, CLASS_ICON, DAY_ICON, SCHEDULE_ICON
+
+# Шляхи по меню так, як їх проходить живий користувач
+MENU_PATHS = {
+    "today": [f"{SCHEDULE_ICON} Розклад", f"{CLASS_ICON} Вибрати клас", "{class}", "📆 Сьогодні"],
+    "tomorrow": [f"{SCHEDULE_ICON} Розклад", f"{CLASS_ICON} Вибрати клас", "{class}", "📅 Завтра"],
+    "day": [f"{SCHEDULE_ICON} Розклад", f"{CLASS_ICON} Вибрати клас", "{class}", "{day}"],
+    "full_week": [f"{SCHEDULE_ICON} Розклад", f"{CLASS_ICON} Вибрати клас", "{class}", "📋 Весь розклад"],
+    "bells": [f"{BELL_ICON} Дзвінки", "{shift}"],
+    "ai": [f"{AI_ICON} AI Помічник", "{question}"],
+}
+
+# Розподіл за замовчуванням для ранкового піку: переважно "Сьогодні" і "Дзвінки"
+DEFAULT_PROFILE = {
+    "paths": {"today": 0.45, "bells": 0.25, "tomorrow": 0.08, "day": 0.08, "full_week": 0.04, "ai": 0.10},
+    "classes": {},
+    "new_user_ratio": 0.3,
+    "think_time": [0.8, 3.0],
+    "questions": [
+        "Поясни закон Ома",
+        "Що таке фотосинтез?",
+        "Як розв'язати квадратне рівняння?",
+        "Коротко про Другу світову війну",
+        "Як перекласти Present Perfect?",
+        "Що таке похідна?",
+    ],
+}
+
+DAYS = ["Понеділок", "Вівторок", "Середа", "Четвер", "П'ятниця"]
+SHIFT_BUTTONS = {"shift_1": "🇦 І зміна", "shift_2": "🇧 ІІ зміна"}
+
+
+def load_profile(filename=None):
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    if filename:
+        with open(filename, "r", encoding="utf-8") as f:
+            profile.update(json.load(f))
+    return profile
+
+
+def peak_windows(bells_data, before_min=15, after_min=5):
+    """Вікна піку навколо першого уроку кожної зміни: 07:45–08:05, 12:20–12:40"""
+    windows = {}
+    for shift_key, shift in bells_data.items():
+        lessons = shift.get("lessons") or []
+        if not lessons:
+            continue
+        first = min(lessons, key=lambda l: l.get("start", "99:99"))
+        bell = datetime.strptime(first["start"], "%H:%M")
+        windows[shift_key] = (bell - timedelta(minutes=before_min), bell, bell + timedelta(minutes=after_min))
+    return windows
+
+
+class TrafficModel:
+    def __init__(self, profile, seed=None):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.path_names = list(profile["paths"])
+        self.path_weights = [profile["paths"][p] for p in self.path_names]
+        weights = profile.get("classes") or {}
+        self.classes = list(ALL_CLASSES)
+        self.class_weights = [weights.get(c, 1.0) for c in self.classes]
+        self.mean_path_len = sum(
+            w * (len(MENU_PATHS[p]) + profile["new_user_ratio"]) for p, w in zip(self.path_names, self.path_weights)
+        ) / sum(self.path_weights)
+        self._next_user = 10_000_000
+        self._known_users = []
+
+    def _user(self):
+        if not self._known_users or self.rng.random() < self.profile["new_user_ratio"]:
+            self._next_user += 1
+            self._known_users.append(self._next_user)
+            return self._next_user, True
+        return self.rng.choice(self._known_users), False
+
+    def session(self, shift_key="shift_1"):
+        """Один візит користувача: (user_id, [тексти повідомлень], назва шляху)"""
+        user_id, is_new = self._user()
+        path = self.rng.choices(self.path_names, self.path_weights)[0]
+        values = {
+            "class": CLASS_ICON + self.rng.choices(self.classes, self.class_weights)[0],
+            "day": f"{DAY_ICON} {self.rng.choice(DAYS)}",
+            "shift": SHIFT_BUTTONS.get(shift_key, SHIFT_BUTTONS["shift_1"]),
+            "question": self.rng.choice(self.profile["questions"]),
+        }
+        texts = [step.format(**values) if step.startswith("{") else step for step in MENU_PATHS[path]]
+        if is_new:
+            texts.insert(0, "/start")
+        return user_id, texts, path
+
+    def timeline(self, rate_fn, duration, shift_key="shift_1"):
+        """Розклад подій (t, user_id, text, path), відсортований за часом.
+
+        rate_fn(t) — цільова кількість апдейтів на секунду в момент t.
+        Візити приходять як пуассонівський потік, кроки одного візиту рознесені think time.
+        """
+        events = []
+        t = 0.0
+        lo, hi = self.profile["think_time"]
+        while t < duration:
+            rate = max(rate_fn(t), 1e-6) / self.mean_path_len
+            t += self.rng.expovariate(rate)
+            if t >= duration:
+                break
+            user_id, texts, path = self.session(shift_key)
+            step_t = t
+            for text in texts:
+                events.append((step_t, user_id, text, path))
+                step_t += self.rng.uniform(lo, hi)
+        events.sort(key=lambda e: e[0])
+        return events
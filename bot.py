@@ -1,35 +1,99 @@
 import asyncio
 import json
-from collections import defaultdict
+import os
 from datetime import datetime
 
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.enums import ChatAction, ParseMode
 from aiogram.filters import Command
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile, InlineQuery
 
 from config import *
-from utils import loading_animation, split_chunks, safe_send
+from utils import loading_animation, split_chunks, safe_send, escape_html, strip_html
 from geminiclient import GeminiClient
+from profiler import Profiler
+from ai_memory import ConversationMemory, estimate_tokens
+from resilience import GeminiUnavailable
+from batch_jobs import BatchRunner, parse_items
+from sender import OutboundSender
+from schedule_index import ScheduleIndex, seconds_until_midnight
+from notifier import Notifier, SubscriptionStore
+from digests import DigestCache
+from overrides import OverrideStore, parse_override
+from shared_state import LeaderElection, SharedState, StatsSync, read_sessions, write_sessions
+from workers import POOL, split_text
+from schedule_snapshot import load_schedule
+from ratelimit import RateLimiter, SharedLockout, format_wait
+from event_log import EventLog, analyze, annotate
+from update_journal import UpdateJournal
+from lifecycle import LIFECYCLE
+from calendar_feed import CALENDARS, feed_url
 
 class TelegramBot:
-    def __init__(self, client, token: str):
+    def __init__(self, client, token: str, session=None, sender=None, journal_file=UPDATE_JOURNAL_FILE):
         self.client = client
-        self.bot = Bot(token=token)
+        self.bot = Bot(token=token, session=session)
+        # Усі виклики Bot API з хендлерів ідуть через чергу відправки; sender=False (бенчмарки) — напряму
+        if sender is None and SEND_QUEUE:
+            sender = OutboundSender()
+        self.sender = sender or None
+        if self.sender:
+            self.bot.session.middleware(self.sender)
         self.dp = Dispatcher()
         self.router = Router()
         
-        self.user_locks = defaultdict(asyncio.Lock)
-        self.user_state = {}
+        # Спільний стан реплік: сесії, блокування, статистика, черга розсилок, лідер для планових задач
+        self.shared = SharedState.from_env()
+        # Без Redis сесії зберігаються на диск при зупинці і повертаються тут
+        self.user_state = {} if self.shared.distributed else read_sessions(SESSIONS_FILE)
+        self.leader = LeaderElection(self.shared)
+        self.stats_sync = StatsSync(STATS, self.shared)
+        self.memory = ConversationMemory()
+        # Ліміти перевіряються до блокування користувача і до потоку з Gemini
+        self.limiter = RateLimiter()
+        # Невдалі спроби пароля рахуються на всі репліки разом
+        self.password_lockout = SharedLockout(self.shared)
         
-        self.schedule_data = self.load_json(SCHEDULE_FILE, {"classes": ALL_CLASSES, "schedule": {}})
-        self.bells_data = self.load_json(BELLS_FILE, {"shift_1": {}, "shift_2": {}})
+        # Знімок з хешем джерел замість розбору json на кожному старті; при розбіжності — json і новий знімок
+        schedule = load_schedule()
+        self.schedule_digest = schedule.digest
+        self.schedule_data = schedule.data
+        self.bells_data = schedule.bells
+        self.lessons = schedule.lessons
         self.admins_data = self.load_json(ADMINS_FILE, {"admins": [1259974225], "current_password": "admin123", "donors": []})
         self.donors = set(self.admins_data.get("donors", []))
         self.stats = STATS
+        self.profiler = Profiler()
+        self.batches = BatchRunner(client)
+        # Тексти розкладу рахуються раз на (клас, день) і спільні для кнопок, inline і нагадувань
+        self.overrides = OverrideStore(shared=self.shared)
+        self.digests = DigestCache(self.render_class_day, self.render_full_schedule, overrides=self.overrides)
+        # Індекс будується у фоні після старту (start_background), а не в конструкторі
+        self.schedule_index = ScheduleIndex(self.digests.day, self.digests.week, render_dated=self.digests.dated,
+                                            build=False)
+        self.notifier = Notifier(self.bot.send_message, self.bells_data, self.get_lesson, self.digests.today,
+                                 store=SubscriptionStore(shared=self.shared),
+                                 should_fire=lambda: self.leader.is_leader)
+        
+        self.events = EventLog(context=self.event_context)
+        # Апдейти, накопичені за час рестарту, обробляються, але кожен update_id — лише раз
+        self.journal = UpdateJournal(journal_file, shared=self.shared, bot_id=self.bot.id)
         
         self.setup_handlers()
+        if EVENT_LOG_ENABLED:
+            for observer in (self.router.message, self.router.callback_query, self.router.inline_query):
+                observer.middleware(self.events)
         self.dp.include_router(self.router)
+        # Незавершені хендлери — перше, чого чекає зупинка за SIGTERM
+        self.dp.update.outer_middleware.register(LIFECYCLE)
+        LIFECYCLE.on_drain(self.stop_intake)
+        LIFECYCLE.on_stop(self.checkpoint)
+        LIFECYCLE.on_stop(self.stop_workers)
+        # Журнал одразу після LIFECYCLE і до сесії: дублікати відкидаються ще до її завантаження
+        self.dp.update.outer_middleware.register(self.journal)
+        if self.shared.distributed:
+            self.dp.update.outer_middleware.register(self.sync_session)
+        self.dp.shutdown.register(self.journal.save)
 
     def load_json(self, filename, default):
         try:
@@ -38,9 +102,30 @@ class TelegramBot:
         except:
             return default
 
+    async def sync_session(self, handler, event, data):
+        """Стан користувача береться зі спільного сховища до хендлера і зберігається після"""
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        stored = await self.shared.load_session(user.id)
+        if stored is not None:
+            self.user_state[user.id] = stored
+        try:
+            return await handler(event, data)
+        finally:
+            if user.id in self.user_state:
+                await self.shared.save_session(user.id, self.user_state[user.id])
+
     def is_donor(self, user_id: int):
         return user_id in self.donors
 
+    async def loading(self, message: Message, text="Завантаження"):
+        """Анімація — повідомлення і до 8 правок; з чергою відправки вони з'їдали б ліміт справжніх відповідей"""
+        if self.sender:
+            await message.bot.send_chat_action(message.chat.id, ChatAction.TYPING)
+        else:
+            await loading_animation(message, text)
+
     def state(self, user_id: int):
         if user_id not in self.user_state:
             is_admin = user_id in self.admins_data.get("admins", [])
@@ -60,6 +145,8 @@ class TelegramBot:
                 "awaiting_new_password": False,
                 "awaiting_mode_name": False,
                 "awaiting_mode_instruction": False,
+                "awaiting_batch": False,
+                "awaiting_override": False,
                 "temp_mode_name": None,
                 "first_seen": datetime.now(),
                 "last_active": datetime.now()
@@ -75,10 +162,77 @@ class TelegramBot:
         
         return self.user_state[user_id]
 
+    def event_context(self, user_id):
+        """Клас і режим AI користувача для журналу подій"""
+        st = self.user_state.get(user_id)
+        if not st:
+            return {}
+        fields = {}
+        if st.get("selected_class"):
+            fields["c"] = st["selected_class"]
+        if st.get("current_menu") == "ai":
+            fields["m"] = st.get("mode")
+        return fields
+
+    async def throttled(self, message: Message, action: str):
+        """Дешева відповідь "зачекайте", якщо користувач вичерпав ліміт цього класу дій"""
+        wait = self.limiter.check(action, message.from_user.id)
+        if wait:
+            await safe_send(message, f"⏳ Забагато запитів. Спробуйте через {format_wait(wait)}")
+        return bool(wait)
+
+    def schedule_changed(self):
+        """Новий розклад: тексти й календарі перераховуються при першому зверненні, inline-індекс — у фоні"""
+        self.digests.invalidate()
+        CALENDARS.invalidate()
+        return asyncio.create_task(self.schedule_index.build_background())
+
+    async def reload_schedule(self):
+        """Перечитує розклад, якщо хеш джерел змінився; True — розклад новий і кеші скинуто"""
+        schedule = await asyncio.to_thread(load_schedule)
+        if schedule.digest == self.schedule_digest:
+            return False
+        self.schedule_digest = schedule.digest
+        self.schedule_data = schedule.data
+        self.bells_data = schedule.bells
+        self.lessons = schedule.lessons
+        self.notifier.bells_data = schedule.bells
+        self.schedule_changed()
+        return True
+
+    async def watch_schedule(self, interval=SCHEDULE_RELOAD_INTERVAL):
+        """Кожна репліка сама помічає новий schedule_full.json / bells_schedule.json"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.reload_schedule():
+                    print("🔄 Розклад змінився — кеші скинуто")
+            except Exception as e:
+                print(f"⚠️ Перевірка розкладу: {e}")
+
+    def override_changed(self, entry):
+        self.digests.invalidate_dated(entry["class"])
+        self.schedule_index.invalidate_dated(entry["class"])
+
+    async def sync_overrides(self):
+        """Заміни, внесені через інші репліки: локальна копія і тексти "сьогодні / завтра" їхніх класів"""
+        for entry in await self.overrides.refresh():
+            self.override_changed(entry)
+
+    async def watch_overrides(self, interval=OVERRIDES_REFRESH):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync_overrides()
+            except Exception as e:
+                print(f"⚠️ Синхронізація замін: {e}")
+
     def get_schedule_for_class_day(self, class_name, day_key):
         if not class_name or not day_key:
             return "❌ Помилка: не вибрано клас або день"
-        
+        return self.digests.day(class_name, day_key)
+
+    def render_class_day(self, class_name, day_key, patches=None):
         schedule_day = self.schedule_data.get('schedule', {}).get(day_key, [])
         if not schedule_day:
             day_name = DAYS_UA_REVERSE.get(day_key, day_key)
@@ -92,8 +246,17 @@ class TelegramBot:
         for lesson in schedule_day:
             lesson_num = lesson.get('lesson_number')
             class_info = lesson.get('classes', {}).get(class_name, {})
+            patch = patches.get(lesson_num) if patches else None
             
-            if class_info and class_info.get('subject'):
+            if patch and patch.get("cancel"):
+                if class_info and class_info.get('subject'):
+                    result += f"{lesson_num}. ❌ {class_info['subject']} — скасовано\n"
+            elif patch:
+                room = patch.get('room', '')
+                room_str = f" (каб. {room})" if room else ""
+                result += f"{lesson_num}. ✏️ {patch['subject']}{room_str}\n"
+                found = True
+            elif class_info and class_info.get('subject'):
                 subject = class_info['subject']
                 room = class_info.get('room', '')
                 room_str = f" (каб. {room})" if room else ""
@@ -105,10 +268,19 @@ class TelegramBot:
         
         return result
 
+    def get_lesson(self, class_name, day_key, lesson_number, on=None):
+        """(предмет, кабінет) уроку з цим номером з урахуванням замін на дату, або None"""
+        patch = self.overrides.get(on, class_name, lesson_number) if on else None
+        if patch:
+            return None if patch.get("cancel") else (patch["subject"], patch.get("room", ""))
+        return self.lessons.get((day_key, class_name), {}).get(lesson_number)
+
     def get_full_schedule_for_class(self, class_name):
         if not class_name:
             return "❌ Помилка: не вибрано клас"
-        
+        return self.digests.week(class_name)
+
+    def render_full_schedule(self, class_name):
         result = f"{SCHEDULE_ICON} Повний розклад — {class_name}\n\n"
         
         for day_key, day_name in DAYS_UA.items():
@@ -134,22 +306,10 @@ class TelegramBot:
         return result
 
     def get_schedule_for_today(self, class_name):
-        today = datetime.now().weekday()
-        days_map = {0: "monday", 1: "tuesday", 2: "wednesday", 
-                   3: "thursday", 4: "friday", 5: "monday", 6: "monday"}
-        day_key = days_map[today]
-        day_name = DAYS_UA_REVERSE.get(day_key, "")
-        schedule = self.get_schedule_for_class_day(class_name, day_key)
-        return schedule.replace(f"{day_name}", f"СЬОГОДНІ ({day_name})")
+        return self.digests.today(class_name)
 
     def get_schedule_for_tomorrow(self, class_name):
-        tomorrow = (datetime.now().weekday() + 1) % 7
-        days_map = {0: "monday", 1: "tuesday", 2: "wednesday", 
-                   3: "thursday", 4: "friday", 5: "monday", 6: "monday"}
-        day_key = days_map[tomorrow]
-        day_name = DAYS_UA_REVERSE.get(day_key, "")
-        schedule = self.get_schedule_for_class_day(class_name, day_key)
-        return schedule.replace(f"{day_name}", f"ЗАВТРА ({day_name})")
+        return self.digests.tomorrow(class_name)
 
     # ========== ВСІ КЛАВІАТУРИ ==========
 
@@ -258,7 +418,8 @@ class TelegramBot:
             [KeyboardButton(text=f"{BACK_ICON} Інший день"), 
              KeyboardButton(text=f"{BACK_ICON} Інший клас")],
             [KeyboardButton(text="📋 Весь розклад"), 
-             KeyboardButton(text=f"{BELL_ICON} Дзвінки")]
+             KeyboardButton(text=f"{BELL_ICON} Дзвінки")],
+            [KeyboardButton(text="🔔 Нагадування"), KeyboardButton(text="📲 В календар")]
         ]
         
         row4 = [KeyboardButton(text=f"{BACK_ICON} Назад"), 
@@ -269,6 +430,17 @@ class TelegramBot:
         
         return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
 
+    def subscription_keyboard(self, sub):
+        remind = "✅" if sub and sub["remind"] else "▫️"
+        digest = "✅" if sub and sub["digest"] else "▫️"
+        shift = sub["shift"] if sub else 1
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=f"{remind} Перед кожним уроком", callback_data="sub_remind")],
+            [InlineKeyboardButton(text=f"{digest} Розклад зранку о {DIGEST_TIME}", callback_data="sub_digest")],
+            [InlineKeyboardButton(text=("● " if shift == 1 else "") + SHIFTS["1"], callback_data="sub_shift_1"),
+             InlineKeyboardButton(text=("● " if shift == 2 else "") + SHIFTS["2"], callback_data="sub_shift_2")],
+        ])
+
     def admin_keyboard(self):
         return ReplyKeyboardMarkup(
             keyboard=[
@@ -277,6 +449,11 @@ class TelegramBot:
                 [KeyboardButton(text="📢 Розсилка"), 
                  KeyboardButton(text="👥 Активні")],
                 [KeyboardButton(text="🤖 Керування режимами AI")],
+                [KeyboardButton(text="🗂 Пакетні завдання"),
+                 KeyboardButton(text="🩺 Профілювання")],
+                [KeyboardButton(text="📝 Заміни"),
+                 KeyboardButton(text="📈 Аналітика")],
+                [KeyboardButton(text="🔄 Оновити розклад")],
                 [KeyboardButton(text=f"{BACK_ICON} Назад"), 
                  KeyboardButton(text=f"{MENU_ICON} Головне меню")]
             ],
@@ -378,7 +555,11 @@ class TelegramBot:
                     f"🔑 Змінити пароль\n"
                     f"📢 Розсилка\n"
                     f"👥 Активні\n"
-                    f"🤖 Керування режимами AI",
+                    f"🤖 Керування режимами AI\n"
+                    f"🗂 Пакетні завдання\n"
+                    f"🩺 Профілювання\n"
+                    f"📝 Заміни\n"
+                    f"📈 Аналітика",
                     self.admin_keyboard()
                 )
             else:
@@ -395,6 +576,8 @@ class TelegramBot:
                 "awaiting_new_password": False,
                 "awaiting_mode_name": False,
                 "awaiting_mode_instruction": False,
+                "awaiting_batch": False,
+                "awaiting_override": False,
                 "temp_mode_name": None
             })
             await safe_send(message, f"{MENU_ICON} Скасовано", self.main_keyboard(user_id))
@@ -409,15 +592,28 @@ class TelegramBot:
             except:
                 pass
             
+            locked = await self.password_lockout.wait(user_id)
+            if locked:
+                await safe_send(message, f"🔒 Забагато невдалих спроб. Спробуйте через {format_wait(locked)}",
+                                self.cancel_keyboard())
+                return
+            
+            if self.shared.distributed:
+                self.admins_data.update(await self.shared.get_json("admins", {}))
+            
             if message.text == self.admins_data["current_password"]:
+                await self.password_lockout.success(user_id)
                 st["is_admin"] = True
                 st["awaiting_password"] = False
                 if user_id not in self.admins_data["admins"]:
                     self.admins_data["admins"].append(user_id)
+                    await self.shared.set_json("admins", self.admins_data)
                 st["current_menu"] = "admin"
                 await safe_send(message, f"{ADMIN_ICON} Успішно!", self.admin_keyboard())
             else:
-                await safe_send(message, "❌ Невірний пароль", self.cancel_keyboard())
+                lock = await self.password_lockout.failure(user_id)
+                text = f"❌ Невірний пароль\n🔒 Наступна спроба через {format_wait(lock)}" if lock else "❌ Невірний пароль"
+                await safe_send(message, text, self.cancel_keyboard())
 
         @self.router.message(F.text == f"{MENU_ICON} Головне меню")
         async def back_to_main(message: Message):
@@ -531,7 +727,7 @@ class TelegramBot:
             
             shift = 1 if message.text == "🇦 І зміна" else 2
             
-            await loading_animation(message, "Завантаження")
+            await self.loading(message)
             
             if shift == 1:
                 bells_text = (
@@ -614,6 +810,7 @@ class TelegramBot:
             user_id = message.from_user.id
             st = self.state(user_id)
             st["detail_next"] = False
+            self.memory.clear(user_id)
             await safe_send(message, "🧹 Контекст очищено", self.ai_keyboard(user_id))
 
         # ========== РОЗКЛАД ==========
@@ -675,7 +872,7 @@ class TelegramBot:
             st["selected_day"] = day_key
             self.stats.schedule_views += 1
             
-            await loading_animation(message, "Завантаження")
+            await self.loading(message)
             schedule_text = self.get_schedule_for_class_day(st["selected_class"], day_key)
             
             await safe_send(message, schedule_text, self.schedule_result_keyboard(user_id))
@@ -689,7 +886,7 @@ class TelegramBot:
                 await safe_send(message, "❌ Спочатку оберіть клас!", self.classes_keyboard(user_id))
                 return
             
-            await loading_animation(message, "Завантаження")
+            await self.loading(message)
             schedule_text = self.get_schedule_for_today(st["selected_class"])
             await safe_send(message, schedule_text, self.schedule_result_keyboard(user_id))
 
@@ -702,7 +899,7 @@ class TelegramBot:
                 await safe_send(message, "❌ Спочатку оберіть клас!", self.classes_keyboard(user_id))
                 return
             
-            await loading_animation(message, "Завантаження")
+            await self.loading(message)
             schedule_text = self.get_schedule_for_tomorrow(st["selected_class"])
             await safe_send(message, schedule_text, self.schedule_result_keyboard(user_id))
 
@@ -715,7 +912,7 @@ class TelegramBot:
                 await safe_send(message, "❌ Спочатку оберіть клас!", self.classes_keyboard(user_id))
                 return
             
-            await loading_animation(message, "Завантаження")
+            await self.loading(message)
             schedule_text = self.get_full_schedule_for_class(st["selected_class"])
             
             if len(schedule_text) > 4000:
@@ -724,6 +921,87 @@ class TelegramBot:
             else:
                 await safe_send(message, schedule_text, self.schedule_result_keyboard(user_id))
 
+        @self.router.message(F.text == "🔔 Нагадування")
+        async def subscription_menu(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            await self.notifier.store.refresh()
+            sub = self.notifier.store.get(user_id)
+            class_name = st.get("selected_class") or (sub and sub["class"])
+            
+            if not class_name:
+                await safe_send(message, "❌ Спочатку оберіть клас!", self.classes_keyboard(user_id))
+                return
+            
+            st["selected_class"] = class_name
+            await message.answer(
+                f"🔔 Нагадування для {class_name}\n\n"
+                f"За {REMIND_BEFORE_MINUTES} хв до уроку — предмет і кабінет, зранку — розклад на день.",
+                reply_markup=self.subscription_keyboard(sub)
+            )
+
+        @self.router.message(F.text == "📲 В календар")
+        async def calendar_link(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            sub = self.notifier.store.get(user_id)
+            class_name = st.get("selected_class") or (sub and sub["class"])
+            
+            if not class_name:
+                await safe_send(message, "❌ Спочатку оберіть клас!", self.classes_keyboard(user_id))
+                return
+            if not feed_url(class_name):
+                await safe_send(message, "❌ Календар зараз недоступний", self.schedule_result_keyboard(user_id))
+                return
+            
+            st["selected_class"] = class_name
+            shift = sub["shift"] if sub else 1
+            links = "\n".join(
+                f"{'● ' if number == shift else ''}{SHIFTS[str(number)]}: {feed_url(class_name, number)}"
+                for number in (1, 2)
+            )
+            await safe_send(
+                message,
+                f"📲 Розклад {class_name} у календарі телефона\n\n{links}\n\n"
+                f"Додайте посилання як підписку на календар (Google: «Інші календарі» → «З URL», "
+                f"iPhone: Налаштування → Календар → Облікові записи → Підписний календар). "
+                f"Календар оновлюється сам, коли змінюється розклад.",
+                self.schedule_result_keyboard(user_id)
+            )
+
+        @self.router.callback_query(F.data.startswith("sub_"))
+        async def subscription_toggle(callback: CallbackQuery):
+            user_id = callback.from_user.id
+            st = self.state(user_id)
+            store = self.notifier.store
+            await store.refresh()
+            sub = store.get(user_id)
+            class_name = st.get("selected_class") or (sub and sub["class"])
+            
+            if not class_name:
+                await callback.answer("Спочатку оберіть клас", show_alert=True)
+                return
+            
+            action = callback.data[4:]
+            if action == "remind":
+                sub = await store.set(user_id, class_name, remind=not (sub and sub["remind"]))
+            elif action == "digest":
+                sub = await store.set(user_id, class_name, digest=not (sub and sub["digest"]))
+            elif action.startswith("shift_"):
+                # Вибір зміни без підписки вмикає нагадування перед уроками
+                sub = await store.set(user_id, class_name, shift=int(action[6:]), remind=True if not sub else None)
+            
+            await callback.message.edit_reply_markup(reply_markup=self.subscription_keyboard(sub))
+            await callback.answer("Збережено")
+
+        @self.router.inline_query()
+        async def inline_schedule(query: InlineQuery):
+            results, relative = self.schedule_index.search(query.query)
+            self.stats.schedule_views += 1
+            # "сьогодні" / "завтра" не можна кешувати довше, ніж до півночі
+            cache_time = min(INLINE_CACHE_TIME, seconds_until_midnight()) if relative else INLINE_CACHE_TIME
+            await query.answer(results, cache_time=cache_time, is_personal=False)
+
         # ========== АДМІН КОМАНДИ ==========
 
         @self.router.message(F.text == "📊 Статистика")
@@ -732,12 +1010,23 @@ class TelegramBot:
             st = self.state(user_id)
             
             if st["current_menu"] == "admin" and st["is_admin"]:
+                if await self.throttled(message, "admin"):
+                    return
                 online_now = len(self.stats.online_users)
                 active_today = len(self.stats.daily_active)
                 total_users = self.stats.total_users
                 commands = self.stats.commands_used
                 schedule_views = self.stats.schedule_views
                 ai_queries = self.stats.ai_queries
+                donors = len(self.donors)
+                if self.shared.distributed:
+                    totals = await self.stats_sync.totals()
+                    active_today = totals.get("active_today", active_today)
+                    total_users = totals.get("total_users", total_users)
+                    commands = totals.get("commands_used", commands)
+                    schedule_views = totals.get("schedule_views", schedule_views)
+                    ai_queries = totals.get("ai_queries", ai_queries)
+                    donors = totals.get("donors", donors)
                 uptime = datetime.now() - self.stats.start_time
                 hours = int(uptime.total_seconds() // 3600)
                 minutes = int((uptime.total_seconds() % 3600) // 60)
@@ -752,15 +1041,33 @@ class TelegramBot:
                     f"📋 Розклад: {schedule_views}\n"
                     f"🤖 AI: {ai_queries}\n"
                     f"⏱ Аптайм: {hours} год {minutes} хв\n"
-                    f"💰 Донатерів: {len(self.donors)}"
+                    f"💰 Донатерів: {donors}\n"
+                    f"⏳ Обмежено запитів: {sum(self.limiter.denied.values())}\n"
+                    f"🔁 Апдейтів з черги після рестарту: {self.journal.replayed}, повторів відкинуто: {self.journal.duplicates}"
+                    f"\n{CALENDARS.report()}"
+                    f"{self.semantic_report()}"
+                    f"{self.gemini_keys_report()}"
                 )
 
+        @self.router.message(F.text == "🔄 Оновити розклад")
+        async def admin_reload_schedule(message: Message):
+            st = self.state(message.from_user.id)
+            if st["current_menu"] == "admin" and st["is_admin"]:
+                if await self.throttled(message, "admin"):
+                    return
+                if await self.reload_schedule():
+                    await safe_send(message, "✅ Розклад оновлено: тексти, inline і календарі перебудовуються")
+                else:
+                    await safe_send(message, "ℹ️ Розклад не змінився")
+
         @self.router.message(F.text == "👥 Активні")
         async def admin_active(message: Message):
             user_id = message.from_user.id
             st = self.state(user_id)
             
             if st["current_menu"] == "admin" and st["is_admin"]:
+                if await self.throttled(message, "admin"):
+                    return
                 online_list = list(self.stats.online_users)[:20]
                 online_text = "\n".join([f"• {uid}" for uid in online_list]) if online_list else "• Немає активних"
                 
@@ -773,6 +1080,19 @@ class TelegramBot:
                     f"👤 Всього: {self.stats.total_users}"
                 )
 
+        @self.router.message(F.text == "📈 Аналітика")
+        async def admin_analytics(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            
+            if st["current_menu"] == "admin" and st["is_admin"]:
+                if await self.throttled(message, "admin"):
+                    return
+                # Свіжі події з буфера — на диск, потім один потоковий прохід по файлах у потоці
+                await self.events.flush()
+                report = await asyncio.to_thread(analyze)
+                await safe_send(message, report, self.admin_keyboard())
+
         @self.router.message(F.text == "🔑 Змінити пароль")
         async def change_password_start(message: Message):
             user_id = message.from_user.id
@@ -803,6 +1123,7 @@ class TelegramBot:
             
             old = self.admins_data["current_password"]
             self.admins_data["current_password"] = new_pass
+            await self.shared.set_json("admins", self.admins_data)
             
             try:
                 with open(ADMINS_FILE, 'w', encoding='utf-8') as f:
@@ -831,19 +1152,181 @@ class TelegramBot:
             st["awaiting_broadcast"] = False
             
             await safe_send(message, f"📤 Розсилка запущена...")
+            await self.enqueue_broadcast([f"📢 {text}"], None, message.chat.id, "Розсилка завершена!")
+
+        @self.router.message(F.text == "🗂 Пакетні завдання")
+        async def batch_menu(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            
+            if st["current_menu"] == "admin" and st["is_admin"]:
+                jobs = self.batches.recent()
+                jobs_text = "\n".join(job.progress_text() for job in jobs) if jobs else "• Завдань ще не було"
+                st["awaiting_batch"] = True
+                await safe_send(
+                    message,
+                    f"🗂 Пакетні завдання\n\n{jobs_text}\n\n"
+                    f"Надішліть список запитів, по одному в рядку (до {BATCH_MAX_ITEMS}).\n"
+                    f"Щоб обрати режим: режим: запит",
+                    self.cancel_keyboard()
+                )
+
+        @self.router.message(lambda m: self.state(m.from_user.id)["awaiting_batch"])
+        async def batch_submit(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            st["awaiting_batch"] = False
+            if await self.throttled(message, "batch"):
+                return
+            
+            items = parse_items(message.text, self.client.get_available_modes())
+            if not items:
+                await safe_send(message, "❌ Список порожній", self.admin_keyboard())
+                return
+            
+            job = self.batches.submit(items, message.chat.id)
+            status_msg = await message.answer(job.progress_text(), reply_markup=self.admin_keyboard())
+            job.message_id = status_msg.message_id
+            self.batches.store.save_meta(job)
+            LIFECYCLE.track(self.batches.start(job, self.batch_progress, self.batch_finished))
+
+        @self.router.message(F.text == "📝 Заміни")
+        async def overrides_menu(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            
+            if st["current_menu"] == "admin" and st["is_admin"]:
+                await self.sync_overrides()
+                upcoming = self.overrides.upcoming()
+                listed = "\n".join(self.overrides.describe(e) for e in upcoming[:30]) if upcoming else "• Замін немає"
+                st["awaiting_override"] = True
+                await safe_send(
+                    message,
+                    f"📝 Заміни\n\n{listed}\n\n"
+                    f"Нова заміна, по одній в рядку:\n"
+                    f"дата клас урок предмет [каб. N]\n"
+                    f"21.10 9-Б 3 ФІЗИКА каб. 201\n"
+                    f"завтра 7-А 5 скасовано\n\n"
+                    f"Видалити: - id",
+                    self.cancel_keyboard()
+                )
+
+        @self.router.message(lambda m: self.state(m.from_user.id)["awaiting_override"])
+        async def overrides_submit(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            st["awaiting_override"] = False
+            await self.sync_overrides()
+            
+            report = []
+            for line in (message.text or "").splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("- "):
+                    entry = await self.overrides.remove(line[2:].strip())
+                    report.append(f"🗑 {self.overrides.describe(entry)}" if entry else f"❌ {line}: не знайдено")
+                else:
+                    try:
+                        entry = await self.overrides.add(parse_override(line))
+                    except ValueError as e:
+                        report.append(f"❌ {line}: {e}")
+                        continue
+                    report.append(f"✅ {self.overrides.describe(entry)}")
+                if entry:
+                    self.override_changed(entry)
+            
+            await safe_send(message, "\n".join(report) or "❌ Порожньо", self.admin_keyboard())
+
+        @self.router.callback_query(F.data.startswith("batch_send_"))
+        async def batch_deliver(callback: CallbackQuery):
+            user_id = callback.from_user.id
+            st = self.state(user_id)
+            
+            if not st["is_admin"]:
+                await callback.answer("Немає доступу")
+                return
+            
+            job = self.batches.jobs.get(callback.data.replace("batch_send_", ""))
+            if not job or job.status == "delivered":
+                await callback.answer("Вже розіслано або не знайдено")
+                return
+            
+            # Позначаємо до розсилки, щоб повторне натискання не розіслало вдруге
+            self.batches.mark_delivered(job)
+            await callback.message.edit_reply_markup(reply_markup=None)
+            await callback.answer("📤 Розсилка запущена")
             
-            sent = 0
-            failed = 0
+            chunks = [
+                chunk
+                for index, (mode, prompt) in enumerate(job.items) if index in job.results
+                for chunk in split_chunks(f"📢 <b>{escape_html(prompt)}</b>\n\n{job.results[index]}")
+            ]
+            await self.enqueue_broadcast(chunks, ParseMode.HTML, job.chat_id, f"Розсилка завдання {job.id} завершена!")
+
+        @self.router.callback_query(F.data.startswith("batch_retry_"))
+        async def batch_retry(callback: CallbackQuery):
+            st = self.state(callback.from_user.id)
+            
+            if not st["is_admin"]:
+                await callback.answer("Немає доступу")
+                return
             
-            for uid in self.user_state.keys():
-                try:
-                    await self.bot.send_message(uid, f"📢 {text}")
-                    sent += 1
-                    await asyncio.sleep(0.05)
-                except:
-                    failed += 1
+            job = self.batches.jobs.get(callback.data.replace("batch_retry_", ""))
+            task = self.batches.retry(job, self.batch_progress, self.batch_finished) if job else None
+            if task is None:
+                await callback.answer("Нема що повторювати")
+                return
             
-            await safe_send(message, f"✅ Розсилка завершена!\n\nВідправлено: {sent}\nПомилок: {failed}", self.admin_keyboard())
+            LIFECYCLE.track(task)
+            await callback.message.edit_reply_markup(reply_markup=None)
+            await callback.answer(f"🔁 Повторюємо {len(job.errors)} пунктів")
+
+        @self.router.message(F.text == "🩺 Профілювання")
+        async def profiling_menu(message: Message):
+            user_id = message.from_user.id
+            st = self.state(user_id)
+            
+            if st["current_menu"] == "admin" and st["is_admin"]:
+                if self.profiler.busy:
+                    await safe_send(message, "🩺 Профілювання вже триває", self.admin_keyboard())
+                    return
+                
+                keyboard = [
+                    [InlineKeyboardButton(text="cProfile 30 с", callback_data="prof_cprofile_s30"),
+                     InlineKeyboardButton(text="cProfile 200 апдейтів", callback_data="prof_cprofile_u200")],
+                    [InlineKeyboardButton(text="Семплінг 60 с", callback_data="prof_sample_s60"),
+                     InlineKeyboardButton(text="Семплінг 500 апдейтів", callback_data="prof_sample_u500")],
+                    [InlineKeyboardButton(text="❌ Скасувати", callback_data="cancel")]
+                ]
+                await message.answer(
+                    "🩺 Профілювання\n\nОберіть тип і тривалість. Звіт прийде архівом, "
+                    f"максимум {PROFILE_MAX_SECONDS} с.",
+                    reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+                )
+
+        @self.router.callback_query(F.data.startswith("prof_"))
+        async def profiling_start(callback: CallbackQuery):
+            user_id = callback.from_user.id
+            st = self.state(user_id)
+            
+            if not st["is_admin"]:
+                await callback.answer("Немає доступу")
+                return
+            
+            if self.profiler.busy:
+                await callback.answer("Профілювання вже триває")
+                return
+            
+            _, kind, limit = callback.data.split("_", 2)
+            seconds = int(limit[1:]) if limit.startswith("s") else None
+            updates = int(limit[1:]) if limit.startswith("u") else None
+            
+            self.profiler.task = asyncio.create_task(
+                self.run_profiling(callback.message.chat.id, kind, seconds, updates)
+            )
+            await callback.message.edit_text(f"🩺 Профілювання запущено: {kind}, {limit[1:]} {'с' if seconds else 'апдейтів'}")
+            await callback.answer()
 
         # ========== КЕРУВАННЯ РЕЖИМАМИ AI ==========
 
@@ -1008,10 +1491,12 @@ class TelegramBot:
             st = self.state(user_id)
             
             if st["current_menu"] == "ai":
+                if await self.throttled(message, "ai"):
+                    return
                 self.stats.ai_queries += 1
                 self.stats.commands_used += 1
                 
-                async with self.user_locks[user_id]:
+                async with self.shared.lock(f"user:{user_id}"):
                     await self.handle_ai_question(message, text, st["mode"])
 
     async def handle_ai_question(self, message: Message, text: str, mode: str):
@@ -1026,7 +1511,8 @@ class TelegramBot:
             max_tokens = SHORT_MAX_TOKENS
             length_rule = "Відповідь коротко, по суті. Використовуй списки для ключових пунктів."
 
-        prompt = f"{length_rule}\n\nЗапит: {text}"
+        user_id = message.from_user.id
+        history, prompt = self.memory.context(user_id, f"{length_rule}\n\nЗапит: {text}")
 
         await message.bot.send_chat_action(message.chat.id, ChatAction.TYPING)
 
@@ -1037,22 +1523,223 @@ class TelegramBot:
                 mode,
                 max_tokens,
                 0.4 if not do_detail else 0.35,
+                history,
+                text,
             )
+            self.memory.add(user_id, text, strip_html(response))
+        except GeminiUnavailable as e:
+            response = escape_html(str(e))
         except Exception as e:
-            response = f"❌ Помилка: {str(e)[:100]}"
-
-        if response and len(response) > 4000:
-            for chunk in split_chunks(response, 4000):
-                await safe_send(message, chunk, self.ai_keyboard(message.from_user.id), parse_mode=ParseMode.MARKDOWN)
+            response = escape_html(f"❌ Помилка: {str(e)[:100]}")
+
+        response = response or "❌ Немає відповіді"
+        annotate(ti=estimate_tokens(prompt) + sum(estimate_tokens(q) + estimate_tokens(a) for q, a in history),
+                 to=estimate_tokens(response))
+        for chunk in await POOL.run(split_text, response, size=len(response)):
+            await safe_send(message, chunk, self.ai_keyboard(user_id), parse_mode=ParseMode.HTML)
+
+    async def recipients(self):
+        recipients = set(self.user_state)
+        if self.shared.distributed:
+            recipients |= {int(uid) for uid in await self.shared.members("users")}
+        return recipients
+
+    async def enqueue_broadcast(self, chunks, parse_mode, report_chat_id: int, title: str):
+        """Розсилку виконує лідер: з кількома репліками задача йде через спільну чергу"""
+        job = {"chunks": chunks, "parse_mode": parse_mode, "chat_id": report_chat_id, "title": title}
+        if self.shared.distributed:
+            await self.shared.push_job("broadcast", job)
         else:
-            await safe_send(message, response or "❌ Немає відповіді", self.ai_keyboard(message.from_user.id), parse_mode=ParseMode.MARKDOWN)
+            await self.run_broadcast_job(job)
+
+    async def run_broadcast_job(self, job):
+        """Прогрес живе в job (частина, кому вже надіслано, лічильники): перервана зупинкою
+        розсилка зберігається і після рестарту продовжується з того ж місця"""
+        for key, default in (("chunk", 0), ("done", []), ("sent", 0), ("failed", 0)):
+            job.setdefault(key, default)
+        done = set(job["done"])
+        try:
+            recipients = await self.recipients()
+            while job["chunk"] < len(job["chunks"]):
+                text = job["chunks"][job["chunk"]]
+                for uid in recipients - done:
+                    try:
+                        await self.bot.send_message(uid, text, parse_mode=job["parse_mode"])
+                        job["sent"] += 1
+                    except Exception:
+                        job["failed"] += 1
+                    done.add(uid)
+                job["chunk"] += 1
+                done.clear()
+        except asyncio.CancelledError:
+            job["done"] = sorted(done)
+            await self.checkpoint_broadcast(job)
+            raise
+        await self.bot.send_message(
+            job["chat_id"],
+            f"✅ {job['title']}\n\nВідправлено: {job['sent']}\nПомилок: {job['failed']}",
+            reply_markup=self.admin_keyboard()
+        )
+
+    async def checkpoint_broadcast(self, job):
+        if self.shared.distributed:
+            # Назад у спільну чергу — продовжить лідер, що лишився, або наступний
+            await self.shared.push_job("broadcast", job)
+            return
+        jobs = self.load_json(BROADCAST_CHECKPOINT_FILE, []) + [job]
+        with open(BROADCAST_CHECKPOINT_FILE + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(jobs, f, ensure_ascii=False)
+        os.replace(BROADCAST_CHECKPOINT_FILE + ".tmp", BROADCAST_CHECKPOINT_FILE)
+        print(f"💾 Розсилку \"{job['title']}\" збережено: частина {job['chunk'] + 1}/{len(job['chunks'])}")
+
+    def resume_broadcasts(self):
+        jobs = self.load_json(BROADCAST_CHECKPOINT_FILE, [])
+        if not jobs:
+            return
+        os.remove(BROADCAST_CHECKPOINT_FILE)
+        for job in jobs:
+            LIFECYCLE.track(asyncio.create_task(self.run_broadcast_job(job)))
+
+    async def job_worker(self):
+        while not LIFECYCLE.draining:
+            await self.leader.wait()
+            try:
+                job = await self.shared.pop_job("broadcast")
+            except Exception as e:
+                print(f"⚠️ Черга розсилок: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(1)
+                continue
+            try:
+                await LIFECYCLE.track(asyncio.create_task(self.run_broadcast_job(job)))
+            except Exception as e:
+                print(f"⚠️ Розсилка не вдалася: {e}")
+
+    async def batch_progress(self, job):
+        if not job.message_id:
+            return
+        try:
+            await self.bot.edit_message_text(job.progress_text(), chat_id=job.chat_id, message_id=job.message_id)
+        except:
+            pass
+
+    async def batch_finished(self, job):
+        buttons = [[InlineKeyboardButton(text="📢 Розіслати всім", callback_data=f"batch_send_{job.id}")]]
+        if job.status == "partial":
+            buttons.append([InlineKeyboardButton(text="🔁 Повторити помилкові", callback_data=f"batch_retry_{job.id}")])
+        try:
+            await self.bot.send_document(
+                job.chat_id,
+                BufferedInputFile(self.batches.export(job), filename=f"batch-{job.id}.jsonl"),
+                caption=job.progress_text(),
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
+            )
+        except:
+            pass
+
+    def semantic_report(self):
+        semantic = getattr(self.client, "semantic", None)
+        return f"\n{semantic.report()}" if semantic else ""
+
+    def gemini_keys_report(self):
+        router = getattr(self.client, "router_if_built", None)
+        if router is None:
+            return "\n\n🔑 Ключі Gemini: ще не ініціалізовані (жодного AI-запиту)"
+        lines = ["\n\n🔑 Ключі Gemini (за хвилину):"]
+        for name, model, requests, tokens, cooling, limited in router.snapshot():
+            status = f"⏸ {cooling:.0f} с" if cooling else "✅"
+            lines.append(f"{status} {name} {model}: {requests} зап., {tokens} ток., 429×{limited}")
+        return "\n".join(lines)
+
+    async def run_profiling(self, chat_id: int, kind: str, seconds=None, updates=None):
+        try:
+            filename, data, summary = await self.profiler.capture(self.dp, kind, seconds, updates)
+            await self.bot.send_document(
+                chat_id,
+                BufferedInputFile(data, filename=filename),
+                caption=f"🩺 {summary}"
+            )
+        except Exception as e:
+            try:
+                await self.bot.send_message(chat_id, f"❌ Помилка профілювання: {str(e)[:100]}")
+            except:
+                pass
 
     async def drop_pending_updates(self):
+        """Знімає вебхук перед polling; накопичені апдейти викидаються лише з UPDATE_RESUME=0"""
         try:
-            await self.bot.delete_webhook(drop_pending_updates=True)
+            await self.bot.delete_webhook(drop_pending_updates=not UPDATE_RESUME)
         except:
             pass
 
+    async def stop_intake(self):
+        """SIGTERM: polling зупиняється, і Telegram притримує нові апдейти для наступного інстансу
+        (у режимі вебхука main.py сам відповідає 503)"""
+        try:
+            await self.dp.stop_polling()
+        except RuntimeError:
+            pass
+
+    async def checkpoint(self):
+        """Після зливу: перервані розсилки вже збережені, тут — сесії, статистика, журнал подій"""
+        if EVENT_LOG_ENABLED:
+            await self.events.flush()
+        if self.shared.distributed:
+            await self.stats_sync.flush()
+            await self.leader.resign()
+        else:
+            await asyncio.to_thread(write_sessions, SESSIONS_FILE, dict(self.user_state))
+
+    async def stop_workers(self):
+        """Після зливу процеси пулу вже нікому не потрібні — не лишаємо їх сиротами"""
+        POOL.shutdown()
+
+    def resume(self):
+        """Незавершені пакетні завдання і розсилки — з місця зупинки"""
+        for task in self.batches.resume(self.batch_progress, self.batch_finished):
+            LIFECYCLE.track(task)
+        self.resume_broadcasts()
+
+    async def start_shared(self):
+        """Фонові задачі спільного стану; з однією реплікою нічого не запускає"""
+        if not self.shared.distributed:
+            return
+        stored = await self.shared.get_json("admins")
+        if stored:
+            self.admins_data.update(stored)
+        else:
+            await self.shared.set_json("admins", self.admins_data)
+        self.donors |= {int(uid) for uid in await self.shared.members("donors")}
+        # Підписки й заміни живуть у спільному сховищі; локальні файли — лише для першого переходу на Redis
+        await self.notifier.store.seed()
+        await self.overrides.seed()
+        await self.notifier.store.refresh()
+        await self.sync_overrides()
+        asyncio.create_task(self.watch_overrides())
+        self.leader.start()
+        asyncio.create_task(self.stats_sync.run(STATS_FLUSH))
+        asyncio.create_task(self.job_worker())
+
+    def start_background(self):
+        """Важка ініціалізація після того, як бот уже приймає апдейти"""
+        asyncio.create_task(self.schedule_index.build_background())
+        asyncio.create_task(POOL.warmup())
+        asyncio.create_task(self.watch_schedule())
+        self.journal.start()
+        if EVENT_LOG_ENABLED:
+            self.events.start()
+
+    async def start_webhook(self):
+        """Режим кількох реплік: кожна приймає апдейти з вебхука, планові задачі — лише у лідера"""
+        await self.start_shared()
+        self.start_background()
+        self.resume()
+        self.notifier.start()
+        await self.bot.set_webhook(WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, drop_pending_updates=not UPDATE_RESUME)
+        LIFECYCLE.ready = True
+        print(f"✅ Бот запущено (вебхук, репліка {self.leader.identity})")
+
     async def start_polling(self):
         print("✅ Бот запущено")
         print(f"👑 Адмінів: {len(self.admins_data.get('admins', []))}")
@@ -1060,5 +1747,32 @@ class TelegramBot:
         print(f"🤖 Режимів: {len(self.client.get_available_modes())}")
         print(f"📚 Класів: {len(ALL_CLASSES)}")
         
+        await self.start_shared()
+        if self.shared.distributed:
+            # getUpdates дозволяє лише одного споживача — без вебхука опитує тільки лідер
+            await self.leader.wait()
         await self.drop_pending_updates()
-        await self.dp.start_polling(self.bot, drop_pending_updates=True)
\ No newline at end of file
+        self.start_background()
+        self.resume()
+        self.notifier.start()
+        LIFECYCLE.ready = True
+        while True:
+            # Сигнали обробляє LIFECYCLE; сесію HTTP закриває main.py, коли злив завершиться.
+            # Накопичені апдейти вже відкинуто (або ні) у drop_pending_updates — start_polling такого параметра не має
+            polling = asyncio.create_task(
+                self.dp.start_polling(self.bot, handle_signals=False, close_bot_session=False)
+            )
+            if not self.shared.distributed:
+                return await polling
+            lost = asyncio.create_task(self.leader.wait_lost())
+            await asyncio.wait({polling, lost}, return_when=asyncio.FIRST_COMPLETED)
+            if polling.done():
+                lost.cancel()
+                return polling.result()
+            # Новий лідер уже опитує getUpdates: два споживачі дали б 409 Conflict і розірваний потік апдейтів
+            print(f"👑 {self.leader.identity}: лідерство втрачено — polling зупинено")
+            await self.dp.stop_polling()
+            await polling
+            await self.leader.wait()
+            if LIFECYCLE.draining:
+                return
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""Розклад класу як календар iCalendar (.ics) для телефона: щотижневі RRULE замість окремих подій.
+
+    GET /calendar/7-А.ics?shift=2      # клас у шляху (URL-кодований), зміна — 1 або 2, за замовчуванням 1
+
+Фіди всіх (клас, зміна) будуються разом зі знімка розкладу і лежать готовими байтами з ETag,
+тож клієнт, що перевіряє календар щогодини, коштує одне порівняння рядків і відповідь 304.
+Заміни уроків на конкретні дати у фід не потрапляють — вони в боті.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+from datetime import date, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from config import ALL_CLASSES, BELLS_FILE, CALENDAR_PATH, CALENDAR_TZ, CALENDAR_URL, SCHEDULE_FILE
+from schedule_snapshot import load_schedule
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+BYDAY = ["MO", "TU", "WE", "TH", "FR"]
+SHIFTS = (1, 2)
+
+# Правила переходу на літній час для Europe/Kyiv: без VTIMEZONE клієнти не зобов'язані знати TZID
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{CALENDAR_TZ}",
+    "BEGIN:STANDARD",
+    "DTSTART:19701025T040000",
+    "TZOFFSETFROM:+0300",
+    "TZOFFSETTO:+0200",
+    "TZNAME:EET",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "BEGIN:DAYLIGHT",
+    "DTSTART:19700329T030000",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0300",
+    "TZNAME:EEST",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "END:VTIMEZONE",
+]
+
+
+def school_year(today):
+    """(1 вересня, 31 травня) навчального року, в якому лежить дата; з серпня — вже наступний"""
+    year = today.year if today.month >= 8 else today.year - 1
+    return date(year, 9, 1), date(year + 1, 5, 31)
+
+
+def escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\n", "\\n"))
+
+
+def fold(line):
+    """Рядки довші за 75 октетів переносяться, не розриваючи символ UTF-8"""
+    if len(line.encode("utf-8")) <= 75:
+        return line
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > (75 if not parts else 74):
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts)
+
+
+def render(class_name, shift, lessons, bells, start, end, stamp):
+    """Текст .ics одного класу на одну зміну"""
+    times = {lesson["number"]: lesson for lesson in bells.get(f"shift_{shift}", {}).get("lessons", [])}
+    until = end.strftime("%Y%m%dT235959Z")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//norm_ai//schedule//UK",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape(f'Розклад {class_name}')}",
+        f"X-WR-TIMEZONE:{CALENDAR_TZ}",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+        *VTIMEZONE,
+    ]
+    for weekday, day_key in enumerate(WEEKDAYS):
+        first = start + timedelta(days=(weekday - start.weekday()) % 7)
+        for number, (subject, room) in sorted(lessons.get((day_key, class_name), {}).items()):
+            bell = times.get(number)
+            if bell is None:
+                continue
+            # UID стабільний між перебудовами — клієнт оновлює подію, а не дублює її
+            uid = hashlib.sha1(f"{class_name}/{shift}/{day_key}/{number}".encode()).hexdigest()[:16]
+            day = first.strftime("%Y%m%d")
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{uid}@norm_ai",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART;TZID={CALENDAR_TZ}:{day}T{bell['start'].replace(':', '')}00",
+                f"DTEND;TZID={CALENDAR_TZ}:{day}T{bell['end'].replace(':', '')}00",
+                f"RRULE:FREQ=WEEKLY;BYDAY={BYDAY[weekday]};UNTIL={until}",
+                f"SUMMARY:{escape(f'{number}. {subject}')}",
+            ]
+            if room:
+                lines.append(f"LOCATION:{escape(f'каб. {room}')}")
+            lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(fold(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+class Feed:
+    __slots__ = ("body", "etag", "modified", "last_modified")
+
+    def __init__(self, body, modified):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:20]}"'
+        self.modified = int(modified)
+        self.last_modified = formatdate(self.modified, usegmt=True)
+
+
+class CalendarFeeds:
+    """Готові фіди на (клас, зміна); перебудова — при зміні розкладу або навчального року"""
+
+    def __init__(self, classes=ALL_CLASSES, loader=load_schedule):
+        self.classes = {name.upper(): name for name in classes}
+        self.loader = loader
+        self.feeds = None
+        # Попередня збірка переживає invalidate: з нею порівнюються тіла, щоб знати, чи зсувати Last-Modified
+        self.last = {}
+        self.year = None
+        self._building = None
+        self.served = 0
+        self.not_modified = 0
+
+    def build(self):
+        schedule = self.loader()
+        year = school_year(date.today())
+        sources = max((os.path.getmtime(path) for path in (SCHEDULE_FILE, BELLS_FILE) if os.path.exists(path)),
+                      default=time.time())
+        # Новий навчальний рік міняє фід без зміни файлів: дата не може бути старшою за 1 серпня цього року
+        modified = max(sources, time.mktime(date(year[0].year, 8, 1).timetuple()))
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(modified))
+        feeds = {}
+        for name in self.classes.values():
+            for shift in SHIFTS:
+                body = render(name, shift, schedule.lessons, schedule.bells, *year, stamp)
+                previous = self.last.get((name, shift))
+                if previous is None:
+                    at = modified
+                elif previous.body == body:
+                    at = previous.modified
+                else:
+                    # Тіло змінилося — Last-Modified строго новіший, інакше If-Modified-Since дасть хибний 304
+                    at = max(modified, previous.modified + 1, time.time())
+                feeds[name, shift] = Feed(body, at)
+        self.feeds = self.last = feeds
+        self.year = year
+        return self.feeds
+
+    def invalidate(self):
+        self.feeds = None
+
+    async def ready(self):
+        if self.feeds is None or self.year != school_year(date.today()):
+            # Одна збірка в потоці на всі паралельні запити
+            if self._building is None:
+                self._building = asyncio.ensure_future(asyncio.to_thread(self.build))
+            try:
+                await self._building
+            finally:
+                self._building = None
+        return self.feeds
+
+    def find(self, target):
+        """(клас, зміна) з шляху запиту або None"""
+        url = urlsplit(target)
+        name = unquote(url.path[len(CALENDAR_PATH):])
+        if name.lower().endswith(".ics"):
+            name = name[:-4]
+        class_name = self.classes.get(name.upper())
+        shift = parse_qs(url.query).get("shift", ["1"])[0]
+        if class_name is None or shift not in ("1", "2"):
+            return None
+        return class_name, int(shift)
+
+    async def handle(self, target, headers):
+        """(статус, заголовки, тіло) для GET /calendar/...; headers — мапа з заголовками запиту в нижньому регістрі"""
+        key = self.find(target)
+        if key is None:
+            return 404, {"Content-Type": "text/plain; charset=utf-8"}, b"Unknown class or shift"
+        feed = (await self.ready())[key]
+        response = {
+            "ETag": feed.etag,
+            "Last-Modified": feed.last_modified,
+            "Cache-Control": "public, max-age=3600",
+        }
+        if self.fresh(feed, headers.get("if-none-match"), headers.get("if-modified-since")):
+            self.not_modified += 1
+            return 304, response, b""
+        self.served += 1
+        response["Content-Type"] = "text/calendar; charset=utf-8"
+        return 200, response, feed.body
+
+    @staticmethod
+    def fresh(feed, if_none_match, if_modified_since):
+        if if_none_match:
+            # If-None-Match важливіший за дату; W/ — слабкий ETag, для GET порівнюється так само
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or feed.etag in tags
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= feed.modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def report(self):
+        return f"📲 Календарі: віддано {self.served}, без змін (304) {self.not_modified}"
+
+
+def feed_url(class_name, shift=1):
+    """Публічне посилання на фід або None, якщо адреса сервісу невідома"""
+    if not CALENDAR_URL:
+        return None
+    url = f"{CALENDAR_URL.rstrip('/')}{CALENDAR_PATH}{quote(class_name)}.ics"
+    return url if shift == 1 else f"{url}?shift={shift}"
+
+
+# Один на процес: фіди віддає health server у main.py, бот лише скидає кеш при зміні розкладу
+CALENDARS = CalendarFeeds()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Календар класу у форматі .ics")
+    parser.add_argument("class_name")
+    parser.add_argument("--shift", type=int, choices=SHIFTS, default=1)
+    args = parser.parse_args()
+    feeds = CALENDARS.build()
+    key = (CALENDARS.classes.get(args.class_name.upper()), args.shift)
+    if key not in feeds:
+        parser.error(f"невідомий клас {args.class_name}")
+    print(feeds[key].body.decode("utf-8"), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import datetime
 
@@ -5,9 +6,157 @@ MAX_LEN = 3900
 SHORT_MAX_TOKENS = 420
 DETAIL_MAX_TOKENS = 900
 
+AI_HISTORY_TURNS = 8
+AI_CONTEXT_TOKENS = 3000
+AI_HISTORY_IDLE_TTL = 30 * 60
+AI_HISTORY_MAX_USERS = 5000
+AI_SUMMARY_CHARS = 400
+AI_CHARS_PER_TOKEN = 3
+
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_MODEL_LITE = "gemini-2.5-flash-lite"
+
+# Ліміти на один ключ за рівнем доступу. API_KEYS — кілька ключів через кому, рівень ключа — після двокрапки
+# ("AIza...:tier1"), інакше GEMINI_TIER. GEMINI_LIMITS — JSON поверх рівня, напр. {"gemini-2.5-flash": {"rpm": 30}}.
+# Рівень "none" — без локального обмеження, лише реакція на 429 від API
+GEMINI_TIERS = {
+    "free": {
+        "gemini-2.5-flash": {"rpm": 10, "tpm": 250_000},
+        "gemini-2.5-flash-lite": {"rpm": 15, "tpm": 250_000},
+    },
+    "tier1": {
+        "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+        "gemini-2.5-flash-lite": {"rpm": 4000, "tpm": 4_000_000},
+    },
+    "none": {},
+}
+GEMINI_TIER = os.getenv("GEMINI_TIER", "free")
+GEMINI_LIMITS = json.loads(os.getenv("GEMINI_LIMITS") or "{}")
+GEMINI_KEY_COOLDOWN = 60
+
+# Явний кеш контексту: тільки для інструкцій, довших за мінімум, який приймає API
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE", "1") != "0"
+CONTEXT_CACHE_MIN_CHARS = 4000
+CONTEXT_CACHE_TTL = 3600
+CONTEXT_CACHE_REFRESH = 300
+CONTEXT_CACHE_RETRY = 600
+
+# Стійкість викликів Gemini
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+GEMINI_ATTEMPT_TIMEOUT = 15
+GEMINI_DEADLINE = 25
+GEMINI_RETRIES = 2
+GEMINI_RETRY_BASE = 0.5
+GEMINI_RETRY_MAX = 8
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "0") == "1"
+GEMINI_HEDGE_MIN_DELAY = 2.0
+GEMINI_MAX_WORKERS = 16
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 30
+ANSWER_CACHE_SIZE = 500
+
+# Семантичний кеш відповідей (потрібен numpy): off / local (хешовані n-грами, без мережі) / gemini (embeddings API)
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "off")
+# Поріг косинусної подібності для кожного ембедера: вище — віддаємо збережену відповідь
+SEMANTIC_THRESHOLDS = {"local": 0.8, "gemini": 0.92}
+SEMANTIC_CACHE_SIZE = 2000
+SEMANTIC_CACHE_TTL = 7 * 86400
+SEMANTIC_DIM = 512
+SEMANTIC_EMBED_MODEL = "text-embedding-004"
+
+BATCH_DIR = 'batch_jobs'
+BATCH_CONCURRENCY = 4
+BATCH_MAX_ITEMS = 200
+BATCH_PROGRESS_EVERY = 5
+# Скільки завершених завдань тримати в пам'яті (список в адмінці, кнопки "розіслати" / "повторити")
+BATCH_KEEP = 20
+
+# Ліміти Telegram на вихідні повідомлення
+SEND_QUEUE = os.getenv("SEND_QUEUE", "1") != "0"
+SEND_GLOBAL_RATE = 30
+SEND_CHAT_RATE = 1.0
+SEND_CHAT_BURST = 3
+SEND_MAX_RETRIES = 3
+
+# Ліміти на користувача: клас дії -> (запитів на хвилину, сплеск)
+RATE_LIMITS = {
+    "ai": (6, 3),
+    "admin": (20, 5),
+    "batch": (2, 1),
+}
+# Пароль адміна: після безкоштовних спроб — блокування 30 с, 60 с, 120 с... до години; забуваємо за добу
+PASSWORD_FREE_ATTEMPTS = 3
+PASSWORD_LOCKOUT_BASE = 30
+PASSWORD_LOCKOUT_MAX = 3600
+PASSWORD_FORGET = 86400
+
+# Нагадування перед уроками і ранковий розклад
+SUBSCRIPTIONS_FILE = 'subscriptions.json'
+REMIND_BEFORE_MINUTES = 5
+DIGEST_TIME = "07:00"
+NOTIFY_BATCH = 500
+
+# Пул процесів для форматування довгих відповідей (0 — вимкнено); поріг з benchmarks/bench_workers.py
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "0"))
+OFFLOAD_MIN_CHARS = 20000
+
+# Кілька реплік: спільний стан у Redis (без REDIS_URL — у пам'яті процесу), вебхук замість polling
+REDIS_URL = os.getenv("REDIS_URL")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = "/webhook"
+LEADER_TTL = 15
+LOCK_TTL = 60
+SESSION_TTL = 30 * 86400
+STATS_FLUSH = 10
+
+# Заміни уроків на конкретні дати (append-only журнал)
+OVERRIDES_FILE = 'overrides.jsonl'
+# Як швидко заміни, внесені через іншу репліку, з'являються в текстах цієї
+OVERRIDES_REFRESH = 5
+
+# Inline-режим: Telegram сам кешує відповіді на однакові запити
+INLINE_CACHE_TIME = 3600
+INLINE_MAX_RESULTS = 50
+
 ADMINS_FILE = 'admins.json'
 SCHEDULE_FILE = 'schedule_full.json'
 BELLS_FILE = 'bells_schedule.json'
+# Календар .ics для телефона з того ж порту, що й health check; CALENDAR_URL — публічна адреса сервісу
+# (на Render береться з RENDER_EXTERNAL_URL)
+CALENDAR_PATH = "/calendar/"
+CALENDAR_TZ = "Europe/Kyiv"
+CALENDAR_URL = os.getenv("CALENDAR_URL") or os.getenv("RENDER_EXTERNAL_URL") or WEBHOOK_URL
+
+# Зупинка за SIGTERM (Render чекає 30 с до SIGKILL): спершу /readyz -> 503 на SHUTDOWN_GRACE,
+# потім злив хендлерів і розсилок; SHUTDOWN_DEADLINE рахується від сигналу
+SHUTDOWN_GRACE = float(os.getenv("SHUTDOWN_GRACE", 3))
+SHUTDOWN_DEADLINE = float(os.getenv("SHUTDOWN_DEADLINE", 25))
+SESSIONS_FILE = 'sessions.json'
+BROADCAST_CHECKPOINT_FILE = 'broadcasts_pending.json'
+
+# Апдейти після рестарту: не викидаємо накопичене, а обробляємо з обмеженням швидкості і без повторів
+UPDATE_RESUME = os.getenv("UPDATE_RESUME", "1") != "0"
+UPDATE_JOURNAL_FILE = 'update_journal.json'
+UPDATE_JOURNAL_FLUSH = 2
+UPDATE_RECENT_SIZE = 2048
+UPDATE_BACKLOG_RATE = 20
+UPDATE_CLAIM_TTL = 86400
+
+# Журнал подій (рядок JSON на апдейт) для аналітики в адмінці; EVENT_LOG_SALT — ключ хешу id користувачів
+# (без нього при першому старті генерується випадковий і зберігається в EVENT_LOG_DIR/.salt)
+EVENT_LOG_ENABLED = os.getenv("EVENT_LOG", "1") != "0"
+EVENT_LOG_DIR = 'logs'
+EVENT_LOG_MAX_BYTES = 5 * 1024 * 1024
+EVENT_LOG_BACKUPS = 5
+EVENT_LOG_FLUSH = 5
+EVENT_LOG_BUFFER = 1000
+EVENT_LOG_SALT = os.getenv("EVENT_LOG_SALT", "")
+ANALYTICS_DAYS = 7
+
+# Розібраний розклад + індекс уроків для швидкого старту (schedule_snapshot.py)
+SNAPSHOT_FILE = 'schedule.snapshot'
+# Як часто кожна репліка перевіряє хеш джерел розкладу (import_schedule.py, деплой нових json)
+SCHEDULE_RELOAD_INTERVAL = int(os.getenv("SCHEDULE_RELOAD_INTERVAL", "60"))
 INSTRUCTIONS_FILE = 'instructions.json'
 
 CLASS_ICON = "● "
@@ -51,6 +200,12 @@ ALL_CLASSES = [
 MONOBANK_URL = "https://send.monobank.ua/jar/96YBXc4K6g"
 
 LOADING_FRAMES = ["⏳", "⌛", "⏳", "⌛"]
+LOADING_FRAME_DELAY = 0.2
+
+PROFILE_MAX_SECONDS = 300
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOP = 40
+PROFILE_TRACEMALLOC_FRAMES = 10
 
 class Stats:
     def __init__(self):
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+
+from resilience import classify
+
+from config import CONTEXT_CACHE_MIN_CHARS, CONTEXT_CACHE_REFRESH, CONTEXT_CACHE_RETRY, CONTEXT_CACHE_TTL
+
+
+def cache_missing(error) -> bool:
+    """Помилка означає, що кешу на боці API вже немає (протух або видалений), а не збій сервісу"""
+    code, _, _ = classify(error)
+    text = str(error)
+    return code == 404 or "NOT_FOUND" in text or "cached_content" in text.lower() or "cachedcontent" in text.lower()
+
+
+class _Entry:
+    __slots__ = ("digest", "name", "expires_at")
+
+    def __init__(self, digest, name, expires_at):
+        self.digest = digest
+        self.name = name
+        self.expires_at = expires_at
+
+
+class InstructionCache:
+    """Явний кеш контексту Gemini для довгих системних інструкцій режимів.
+
+    Інструкція завантажується один раз, далі запити посилаються на неї за іменем кешу.
+    Якщо кеш недоступний — повертаємо None, і клієнт шле інструкцію інлайн.
+    Блокування на (режим, модель): створення кешу одного режиму не гальмує запити інших.
+    """
+
+    def __init__(self, client, ttl=CONTEXT_CACHE_TTL, min_chars=CONTEXT_CACHE_MIN_CHARS):
+        self.client = client
+        self.ttl = ttl
+        self.min_chars = min_chars
+        self._entries = {}
+        self._failed_until = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def get(self, mode: str, instruction: str, model: str):
+        if len(instruction) < self.min_chars:
+            return None
+        from google.genai import types
+
+        key = (mode, model)
+        digest = hashlib.sha1(instruction.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+
+        with self._key_lock(key):
+            if self._failed_until.get(key, 0) > now:
+                return None
+
+            entry = self._entries.get(key)
+            try:
+                if entry and entry.digest == digest:
+                    if entry.expires_at - now > CONTEXT_CACHE_REFRESH:
+                        return entry.name
+                    # Продовжуємо TTL замість повторного завантаження
+                    self.client.caches.update(
+                        name=entry.name,
+                        config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+                    )
+                    entry.expires_at = now + self.ttl
+                    return entry.name
+
+                if entry:
+                    self._delete(entry)
+                cache = self.client.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=instruction,
+                        display_name=f"mode-{mode}",
+                        ttl=f"{self.ttl}s",
+                    ),
+                )
+                self._entries[key] = _Entry(digest, cache.name, now + self.ttl)
+                return cache.name
+            except Exception as e:
+                print(f"⚠️ Кеш контексту для '{mode}' недоступний: {str(e)[:100]}")
+                self._entries.pop(key, None)
+                self._failed_until[key] = now + CONTEXT_CACHE_RETRY
+                return None
+
+    def invalidate(self, mode: str):
+        """Інструкція режиму змінилась — видаляємо його кеші на всіх моделях"""
+        for key in [k for k in list(self._entries) + list(self._failed_until) if k[0] == mode]:
+            with self._key_lock(key):
+                entry = self._entries.pop(key, None)
+                if entry:
+                    self._delete(entry)
+                self._failed_until.pop(key, None)
+
+    def forget(self, mode: str, model: str):
+        """API відповів, що кешу вже немає: наступний get створить новий, видаляти нічого"""
+        with self._key_lock((mode, model)):
+            self._entries.pop((mode, model), None)
+
+    def _delete(self, entry):
+        try:
+            self.client.caches.delete(name=entry.name)
+        except Exception:
+            pass
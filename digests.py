@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+from config import ALL_CLASSES, DAYS_UA_REVERSE
+
+# Субота і неділя показують понеділок — так само, як кнопки "Сьогодні" / "Завтра"
+WEEKDAY_KEYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "monday", "monday"]
+
+
+def school_day(day):
+    """Дата, розклад якої показуємо: вихідні переходять на наступний понеділок"""
+    return day + timedelta(days=7 - day.weekday()) if day.weekday() >= 5 else day
+
+
+class DigestCache:
+    """Готові тексти розкладу на (клас, день): рахуються раз на зміну розкладу або дати, а не на користувача"""
+
+    def __init__(self, render_day, render_week, classes=ALL_CLASSES, overrides=None):
+        self.render_day = render_day
+        self.render_week = render_week
+        self.classes = list(classes)
+        self.overrides = overrides
+        self.version = 0
+        self._days = None
+        self._weeks = None
+        self._dated = {}
+        self._dated_on = None
+
+    def invalidate(self):
+        """Викликати після зміни розкладу — наступне звернення перерахує все"""
+        self.version += 1
+        self._days = None
+        self._weeks = None
+        self._dated = {}
+
+    def invalidate_dated(self, class_name):
+        """Заміна уроку зачіпає лише "сьогодні" / "завтра" одного класу — решту кешу не чіпаємо"""
+        self._dated.pop((class_name, 0), None)
+        self._dated.pop((class_name, 1), None)
+
+    def _build(self):
+        self._days = {
+            (class_name, day_key): self.render_day(class_name, day_key)
+            for class_name in self.classes for day_key in DAYS_UA_REVERSE
+        }
+        self._weeks = {class_name: self.render_week(class_name) for class_name in self.classes}
+
+    def day(self, class_name, day_key):
+        if self._days is None:
+            self._build()
+        text = self._days.get((class_name, day_key))
+        # Клас поза списком (старий стан користувача) рахуємо без кешу
+        return text if text is not None else self.render_day(class_name, day_key)
+
+    def week(self, class_name):
+        if self._weeks is None:
+            self._build()
+        text = self._weeks.get(class_name)
+        return text if text is not None else self.render_week(class_name)
+
+    def dated(self, class_name, offset=0, today=None):
+        """Розклад на сьогодні (0) / завтра (1) з підписом; кеш скидається з переходом дати"""
+        today = today or date.today()
+        if self._dated_on != today:
+            self._dated = {}
+            self._dated_on = today
+        key = (class_name, offset)
+        text = self._dated.get(key)
+        if text is None:
+            on = school_day(today + timedelta(days=offset))
+            day_key = WEEKDAY_KEYS[on.weekday()]
+            day_name = DAYS_UA_REVERSE.get(day_key, "")
+            label = "СЬОГОДНІ" if offset == 0 else "ЗАВТРА"
+            patches = self.overrides.for_class(on, class_name) if self.overrides else None
+            base = self.render_day(class_name, day_key, patches) if patches else self.day(class_name, day_key)
+            text = self._dated[key] = base.replace(day_name, f"{label} ({day_name})")
+        return text
+
+    def today(self, class_name):
+        return self.dated(class_name, 0)
+
+    def tomorrow(self, class_name):
+        return self.dated(class_name, 1)
@@ -0,0 +1,289 @@
+"""Журнал подій бота (рядок JSON на апдейт) і потокова аналітика над ним.
+
+    python event_log.py --days 7          # той самий звіт, що й кнопка "📈 Аналітика" в адмінці
+
+Поля рядка: ts — час (с), ev — тип апдейту, h — хендлер, ms — затримка, u — хеш користувача,
+c — клас, m — режим AI, ti / to — токени запиту і відповіді, err — хендлер упав.
+Журнал ротується за розміром: events.jsonl -> events.1.jsonl -> ... -> events.N.jsonl.
+"""
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import json
+import math
+import os
+import secrets
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from aiogram import BaseMiddleware
+
+from config import (
+    ANALYTICS_DAYS, EVENT_LOG_BACKUPS, EVENT_LOG_BUFFER, EVENT_LOG_DIR, EVENT_LOG_FLUSH, EVENT_LOG_MAX_BYTES,
+    EVENT_LOG_SALT,
+)
+
+LOG_NAME = "events"
+_fields = contextvars.ContextVar("event_fields", default=None)
+
+
+def load_salt(directory=EVENT_LOG_DIR):
+    """Ключ хешу id: випадковий, створюється раз і лежить поруч із журналом — без нього хеш перебирається"""
+    path = os.path.join(directory, ".salt")
+    try:
+        with open(path, "rb") as f:
+            salt = f.read().strip()
+        if salt:
+            return salt
+    except FileNotFoundError:
+        pass
+    os.makedirs(directory, exist_ok=True)
+    salt = secrets.token_hex(32).encode()
+    tmp = path + ".tmp"
+    with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+        f.write(salt)
+    os.replace(tmp, path)
+    return salt
+
+
+def annotate(**fields):
+    """Додає поля до події поточного апдейту (токени, ...); поза апдейтом нічого не робить"""
+    current = _fields.get()
+    if current is not None:
+        current.update(fields)
+
+
+class EventLog(BaseMiddleware):
+    """Буферизований асинхронний запис: хендлер лише кладе рядок у список, на диск — пачками з потоку"""
+
+    def __init__(self, directory=EVENT_LOG_DIR, max_bytes=EVENT_LOG_MAX_BYTES, backups=EVENT_LOG_BACKUPS,
+                 flush_every=EVENT_LOG_FLUSH, buffer_size=EVENT_LOG_BUFFER, salt=EVENT_LOG_SALT, context=None):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{LOG_NAME}.jsonl")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_every = flush_every
+        self.buffer_size = buffer_size
+        # Порожня сіль — відома всім, тож замість неї береться (або створюється) випадкова з load_salt
+        self.salt = salt.encode() if salt else None
+        # context(user_id) -> додаткові поля (клас, режим), читається вже після хендлера
+        self.context = context
+        self.buffer = []
+        self.written = 0
+        self.dropped = 0
+        self.task = None
+        self._wake = None
+
+    def user_hash(self, user_id: int) -> str:
+        if self.salt is None:
+            self.salt = load_salt(self.directory)
+        return hashlib.blake2b(str(user_id).encode(), key=self.salt, digest_size=6).hexdigest()
+
+    async def __call__(self, handler, event, data):
+        fields = {}
+        token = _fields.set(fields)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            fields["err"] = 1
+            raise
+        finally:
+            _fields.reset(token)
+            callback = getattr(data.get("handler"), "callback", None)
+            user = data.get("event_from_user")
+            record = {
+                "ts": int(time.time()),
+                "ev": type(event).__name__.lower(),
+                "h": getattr(callback, "__name__", "?"),
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            if user is not None:
+                record["u"] = self.user_hash(user.id)
+                if self.context:
+                    record.update(self.context(user.id))
+            record.update(fields)
+            self.record(record)
+
+    def record(self, event: dict):
+        if len(self.buffer) >= self.buffer_size * 10:
+            # Диск не встигає — краще втратити аналітику, ніж пам'ять
+            self.dropped += 1
+            return
+        self.buffer.append(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+        if len(self.buffer) >= self.buffer_size and self._wake:
+            self._wake.set()
+
+    def start(self):
+        if self.task is None:
+            self._wake = asyncio.Event()
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_every)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Журнал подій: {e}")
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        await asyncio.to_thread(self._write, lines)
+        self.written += len(lines)
+
+    def _write(self, lines):
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            older = os.path.join(self.directory, f"{LOG_NAME}.{i}.jsonl")
+            if os.path.exists(older):
+                os.replace(older, os.path.join(self.directory, f"{LOG_NAME}.{i + 1}.jsonl"))
+        os.replace(self.path, os.path.join(self.directory, f"{LOG_NAME}.1.jsonl"))
+
+
+# ---------- аналітика: конвеєр генераторів, файл ніколи не вантажиться цілком ----------
+
+def log_files(directory=EVENT_LOG_DIR, backups=EVENT_LOG_BACKUPS):
+    """Файли журналу від найстарішого до поточного"""
+    names = [f"{LOG_NAME}.{i}.jsonl" for i in range(backups, 0, -1)] + [f"{LOG_NAME}.jsonl"]
+    for name in names:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            yield path
+
+
+def read_lines(paths):
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+def parse_events(lines):
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Недописаний рядок після аварійної зупинки
+            continue
+
+
+def since(events, cutoff):
+    return (event for event in events if event.get("ts", 0) >= cutoff)
+
+
+class LatencyHistogram:
+    """Логарифмічні кошики по 5%: перцентилі з точністю ~5% у сталій пам'яті на будь-якому обсязі"""
+
+    BASE = math.log(1.05)
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+
+    def add(self, ms):
+        self.buckets[math.floor(math.log(max(ms, 0.01)) / self.BASE)] += 1
+        self.count += 1
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return math.exp((bucket + 0.5) * self.BASE)
+        return 0.0
+
+
+def aggregate(events):
+    report = {
+        "events": 0,
+        "users": set(),
+        "classes": Counter(),
+        "minutes": Counter(),
+        "modes": Counter(),
+        "tokens": Counter(),
+        "errors": 0,
+        "latency": LatencyHistogram(),
+        "handlers": defaultdict(LatencyHistogram),
+    }
+    for event in events:
+        report["events"] += 1
+        if "u" in event:
+            report["users"].add(event["u"])
+        if event.get("c"):
+            report["classes"][event["c"]] += 1
+        report["minutes"][event.get("ts", 0) // 60] += 1
+        # Режим рахуємо лише для справжніх AI-запитів (з токенами), а не для навігації в меню AI
+        if event.get("m") and "ti" in event:
+            report["modes"][event["m"]] += 1
+            report["tokens"][event["m"]] += event.get("ti", 0) + event.get("to", 0)
+        report["errors"] += event.get("err", 0)
+        if "ms" in event:
+            report["latency"].add(event["ms"])
+            report["handlers"][event.get("h", "?")].add(event["ms"])
+    return report
+
+
+def format_report(report, days, top=5):
+    if not report["events"]:
+        return f"📈 Аналітика за {days} дн.\n\nПодій ще немає"
+    latency = report["latency"]
+    lines = [
+        f"📈 Аналітика за {days} дн.",
+        "",
+        f"📨 Подій: {report['events']}, користувачів: {len(report['users'])}, помилок: {report['errors']}",
+        f"⏱ Затримка: p50 {latency.percentile(50):.0f} мс, p95 {latency.percentile(95):.0f} мс, "
+        f"p99 {latency.percentile(99):.0f} мс",
+        "",
+        "🏫 Топ класів:",
+    ]
+    lines += [f"• {name}: {count}" for name, count in report["classes"].most_common(top)] or ["• —"]
+    lines += ["", "🕐 Пікові хвилини:"]
+    lines += [f"• {datetime.fromtimestamp(minute * 60):%d.%m %H:%M}: {count}"
+              for minute, count in report["minutes"].most_common(top)]
+    lines += ["", "🤖 Режими AI:"]
+    lines += [f"• {mode}: {count} зап., {report['tokens'][mode]} ток."
+              for mode, count in report["modes"].most_common(top)] or ["• —"]
+    lines += ["", "🐢 Найповільніші хендлери (p95):"]
+    slowest = sorted(report["handlers"].items(), key=lambda item: item[1].percentile(95), reverse=True)
+    lines += [f"• {name}: {hist.percentile(95):.0f} мс ({hist.count})" for name, hist in slowest[:top]]
+    return "\n".join(lines)
+
+
+def analyze(directory=EVENT_LOG_DIR, days=ANALYTICS_DAYS):
+    events = since(parse_events(read_lines(log_files(directory))), time.time() - days * 86400)
+    return format_report(aggregate(events), days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Аналітика журналу подій")
+    parser.add_argument("--dir", default=EVENT_LOG_DIR)
+    parser.add_argument("--days", type=int, default=ANALYTICS_DAYS)
+    args = parser.parse_args()
+    print(analyze(args.dir, args.days))
+
+
+if __name__ == "__main__":
+    main()
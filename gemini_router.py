@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import deque
+
+from config import (
+    CONTEXT_CACHE_ENABLED, GEMINI_ATTEMPT_TIMEOUT, GEMINI_BASE_URL, GEMINI_KEY_COOLDOWN, GEMINI_LIMITS, GEMINI_TIER,
+    GEMINI_TIERS,
+)
+from context_cache import InstructionCache
+
+
+class AllKeysLimited(Exception):
+    """Усі ключі для потрібних моделей вичерпали квоту"""
+
+    code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 усі ключі Gemini в ліміті")
+        self.retry_after = retry_after
+
+
+def tier_limits(tier):
+    """{модель: {"rpm", "tpm"}} для рівня ключа з поправками з GEMINI_LIMITS"""
+    if tier not in GEMINI_TIERS:
+        raise RuntimeError(f"Невідомий рівень ключа Gemini: {tier} (є: {', '.join(GEMINI_TIERS)})")
+    limits = {model: dict(values) for model, values in GEMINI_TIERS[tier].items()}
+    for model, override in GEMINI_LIMITS.items():
+        limits.setdefault(model, {}).update(override)
+    return limits
+
+
+class Reservation:
+    """Запис у вікні, зроблений у pick(): після відповіді токени виправляються, після збою — запис знімається"""
+
+    __slots__ = ("window", "at", "requests", "tokens")
+
+    def __init__(self, window, at, tokens):
+        self.window = window
+        self.at = at
+        self.requests = 1
+        self.tokens = tokens
+
+
+class _Window:
+    """Ковзне вікно запитів і токенів за останню хвилину"""
+
+    __slots__ = ("events", "requests", "tokens")
+
+    SPAN = 60.0
+
+    def __init__(self):
+        self.events = deque()
+        self.requests = 0
+        self.tokens = 0
+
+    def trim(self, now):
+        while self.events and self.events[0].at <= now - self.SPAN:
+            entry = self.events.popleft()
+            self.requests -= entry.requests
+            self.tokens -= entry.tokens
+
+    def reserve(self, now, tokens):
+        entry = Reservation(self, now, tokens)
+        self.events.append(entry)
+        self.requests += 1
+        self.tokens += tokens
+        return entry
+
+    def adjust(self, entry, requests, tokens, now):
+        # Запис, що вже випав з вікна, з сум віднято — його не чіпаємо
+        if entry.at <= now - self.SPAN:
+            return
+        self.requests += requests - entry.requests
+        self.tokens += tokens - entry.tokens
+        entry.requests = requests
+        entry.tokens = tokens
+
+
+class KeyRoute:
+    def __init__(self, name: str, client, limits=None):
+        self.name = name
+        self.client = client
+        self.limits = tier_limits(GEMINI_TIER) if limits is None else limits
+        # Кеш контексту прив'язаний до проєкту ключа, тому в кожного ключа свій
+        self.context_cache = InstructionCache(client) if CONTEXT_CACHE_ENABLED else None
+        self.windows = {}
+        self.cooldown_until = {}
+        self.limited = 0
+
+    def load(self, model: str, now: float, tokens: int):
+        """Частка використаного бюджету після цього запиту, або None якщо ключ зараз недоступний"""
+        if self.cooldown_until.get(model, 0) > now:
+            return None
+        limits = self.limits.get(model) or {}
+        window = self.windows.setdefault(model, _Window())
+        window.trim(now)
+        if not limits:
+            # Без локальних лімітів — просто найменш завантажений ключ, квоту стереже 429 від API
+            return window.requests / 1_000_000
+        rpm = (window.requests + 1) / limits["rpm"] if "rpm" in limits else 0.0
+        tpm = (window.tokens + tokens) / limits["tpm"] if "tpm" in limits else 0.0
+        if rpm > 1 or tpm > 1:
+            return None
+        return max(rpm, tpm)
+
+
+class GeminiRouter:
+    """Розподіляє запити між ключами API і моделями з урахуванням квот"""
+
+    def __init__(self, api_keys):
+        # SDK важкий на імпорт — тягнемо його лише коли роутер справді потрібен
+        from google import genai
+
+        http_options = {"timeout": GEMINI_ATTEMPT_TIMEOUT * 1000}
+        if GEMINI_BASE_URL:
+            http_options["base_url"] = GEMINI_BASE_URL
+        self.routes = []
+        for i, entry in enumerate(api_keys, 1):
+            # "ключ:рівень" — у ключів Gemini двокрапки не буває
+            key, _, tier = entry.partition(":")
+            tier = tier or GEMINI_TIER
+            self.routes.append(KeyRoute(
+                f"key{i}…{key[-4:]}" + (f" ({tier})" if tier != GEMINI_TIER else ""),
+                genai.Client(api_key=key, http_options=http_options),
+                tier_limits(tier),
+            ))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        keys = [k.strip() for k in (os.getenv("API_KEYS") or os.getenv("API_KEY") or "").split(",") if k.strip()]
+        if not keys:
+            raise RuntimeError("ENV API_KEY is empty")
+        return cls(keys)
+
+    def pick(self, models, tokens: int, exclude=()):
+        """(ключ, модель, резерв): найменш завантажений ключ для першої моделі з вільною квотою.
+
+        Запит резервується одразу; резерв потім передається в record() або release()
+        """
+        with self._lock:
+            now = time.monotonic()
+            for model in models:
+                best = None
+                for route in self.routes:
+                    if (route, model) in exclude:
+                        continue
+                    load = route.load(model, now, tokens)
+                    if load is not None and (best is None or load < best[0]):
+                        best = (load, route)
+                if best:
+                    route = best[1]
+                    return route, model, route.windows[model].reserve(now, tokens)
+
+            waits = [
+                until - now for route in self.routes for model in models
+                if (until := route.cooldown_until.get(model, 0)) > now
+            ]
+            raise AllKeysLimited(min(waits) if waits else None)
+
+    def record(self, reservation, used):
+        """Виправляє резерв на фактичну кількість токенів з usage_metadata — у тому ж записі вікна"""
+        if used is None:
+            return
+        with self._lock:
+            reservation.window.adjust(reservation, reservation.requests, used, time.monotonic())
+
+    def release(self, reservation):
+        """Спроба не вдалася (503, таймаут, помилка) — квоту не витрачено, знімаємо резерв"""
+        with self._lock:
+            reservation.window.adjust(reservation, 0, 0, time.monotonic())
+
+    def penalize(self, route, model, retry_after=None):
+        with self._lock:
+            route.cooldown_until[model] = time.monotonic() + (retry_after or GEMINI_KEY_COOLDOWN)
+            route.limited += 1
+
+    def invalidate_mode(self, mode: str):
+        for route in self.routes:
+            if route.context_cache:
+                route.context_cache.invalidate(mode)
+
+    def snapshot(self):
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for route in self.routes:
+                for model, window in route.windows.items():
+                    window.trim(now)
+                    cooling = max(0, route.cooldown_until.get(model, 0) - now)
+                    rows.append((route.name, model, window.requests, window.tokens, cooling, route.limited))
+        return rows
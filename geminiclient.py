@@ -1,16 +1,38 @@
-import os
 import json
 import re
-from google import genai
+import threading
+from functools import partial
+
+from config import GEMINI_MODEL, GEMINI_MODEL_LITE, SHORT_MAX_TOKENS
+from ai_memory import estimate_tokens
+from context_cache import cache_missing
+from gemini_router import GeminiRouter
+from resilience import ResilientCaller, classify
+from semantic_cache import SemanticCache
+from workers import POOL, format_text
 
 class GeminiClient:
     def __init__(self):
-        api_key = os.getenv("API_KEY")
-        if not api_key:
-            raise RuntimeError("ENV API_KEY is empty")
-        self.client = genai.Client(api_key=api_key)
+        self._router = None
+        self._router_lock = threading.Lock()
+        self.semantic = SemanticCache.from_env(self.embed)
+        self.caller = ResilientCaller()
         self.instructions_file = "instructions.json"
 
+    @property
+    def router(self):
+        """SDK і клієнти Gemini створюються при першому AI-запиті, а не під час старту"""
+        if self._router is None:
+            with self._router_lock:
+                if self._router is None:
+                    self._router = GeminiRouter.from_env()
+        return self._router
+
+    @property
+    def router_if_built(self):
+        """Роутер, якщо він уже є; для звітів, які не повинні імпортувати SDK на event loop"""
+        return self._router
+
     def _load_instructions(self):
         try:
             with open(self.instructions_file, "r", encoding="utf-8") as f:
@@ -39,60 +61,118 @@ class GeminiClient:
     def add_mode(self, mode_name: str, instruction: str):
         data = self._load_instructions()
         data[mode_name] = instruction
+        if self._router:
+            self._router.invalidate_mode(mode_name)
         return self._save_instructions(data)
 
     def delete_mode(self, mode_name: str):
         data = self._load_instructions()
         if mode_name in data and mode_name not in ["assistant", "programmer"]:
             del data[mode_name]
+            if self._router:
+                self._router.invalidate_mode(mode_name)
             return self._save_instructions(data)
         return False
 
     def format_response(self, text: str) -> str:
-        """Форматує відповідь для красивого виведення"""
-        if not text:
-            return ""
-        
-        lines = text.split('\n')
-        formatted = []
-        
-        for line in lines:
-            if line.startswith('# '):
-                formatted.append(f"*{line[2:]}*")
-            elif line.startswith('## '):
-                formatted.append(f"*{line[3:]}*")
-            elif line.startswith('### '):
-                formatted.append(f"*{line[4:]}*")
-            elif line.startswith('- '):
-                formatted.append(f"• {line[2:]}")
-            elif line.startswith('* ') and not line.startswith('**'):
-                formatted.append(f"• {line[2:]}")
-            elif '**' in line:
-                formatted.append(line.replace('**', '*'))
-            else:
-                formatted.append(line)
-        
-        return '\n'.join(formatted)
+        """Форматує відповідь для красивого виведення (Telegram HTML); довгі — у пулі процесів"""
+        return POOL.call(format_text, text, size=len(text))
+
+    def build_contents(self, prompt: str, history=None):
+        contents = []
+        for question, answer in history or []:
+            contents.append({"role": "user", "parts": [{"text": question}]})
+            contents.append({"role": "model", "parts": [{"text": answer}]})
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        return contents
+
+    def _call(self, route, model: str, contents, mode: str, system_instruction: str):
+        cache = route.context_cache
+        cache_name = cache.get(mode, system_instruction, model) if cache else None
 
-    def ask(self, prompt: str, mode: str = "assistant", max_output_tokens: int = 420, temperature: float = 0.4) -> str:
         try:
-            instructions = self._load_instructions()
-            system_instruction = instructions.get(mode, instructions.get("assistant", ""))
-            
-            format_instruction = "\n\nВикористовуй форматування: # заголовки, - списки, **жирний**, `код`."
-            system_instruction += format_instruction
-
-            config = {"system_instruction": system_instruction}
-            resp = self.client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
-                config=config,
+            return route.client.models.generate_content(
+                model=model,
+                contents=contents,
+                config={"cached_content": cache_name} if cache_name else {"system_instruction": system_instruction},
             )
-            
-            response = resp.text if getattr(resp, "text", None) else "Порожня відповідь."
-            return self.format_response(response)
-            
         except Exception as e:
-            if "429" in str(e):
-                return "Ліміт вичерпано. Почекай і повтори."
-            return f"Помилка API: {e}"
\ No newline at end of file
+            # 503, таймаути й ліміти — до повторів і хеджування: кеш тут ні до чого, а повторне
+            # завантаження інструкції лише подвоїло б трафік під час перевантаження
+            if not cache_name or not cache_missing(e):
+                raise
+            # Кеш протух на боці API — забуваємо його і повторюємо з інструкцією інлайн
+            cache.forget(mode, model)
+            return route.client.models.generate_content(
+                model=model,
+                contents=contents,
+                config={"system_instruction": system_instruction},
+            )
+
+    def _routed(self, models, tokens: int, request):
+        """request(route, model) через найменш завантажений ключ; квота рахується в роутері"""
+        tried = set()
+        while True:
+            route, model, reservation = self.router.pick(models, tokens, tried)
+            tried.add((route, model))
+            try:
+                resp = request(route, model)
+            except Exception as e:
+                self.router.release(reservation)
+                code, _, retry_after = classify(e)
+                if code != 429:
+                    raise
+                # Ключ у ліміті — тихо переходимо на наступний
+                self.router.penalize(route, model, retry_after)
+                continue
+
+            usage = getattr(resp, "usage_metadata", None)
+            self.router.record(reservation, getattr(usage, "total_token_count", None))
+            return resp
+
+    def _generate(self, contents, mode: str, system_instruction: str, models, tokens: int) -> str:
+        resp = self._routed(models, tokens, lambda route, model: self._call(route, model, contents, mode, system_instruction))
+        return resp.text if getattr(resp, "text", None) else "Порожня відповідь."
+
+    def embed(self, text: str, model: str):
+        """Ембединг для семантичного кешу — через ті самі ключі й ліміти, що й генерація"""
+        resp = self._routed((model,), estimate_tokens(text),
+                            lambda route, model: route.client.models.embed_content(model=model, contents=text))
+        return resp.embeddings[0].values
+
+    def ask(self, prompt: str, mode: str = "assistant", max_output_tokens: int = 420, temperature: float = 0.4, history=None,
+            question: str = None, fallback: bool = True) -> str:
+        """Повертає відформатовану відповідь або кидає GeminiUnavailable з текстом для користувача.
+
+        question — питання користувача без службових інструкцій, ключ семантичного кешу;
+        fallback=False — без збереженої відповіді, коли API недоступний
+        """
+        semantic_key = (mode, max_output_tokens > SHORT_MAX_TOKENS)
+        vector = None
+        if self.semantic and question and not history:
+            cached, vector = self.semantic.lookup(semantic_key, question)
+            if cached:
+                return self.format_response(cached)
+
+        instructions = self._load_instructions()
+        system_instruction = instructions.get(mode, instructions.get("assistant", ""))
+        
+        format_instruction = "\n\nВикористовуй форматування: # заголовки, - списки, **жирний**, `код`."
+        system_instruction += format_instruction
+
+        contents = self.build_contents(prompt, history) if history else prompt
+        # Короткі відповіді — на легшу модель, детальні — на основну; інша лишається запасною
+        if max_output_tokens > SHORT_MAX_TOKENS:
+            models = (GEMINI_MODEL, GEMINI_MODEL_LITE)
+        else:
+            models = (GEMINI_MODEL_LITE, GEMINI_MODEL)
+        tokens = estimate_tokens(system_instruction) + estimate_tokens(prompt) + max_output_tokens
+        tokens += sum(estimate_tokens(q) + estimate_tokens(a) for q, a in history or [])
+
+        response = self.caller.call(
+            lambda: self._generate(contents, mode, system_instruction, models, tokens),
+            cache_key=(mode, prompt),
+            on_success=partial(self.semantic.store, semantic_key, vector) if vector is not None else None,
+            fallback=fallback,
+        )
+        return self.format_response(response)
\ No newline at end of file
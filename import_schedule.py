@@ -0,0 +1,312 @@
+"""Імпорт розкладу з CSV / XLSX / JSON у канонічний schedule_full.json з перевіркою і диффом.
+
+    python import_schedule.py export.csv --dry-run
+    python import_schedule.py export.xlsx --sheet Розклад
+    python import_schedule.py school_schedule.json --output schedule_full.json
+
+Підтримуються два види таблиць:
+  * довга — колонки день, урок, клас, предмет, кабінет (рядок на урок класу);
+  * широка — колонки день, урок і по колонці на клас, у клітинці "ПРЕДМЕТ 201" або "ПРЕДМЕТ / 201".
+Рядки читаються потоково, тож пам'ять обмежена розміром самого розкладу, а не файлу.
+Помилки валідації завершують процес з кодом 1 і нічого не записують.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+from config import ALL_CLASSES, BELLS_FILE, DAYS_UA, SCHEDULE_FILE
+
+MAX_ERRORS = 50
+
+DAY_NAMES = {
+    **{name.lower(): key for name, key in DAYS_UA.items()},
+    **{key: key for key in DAYS_UA.values()},
+    "пн": "monday", "вт": "tuesday", "ср": "wednesday", "чт": "thursday", "пт": "friday",
+    "п’ятниця": "friday", "пятниця": "friday",
+    "mon": "monday", "tue": "tuesday", "wed": "wednesday", "thu": "thursday", "fri": "friday",
+}
+HEADERS = {
+    "day": {"day", "день", "дні"},
+    "lesson": {"lesson", "lesson_number", "урок", "№", "номер"},
+    "class": {"class", "клас"},
+    "subject": {"subject", "предмет"},
+    "room": {"room", "кабінет", "каб", "каб."},
+}
+LATIN_LETTERS = str.maketrans({"A": "А", "B": "Б", "V": "В", "G": "Г"})
+CLASS_RE = re.compile(r"^\s*(\d{1,2})\s*-?\s*([^\W\d_])\s*$")
+ROOM_PREFIX_RE = re.compile(r"^(?:каб(?:інет)?\.?\s*)", re.IGNORECASE)
+CELL_RE = re.compile(r"^(.*?)(?:\s*/\s*|\s*\(\s*(?:каб\.?\s*)?|\s+(?:каб\.?\s*)?)(\d[\w/.-]*)\)?\s*$", re.IGNORECASE)
+
+
+# Значення в таблиці повторюються тисячі разів — нормалізуємо кожне один раз
+@lru_cache(maxsize=4096)
+def normalize_class(value):
+    match = CLASS_RE.match(str(value or ""))
+    if not match:
+        return None
+    return f"{match.group(1)}-{match.group(2).upper().translate(LATIN_LETTERS)}"
+
+
+@lru_cache(maxsize=4096)
+def normalize_room(value):
+    """None, "", 201, 201.0, "каб. 201" -> рядок без префікса; рядок у json завжди str"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    room = ROOM_PREFIX_RE.sub("", str(value).strip())
+    return room[:-2] if re.fullmatch(r"\d+\.0", room) else room
+
+
+@lru_cache(maxsize=4096)
+def normalize_subject(value):
+    return " ".join(str(value or "").split()).upper()
+
+
+def split_cell(value):
+    """Клітинка широкої таблиці: "ФІЗИКА 201", "ФІЗИКА / 201", "ФІЗИКА (каб. 201)" -> (предмет, кабінет)"""
+    text = " ".join(str(value or "").split())
+    match = CELL_RE.match(text)
+    if match and match.group(1):
+        return match.group(1), match.group(2)
+    return text, ""
+
+
+def allowed_lessons(bells_file=BELLS_FILE):
+    try:
+        with open(bells_file, "r", encoding="utf-8") as f:
+            bells = json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ {bells_file} не знайдено — номери уроків не перевіряються")
+        return None
+    return {lesson["number"] for shift in bells.values() for lesson in shift.get("lessons", [])}
+
+
+# ========== ЧИТАННЯ ==========
+
+def read_rows(path, sheet=None):
+    """Генератор рядків-списків з CSV або XLSX"""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise SystemExit("❌ Для XLSX потрібен openpyxl: pip install openpyxl")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if sheet else workbook.active
+            yield from worksheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+        return
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def read_json(path):
+    """Старий або розсинхронізований json розкладу -> ті самі записи, що дає таблиця"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for day, lessons in data.get("schedule", {}).items():
+        for lesson in lessons:
+            for class_name, info in lesson.get("classes", {}).items():
+                yield {"day": day, "lesson": lesson.get("lesson_number"), "class": class_name,
+                       "subject": (info or {}).get("subject"), "room": (info or {}).get("room")}
+
+
+def iter_records(rows):
+    """Рядки таблиці -> словники day/lesson/class/subject/room з номером рядка"""
+    rows = iter(rows)
+    line_no = 0
+    for row in rows:
+        line_no += 1
+        if any(str(cell).strip() for cell in row if cell is not None):
+            header = [str(cell or "").strip().lower() for cell in row]
+            break
+    else:
+        return
+
+    columns = {field: next((i for i, name in enumerate(header) if name in names), None)
+               for field, names in HEADERS.items()}
+    class_columns = [(i, normalize_class(name)) for i, name in enumerate(header) if normalize_class(name)]
+    if columns["day"] is None or columns["lesson"] is None:
+        raise SystemExit("❌ У заголовку немає колонок день / урок")
+    wide = columns["class"] is None
+    if wide and not class_columns:
+        raise SystemExit("❌ У заголовку немає ні колонки клас, ні колонок з класами")
+
+    # Відсутня колонка (наприклад, кабінет) читається з порожнього хвоста рядка
+    width = len(header) + 1
+    day_i, lesson_i = columns["day"], columns["lesson"]
+    class_i, subject_i, room_i = (width - 1 if columns[f] is None else columns[f] for f in ("class", "subject", "room"))
+    for row in rows:
+        line_no += 1
+        if not any(row):
+            continue
+        if len(row) < width:
+            row = list(row) + [""] * (width - len(row))
+        if not wide:
+            yield {"line": line_no, "day": row[day_i], "lesson": row[lesson_i], "class": row[class_i],
+                   "subject": row[subject_i], "room": row[room_i]}
+            continue
+        for index, class_name in class_columns:
+            value = row[index]
+            if value is not None and str(value).strip():
+                subject, room = split_cell(value)
+                yield {"line": line_no, "day": row[day_i], "lesson": row[lesson_i], "class": class_name,
+                       "subject": subject, "room": room}
+
+
+# ========== НОРМАЛІЗАЦІЯ І ПЕРЕВІРКА ==========
+
+class ScheduleBuilder:
+    def __init__(self, classes=ALL_CLASSES, lessons=None):
+        self.classes = set(classes)
+        self.lessons = lessons
+        self.cells = {}
+        self.errors = []
+        self.error_count = 0
+        self.records = 0
+
+    def error(self, record, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            where = f"рядок {record['line']}: " if record.get("line") else ""
+            self.errors.append(f"{where}{message}")
+
+    def add(self, record):
+        self.records += 1
+        day = DAY_NAMES.get(record["day"]) or DAY_NAMES.get(str(record["day"]).strip().lower())
+        if not day:
+            return self.error(record, f"невідомий день {record['day']!r}")
+        try:
+            lesson = record["lesson"] if type(record["lesson"]) is int else int(float(str(record["lesson"]).strip()))
+        except ValueError:
+            return self.error(record, f"номер уроку {record['lesson']!r} не число")
+        if self.lessons is not None and lesson not in self.lessons:
+            return self.error(record, f"урок {lesson} поза розкладом дзвінків")
+        class_name = normalize_class(record["class"])
+        if class_name not in self.classes:
+            return self.error(record, f"невідомий клас {record['class']!r}")
+        subject = normalize_subject(record["subject"])
+        if not subject:
+            return
+        room = normalize_room(record["room"])
+
+        key = (day, lesson, class_name)
+        previous = self.cells.get(key)
+        if previous and previous != (subject, room):
+            return self.error(record, f"{day} {lesson} {class_name}: два різні уроки "
+                                      f"{previous[0]} і {subject}")
+        self.cells[key] = (subject, room)
+
+    def build(self):
+        classes = sorted({c for _, _, c in self.cells} or self.classes, key=lambda c: (int(c.split("-")[0]), c))
+        days = list(DAYS_UA.values())
+        max_lesson = max((lesson for _, lesson, _ in self.cells), default=0)
+        schedule = {}
+        for day in days:
+            lessons = []
+            for number in sorted({lesson for d, lesson, _ in self.cells if d == day}):
+                row = {}
+                for class_name in classes:
+                    cell = self.cells.get((day, number, class_name))
+                    if cell:
+                        row[class_name] = {"subject": cell[0], "room": cell[1]}
+                lessons.append({"lesson_number": number, "classes": row})
+            schedule[day] = lessons
+        return {"classes": classes, "schedule": schedule, "days_of_week": days, "max_lessons_per_day": max_lesson}
+
+
+def cells_of(data):
+    cells = {}
+    for day, lessons in data.get("schedule", {}).items():
+        for lesson in lessons:
+            for class_name, info in lesson.get("classes", {}).items():
+                subject = normalize_subject((info or {}).get("subject"))
+                if subject:
+                    cells[day, lesson.get("lesson_number"), class_name] = (subject, normalize_room((info or {}).get("room")))
+    return cells
+
+
+def diff(old, new):
+    """Людський дифф по клітинках (день, урок, клас)"""
+    old_cells, new_cells = cells_of(old), cells_of(new)
+    order = {day: i for i, day in enumerate(DAYS_UA.values())}
+
+    def fmt(cell):
+        return f"{cell[0]} ({cell[1]})" if cell[1] else cell[0]
+
+    lines = []
+    for key in sorted(old_cells.keys() | new_cells.keys(), key=lambda k: (order.get(k[0], 9), k[1], k[2])):
+        before, after = old_cells.get(key), new_cells.get(key)
+        if before == after:
+            continue
+        where = f"{key[0]} {key[1]} {key[2]}"
+        if before is None:
+            lines.append(f"+ {where}: {fmt(after)}")
+        elif after is None:
+            lines.append(f"- {where}: {fmt(before)}")
+        else:
+            lines.append(f"~ {where}: {fmt(before)} → {fmt(after)}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Імпорт розкладу у schedule_full.json")
+    parser.add_argument("source", help="CSV, XLSX або JSON з розкладом")
+    parser.add_argument("--output", default=SCHEDULE_FILE)
+    parser.add_argument("--sheet", help="аркуш XLSX (за замовчуванням активний)")
+    parser.add_argument("--dry-run", action="store_true", help="лише перевірка і дифф, без запису")
+    parser.add_argument("--diff-file", help="записати дифф у файл замість виводу")
+    args = parser.parse_args()
+
+    builder = ScheduleBuilder(lessons=allowed_lessons())
+    records = read_json(args.source) if args.source.lower().endswith(".json") else iter_records(read_rows(args.source, args.sheet))
+    for record in records:
+        builder.add(record)
+
+    if builder.error_count:
+        for message in builder.errors:
+            print(f"❌ {message}")
+        if builder.error_count > len(builder.errors):
+            print(f"... і ще {builder.error_count - len(builder.errors)}")
+        sys.exit(1)
+
+    new = builder.build()
+    try:
+        with open(args.output, "r", encoding="utf-8") as f:
+            old = json.load(f)
+    except (OSError, ValueError):
+        old = {}
+    changes = diff(old, new)
+
+    if args.diff_file:
+        with open(args.diff_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(changes) + "\n")
+    else:
+        for line in changes:
+            print(line)
+    print(f"📋 Записів: {builder.records}, уроків: {len(builder.cells)}, змін: {len(changes)}")
+
+    if args.dry_run or not changes:
+        return
+    tmp = args.output + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(new, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, args.output)
+    print(f"✅ Записано {args.output}")
+
+
+if __name__ == "__main__":
+    main()
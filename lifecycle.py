@@ -0,0 +1,104 @@
+"""Життєвий цикл процесу: готовність (/readyz), SIGTERM і злив незавершеної роботи до дедлайну.
+
+Порядок зупинки: /readyz відповідає 503 -> пауза SHUTDOWN_GRACE, щоб балансувальник перевів трафік
+на новий інстанс -> хуки on_drain перестають приймати нову роботу -> чекаємо хендлери й фонові
+задачі до SHUTDOWN_DEADLINE -> що не встигло, скасовується -> хуки on_stop зберігають стан.
+Модуль не імпортує aiogram: health server у main.py піднімається раніше за бота.
+"""
+import asyncio
+import signal
+import time
+
+from config import SHUTDOWN_DEADLINE, SHUTDOWN_GRACE
+
+
+class Lifecycle:
+    def __init__(self, grace=SHUTDOWN_GRACE, deadline=SHUTDOWN_DEADLINE):
+        self.grace = grace
+        self.deadline = deadline
+        self.ready = False
+        self.draining = False
+        self.tasks = set()
+        self.drain_hooks = []
+        self.stop_hooks = []
+        self.cancelled = 0
+        self.stopped = asyncio.Event()
+        self._stopping = None
+
+    def install(self):
+        """Обробники SIGTERM / SIGINT; викликається з працюючого event loop"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.shutdown)
+            except NotImplementedError:
+                # Windows: лишається звичайний KeyboardInterrupt
+                pass
+
+    def on_drain(self, hook):
+        """async hook() на початку зливу — зупинити прийом нової роботи"""
+        self.drain_hooks.append(hook)
+        return hook
+
+    def on_stop(self, hook):
+        """async hook() після зливу — чекпойнти стану"""
+        self.stop_hooks.append(hook)
+        return hook
+
+    def track(self, task):
+        """Фонова задача, на яку зупинка чекатиме (і скасує після дедлайну)"""
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def __call__(self, handler, event, data):
+        """Зовнішній middleware на апдейти: хендлер у роботі — це задача, яку треба дочекатися"""
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            return await handler(event, data)
+        finally:
+            self.tasks.discard(task)
+
+    def shutdown(self):
+        if self._stopping is None:
+            self._stopping = asyncio.create_task(self.stop())
+        return self._stopping
+
+    async def _run(self, hooks):
+        for hook in hooks:
+            try:
+                await hook()
+            except Exception as e:
+                print(f"⚠️ Зупинка, {getattr(hook, '__name__', hook)}: {e}")
+
+    async def stop(self):
+        started = time.monotonic()
+        self.ready = False
+        self.draining = True
+        print(f"🛑 Зупинка: /readyz -> 503, злив до {self.deadline:.0f} с")
+        await asyncio.sleep(self.grace)
+        await self._run(self.drain_hooks)
+
+        current = asyncio.current_task()
+        while True:
+            # Хендлери, що завершуються, можуть запускати нові задачі — перевіряємо, доки не стане порожньо
+            pending = {task for task in self.tasks if not task.done() and task is not current}
+            left = self.deadline - (time.monotonic() - started)
+            if not pending or left <= 0:
+                break
+            await asyncio.wait(pending, timeout=left)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.cancelled = len(pending)
+
+        await self._run(self.stop_hooks)
+        print(f"✅ Зупинено за {time.monotonic() - started:.1f} с, скасовано задач: {self.cancelled}")
+        self.stopped.set()
+
+
+# Один на процес: main.py ставить обробники сигналів, бот реєструє хуки і middleware
+LIFECYCLE = Lifecycle()
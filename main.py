@@ -1,25 +1,122 @@
 import asyncio
+import importlib
 import os
-from geminiclient import GeminiClient
-from bot import TelegramBot
+import time
+from http import HTTPStatus
+from calendar_feed import CALENDARS
+from config import CALENDAR_PATH, WEBHOOK_PATH, WEBHOOK_URL
+from lifecycle import LIFECYCLE
+
+# Порядок старту: спершу слухаємо порт (health check Render), потім імпортуємо aiogram/бота,
+# SDK Gemini — лише при першому AI-запиті, індекси розкладу — у фоні після старту бота.
+# "/" — liveness (процес живий), "/readyz" — готовність: 503 до старту бота і з початку зупинки.
+# /calendar/<клас>.ics — розклад для календаря телефона, не залежить від бота.
+STARTED = time.perf_counter()
+
+
+def since_start():
+    return f"{time.perf_counter() - STARTED:.2f} с"
+
 
 async def health_server():
+    """Піднімає health server і повертає його — порт уже слухається, поки вантажиться бот"""
     # Читаємо порт зі змінної оточення, яку задає Render. Якщо її немає (наприклад, локально), використовуємо 10000.
     port = int(os.getenv("PORT", 10000))
     # Важливо слухати на всіх інтерфейсах (0.0.0.0), а не тільки localhost
     host = "0.0.0.0"
 
     async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        # Це найпростіший обробник, який просто повертає "OK"
-        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 2\r\nConnection: close\r\n\r\nOK")
+        # Мінімальний HTTP: шлях з першого рядка і заголовки (для ETag календаря), тіла запитів тут немає
+        request_line = await reader.readline()
+        headers = {}
+        while len(headers) < 100:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        parts = request_line.split()
+        path = parts[1].decode("latin-1") if len(parts) > 1 else "/"
+
+        status, extra, body = 200, {"Content-Type": "text/plain"}, b"OK"
+        if path.startswith(CALENDAR_PATH):
+            try:
+                status, extra, body = await CALENDARS.handle(path, headers)
+            except Exception as e:
+                print(f"⚠️ Календар: {e}")
+                status, body = 500, b"ERROR"
+        elif path.startswith("/readyz") and not LIFECYCLE.ready:
+            status, body = 503, b"NOT READY"
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", *(f"{k}: {v}" for k, v in extra.items()),
+                f"Content-Length: {len(body)}", "Connection: close"]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
         await writer.drain()
         writer.close()
         await writer.wait_closed()
 
     server = await asyncio.start_server(handle, host, port)
-    print(f"🌐 Health server запущено на {host}:{port}")
-    async with server:
-        await server.serve_forever()
+    print(f"🌐 Health server запущено на {host}:{port} ({since_start()})")
+    return server
+
+async def load_bot(bot_token: str):
+    """Імпорт aiogram і модулів бота — у потоці, щоб event loop тим часом відповідав на health check"""
+    bot_module = await asyncio.to_thread(importlib.import_module, "bot")
+    from geminiclient import GeminiClient
+
+    tg_bot = bot_module.TelegramBot(GeminiClient(), bot_token)
+    print(f"📦 Бот завантажено ({since_start()})")
+    return tg_bot
+
+async def webhook_server(bot_token: str):
+    """Вебхук і health check на одному порту — так кілька реплік за балансувальником ділять апдейти"""
+    from aiohttp import web
+
+    handler_ready = asyncio.get_running_loop().create_future()
+
+    async def health(request):
+        return web.Response(text="OK")
+
+    async def ready(request):
+        if LIFECYCLE.ready:
+            return web.Response(text="OK")
+        return web.Response(status=503, text="NOT READY")
+
+    async def calendar(request):
+        status, headers, body = await CALENDARS.handle(request.raw_path, request.headers)
+        return web.Response(status=status, headers=headers, body=body)
+
+    async def webhook(request):
+        if LIFECYCLE.draining:
+            # Telegram повторить апдейт пізніше — його отримає репліка, що лишається, або новий інстанс
+            return web.Response(status=503)
+        # Апдейти, що прийшли під час завантаження бота, чекають на нього, а не губляться
+        handler = await handler_ready
+        return await handler.handle(request)
+
+    app = web.Application()
+    app.router.add_get("/", health)
+    app.router.add_get("/readyz", ready)
+    app.router.add_get(CALENDAR_PATH + "{name}", calendar)
+    app.router.add_post(WEBHOOK_PATH, webhook)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = int(os.getenv("PORT", 10000))
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    print(f"🌐 Вебхук і health server на 0.0.0.0:{port} ({since_start()})")
+
+    tg_bot = await load_bot(bot_token)
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+    await tg_bot.dp.emit_startup(bot=tg_bot.bot, dispatcher=tg_bot.dp)
+    handler_ready.set_result(SimpleRequestHandler(dispatcher=tg_bot.dp, bot=tg_bot.bot))
+    try:
+        await tg_bot.start_webhook()
+        await LIFECYCLE.stopped.wait()
+    finally:
+        await tg_bot.dp.emit_shutdown(bot=tg_bot.bot, dispatcher=tg_bot.dp)
+        await tg_bot.bot.session.close()
+        await runner.cleanup()
 
 async def main():
     bot_token = os.getenv("BOT_TOKEN")
@@ -29,14 +126,27 @@ async def main():
         raise RuntimeError("❌ BOT_TOKEN або API_KEY не знайдено в змінних оточення")
 
     print("🚀 Запуск бота...")
-    client = GeminiClient()
-    tg_bot = TelegramBot(client, bot_token)
+    LIFECYCLE.install()
+    # Фіди календаря збираються у фоні, поки вантажиться бот
+    asyncio.create_task(CALENDARS.ready())
+    if WEBHOOK_URL:
+        await webhook_server(bot_token)
+        return
 
-    # Запускаємо одночасно бота і HTTP-сервер для health checks
-    await asyncio.gather(
-        tg_bot.start_polling(),
-        health_server(),
-    )
+    server = await health_server()
+    tg_bot = await load_bot(bot_token)
+
+    # Health server працює, поки не завершиться злив, — /readyz тим часом відповідає 503
+    async with server:
+        polling = asyncio.create_task(tg_bot.start_polling())
+        stopped = asyncio.create_task(LIFECYCLE.stopped.wait())
+        await asyncio.wait({polling, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        if polling.done() and not LIFECYCLE.draining:
+            # Падіння polling, як і раніше, завершує процес з помилкою
+            stopped.cancel()
+            polling.result()
+        await stopped
+        await tg_bot.bot.session.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
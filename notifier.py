@@ -0,0 +1,216 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from aiogram.exceptions import TelegramForbiddenError
+
+from config import DIGEST_TIME, NOTIFY_BATCH, REMIND_BEFORE_MINUTES, SUBSCRIPTIONS_FILE
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+
+
+class SubscriptionStore:
+    """Підписки на нагадування у json (атомарний запис) і індекс зміна -> клас -> користувачі.
+
+    З кількома репліками (shared.distributed) джерело правди — спільна таблиця: кожна репліка пише туди,
+    а локальна копія для читання оновлюється за версією (refresh), зокрема у лідера перед розсилкою.
+    """
+
+    NAME = "subscriptions"
+
+    def __init__(self, filename=SUBSCRIPTIONS_FILE, shared=None):
+        self.filename = filename
+        self.shared = shared if shared is not None and shared.distributed else None
+        self.version = None
+        self.subs = {}
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                self.subs = {int(uid): sub for uid, sub in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            pass
+        self._reindex()
+
+    def __len__(self):
+        return len(self.subs)
+
+    def _reindex(self):
+        self.by_shift = {"remind": defaultdict(lambda: defaultdict(set)), "digest": defaultdict(set)}
+        for uid, sub in self.subs.items():
+            if sub.get("remind"):
+                self.by_shift["remind"][sub["shift"]][sub["class"]].add(uid)
+            if sub.get("digest"):
+                self.by_shift["digest"][sub["class"]].add(uid)
+
+    def save(self):
+        tmp = self.filename + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.subs, f, ensure_ascii=False)
+        os.replace(tmp, self.filename)
+
+    async def seed(self):
+        """Перший запуск з Redis: підписки з локального файлу переносяться у спільну таблицю"""
+        if self.shared and self.subs and not await self.shared.records(self.NAME):
+            for uid, sub in self.subs.items():
+                await self.shared.put_record(self.NAME, uid, sub)
+
+    async def refresh(self):
+        """Підтягує чужі зміни, якщо версія спільної таблиці змінилася; True — локальна копія оновлена"""
+        if self.shared is None:
+            return False
+        version = await self.shared.version(self.NAME)
+        if version == self.version:
+            return False
+        self.subs = {int(uid): sub for uid, sub in (await self.shared.records(self.NAME)).items()}
+        self.version = version
+        self._reindex()
+        return True
+
+    def get(self, user_id: int):
+        return self.subs.get(user_id)
+
+    async def set(self, user_id: int, class_name: str, shift=None, remind=None, digest=None):
+        await self.refresh()
+        sub = self.subs.get(user_id) or {"class": class_name, "shift": 1, "remind": False, "digest": False}
+        sub["class"] = class_name
+        if shift is not None:
+            sub["shift"] = shift
+        if remind is not None:
+            sub["remind"] = remind
+        if digest is not None:
+            sub["digest"] = digest
+        if sub["remind"] or sub["digest"]:
+            self.subs[user_id] = sub
+            if self.shared:
+                await self.shared.put_record(self.NAME, user_id, sub)
+        else:
+            self.subs.pop(user_id, None)
+            if self.shared:
+                await self.shared.drop_records(self.NAME, user_id)
+        self._reindex()
+        if self.shared is None:
+            self.save()
+        return self.subs.get(user_id)
+
+    async def remove(self, user_ids):
+        removed = [uid for uid in user_ids if self.subs.pop(uid, None)]
+        if removed:
+            self._reindex()
+            if self.shared:
+                await self.shared.drop_records(self.NAME, *removed)
+            else:
+                self.save()
+        return removed
+
+    def reminders(self, shift: int):
+        return self.by_shift["remind"].get(shift, {})
+
+    def digests(self):
+        return self.by_shift["digest"]
+
+
+class Notifier:
+    """Купа таймерів на межі уроків: один таймер на дзвінок, а не на користувача"""
+
+    def __init__(self, send, bells_data, lesson_for, render_today, store=None, should_fire=None):
+        self.send = send
+        self.should_fire = should_fire
+        self.bells_data = bells_data
+        self.lesson_for = lesson_for
+        self.render_today = render_today
+        self.store = store or SubscriptionStore()
+        self.heap = []
+        self._seq = itertools.count()
+        self.task = None
+        self.sent = 0
+        self.failed = 0
+
+    def _at(self, day, hhmm, minus=0):
+        hours, minutes = map(int, hhmm.split(":"))
+        return datetime.combine(day, datetime.min.time()) + timedelta(hours=hours, minutes=minutes - minus)
+
+    def plan_day(self, day, after):
+        """Кладе в купу всі межі уроків дня, що ще попереду"""
+        if day.weekday() >= len(WEEKDAYS):
+            return
+        events = [(self._at(day, DIGEST_TIME), ("digest", None, None))]
+        for shift in (1, 2):
+            for lesson in self.bells_data.get(f"shift_{shift}", {}).get("lessons", []):
+                when = self._at(day, lesson["start"], REMIND_BEFORE_MINUTES)
+                events.append((when, ("lesson", shift, lesson)))
+        for when, event in events:
+            if when > after:
+                heapq.heappush(self.heap, (when, next(self._seq), event))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self):
+        planned = datetime.now()
+        self.plan_day(planned.date(), planned)
+        while True:
+            if not self.heap:
+                planned = datetime.combine(planned.date() + timedelta(days=1), datetime.min.time())
+                self.plan_day(planned.date(), planned)
+                if not self.heap:
+                    await asyncio.sleep(max(0.0, (planned - datetime.now()).total_seconds()))
+                continue
+
+            when, _, event = self.heap[0]
+            # Спимо шматками: годинник системи може зсунутися
+            delay = (when - datetime.now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(min(delay, 60))
+                continue
+            heapq.heappop(self.heap)
+            # Пропускаємо події, що прострочилися більше ніж на хвилину (сон ноутбука, рестарт),
+            # і ті, що має відправити інша репліка-лідер
+            if delay > -60 and (self.should_fire is None or self.should_fire()):
+                try:
+                    await self.fire(when, *event)
+                except Exception as e:
+                    print(f"⚠️ Нагадування не відправлено: {e}")
+
+    async def fire(self, when, kind, shift, lesson):
+        day_key = WEEKDAYS[when.weekday()]
+        # Підписки, оформлені через інші репліки
+        await self.store.refresh()
+        messages = []
+        if kind == "digest":
+            for class_name, users in self.store.digests().items():
+                if users:
+                    messages.append((self.render_today(class_name), users))
+        else:
+            for class_name, users in self.store.reminders(shift).items():
+                info = self.lesson_for(class_name, day_key, lesson["number"], when.date()) if users else None
+                if info:
+                    subject, room = info
+                    room_str = f" (каб. {room})" if room else ""
+                    text = (f"🔔 {class_name}: о {lesson['start']} — "
+                            f"{lesson['number']}. {subject}{room_str}")
+                    messages.append((text, users))
+        await self.deliver(messages)
+
+    async def deliver(self, messages):
+        """Текст рендериться раз на клас; відправка пачками через спільну чергу з лімітами"""
+        jobs = [(uid, text) for text, users in messages for uid in list(users)]
+        blocked = []
+
+        async def one(uid, text):
+            try:
+                await self.send(uid, text)
+                self.sent += 1
+            except TelegramForbiddenError:
+                blocked.append(uid)
+            except Exception:
+                self.failed += 1
+
+        for i in range(0, len(jobs), NOTIFY_BATCH):
+            await asyncio.gather(*(one(uid, text) for uid, text in jobs[i:i + NOTIFY_BATCH]))
+        # Хто заблокував бота — більше не підписаний
+        await self.store.remove(blocked)
@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import uuid
+from datetime import date, datetime, timedelta
+
+from config import ALL_CLASSES, OVERRIDES_FILE
+
+CANCEL_WORDS = {"скасовано", "скасувати", "немає", "-"}
+ROOM_RE = re.compile(r"\s+(?:каб\.?|кабінет)\s*(\S+)\s*$", re.IGNORECASE)
+
+
+def parse_date(text: str, today=None):
+    today = today or date.today()
+    text = text.strip().lower()
+    if text == "сьогодні":
+        return today
+    if text == "завтра":
+        return today + timedelta(days=1)
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    try:
+        parsed = datetime.strptime(f"{text}.{today.year}", "%d.%m.%Y").date()
+    except ValueError:
+        raise ValueError(f"незрозуміла дата: {text}")
+    # 02.01 у грудні — це вже наступний рік
+    return parsed if parsed >= today - timedelta(days=1) else parsed.replace(year=today.year + 1)
+
+
+def parse_override(text: str, today=None):
+    """`дата клас урок предмет [каб. N]` або `дата клас урок скасовано` -> запис заміни"""
+    parts = text.strip().split(maxsplit=3)
+    if len(parts) < 4:
+        raise ValueError("формат: дата клас урок предмет [каб. N]")
+    day, class_name, lesson, rest = parts
+    class_name = class_name.upper()
+    if class_name not in ALL_CLASSES:
+        raise ValueError(f"невідомий клас: {class_name}")
+    if not lesson.isdigit():
+        raise ValueError(f"номер уроку має бути числом: {lesson}")
+
+    entry = {"date": parse_date(day, today).isoformat(), "class": class_name, "lesson": int(lesson)}
+    if rest.strip().lower() in CANCEL_WORDS:
+        entry["cancel"] = True
+        return entry
+    room = ROOM_RE.search(rest)
+    entry["subject"] = rest[:room.start()].strip() if room else rest.strip()
+    if room:
+        entry["room"] = room.group(1)
+    return entry
+
+
+class OverrideStore:
+    """Заміни уроків на конкретні дати: append-only jsonl + індекс дата -> клас -> урок -> заміна.
+
+    З кількома репліками (shared.distributed) заміни лежать у спільній таблиці, а журнал на диску не ведеться;
+    refresh підтягує зміни, внесені через інші репліки.
+    """
+
+    NAME = "overrides"
+
+    def __init__(self, filename=OVERRIDES_FILE, shared=None):
+        self.filename = filename
+        self.shared = shared if shared is not None and shared.distributed else None
+        self.version = None
+        self.entries = {}
+        self.by_date = {}
+        self._load()
+
+    def _load(self):
+        stale = False
+        cutoff = (date.today() - timedelta(days=1)).isoformat()
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Обірваний останній рядок після падіння процесу
+                        continue
+                    if entry.get("removed") or entry.get("date", "") < cutoff:
+                        self._drop(entry["id"])
+                        stale = True
+                    else:
+                        self._index(entry)
+        except FileNotFoundError:
+            return
+        # Минулі й видалені заміни не потрібні — стискаємо журнал при старті
+        if stale:
+            self._rewrite()
+
+    def _rewrite(self):
+        tmp = self.filename + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.filename)
+
+    def _append(self, entry):
+        with open(self.filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _index(self, entry):
+        self._drop(entry["id"])
+        self.entries[entry["id"]] = entry
+        self.by_date.setdefault(entry["date"], {}).setdefault(entry["class"], {})[entry["lesson"]] = entry
+
+    def _drop(self, entry_id):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return None
+        overlay = self.by_date.get(entry["date"], {})
+        lessons = overlay.get(entry["class"], {})
+        if lessons.get(entry["lesson"]) is entry:
+            del lessons[entry["lesson"]]
+        if not lessons:
+            overlay.pop(entry["class"], None)
+        if not overlay:
+            self.by_date.pop(entry["date"], None)
+        return entry
+
+    async def seed(self):
+        """Перший запуск з Redis: заміни з локального журналу переносяться у спільну таблицю"""
+        if self.shared and self.entries and not await self.shared.records(self.NAME):
+            for entry in self.entries.values():
+                await self.shared.put_record(self.NAME, entry["id"], entry)
+
+    async def refresh(self):
+        """Підтягує заміни з інших реплік; повертає додані й прибрані записи, щоб скинути кеші їхніх класів"""
+        if self.shared is None:
+            return []
+        version = await self.shared.version(self.NAME)
+        if version == self.version:
+            return []
+        cutoff = (date.today() - timedelta(days=1)).isoformat()
+        records = await self.shared.records(self.NAME)
+        stale = [entry_id for entry_id, entry in records.items() if entry["date"] < cutoff]
+        if stale:
+            await self.shared.drop_records(self.NAME, *stale)
+        fresh = {entry_id: entry for entry_id, entry in records.items() if entry["date"] >= cutoff}
+        changed = [entry for entry_id, entry in self.entries.items() if fresh.get(entry_id) != entry]
+        changed += [entry for entry_id, entry in fresh.items() if self.entries.get(entry_id) != entry]
+        self.entries, self.by_date = {}, {}
+        for entry in fresh.values():
+            self._index(entry)
+        self.version = version
+        return changed
+
+    async def add(self, entry):
+        entry = dict(entry, id=uuid.uuid4().hex[:6])
+        # Нова заміна того самого уроку витісняє попередню
+        previous = self.by_date.get(entry["date"], {}).get(entry["class"], {}).get(entry["lesson"])
+        if previous:
+            await self.remove(previous["id"])
+        if self.shared:
+            await self.shared.put_record(self.NAME, entry["id"], entry)
+        else:
+            self._append(entry)
+        self._index(entry)
+        return entry
+
+    async def remove(self, entry_id):
+        entry = self._drop(entry_id)
+        if entry is None:
+            return None
+        if self.shared:
+            await self.shared.drop_records(self.NAME, entry_id)
+        else:
+            self._append({"id": entry_id, "removed": True})
+        return entry
+
+    def get(self, on, class_name, lesson_number):
+        return self.for_class(on, class_name).get(lesson_number)
+
+    def for_class(self, on, class_name):
+        """{номер уроку: заміна} для класу на дату — порожній словник, якщо замін немає"""
+        overlay = self.by_date.get(on.isoformat())
+        return overlay.get(class_name, {}) if overlay else {}
+
+    def upcoming(self, today=None):
+        start = (today or date.today()).isoformat()
+        return sorted((e for e in self.entries.values() if e["date"] >= start),
+                      key=lambda e: (e["date"], e["class"], e["lesson"]))
+
+    @staticmethod
+    def describe(entry):
+        day = datetime.strptime(entry["date"], "%Y-%m-%d").strftime("%d.%m")
+        if entry.get("cancel"):
+            change = "скасовано"
+        else:
+            room = f" (каб. {entry['room']})" if entry.get("room") else ""
+            change = f"{entry['subject']}{room}"
+        return f"[{entry['id']}] {day} {entry['class']} {entry['lesson']} урок: {change}"
@@ -0,0 +1,145 @@
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter
+from datetime import datetime
+
+from aiogram import BaseMiddleware
+
+from config import PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL, PROFILE_TOP, PROFILE_TRACEMALLOC_FRAMES
+
+
+class _UpdateCounter(BaseMiddleware):
+    """Рахує апдейти під час захоплення; реєструється тільки поки воно триває"""
+
+    def __init__(self, target=None):
+        self.count = 0
+        self.target = target
+        self.done = asyncio.Event()
+
+    async def __call__(self, handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            self.count += 1
+            if self.target and self.count >= self.target:
+                self.done.set()
+
+
+class _StackSampler(threading.Thread):
+    """Семплінг стеку потоку event loop'а у фоновому потоці"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name="profiler-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """Профілювання на вимогу адміна. Поки захоплення не запущене, нічого не встановлено"""
+
+    KINDS = ("cprofile", "sample")
+
+    def __init__(self):
+        self.task = None
+
+    @property
+    def busy(self):
+        return self.task is not None and not self.task.done()
+
+    async def capture(self, dp, kind="cprofile", seconds=None, updates=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Невідомий тип профілювання: {kind}")
+        seconds = min(seconds or PROFILE_MAX_SECONDS, PROFILE_MAX_SECONDS)
+
+        counter = _UpdateCounter(updates)
+        dp.update.outer_middleware.register(counter)
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        mem_before = tracemalloc.take_snapshot()
+
+        profile = sampler = None
+        if kind == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+            sampler.start()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(counter.done.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if profile:
+                profile.disable()
+            if sampler:
+                await asyncio.to_thread(sampler.stop)
+            dp.update.outer_middleware.unregister(counter)
+        elapsed = time.perf_counter() - started
+
+        mem_after = await asyncio.to_thread(tracemalloc.take_snapshot)
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        summary = f"{kind}: {elapsed:.1f} с, апдейтів: {counter.count}"
+        data = await asyncio.to_thread(self._build_report, summary, profile, sampler, mem_before, mem_after)
+        filename = f"profile-{kind}-{datetime.now():%Y%m%d-%H%M%S}.zip"
+        return filename, data, summary
+
+    def _build_report(self, summary, profile, sampler, mem_before, mem_after):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("summary.txt", summary + "\n")
+
+            if profile:
+                out = io.StringIO()
+                stats = pstats.Stats(profile, stream=out)
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+                stats.sort_stats("tottime").print_stats(PROFILE_TOP)
+                zf.writestr("cprofile.txt", out.getvalue())
+                profile.create_stats()
+                zf.writestr("cprofile.prof", marshal.dumps(profile.stats))
+
+            if sampler:
+                # Формат collapsed stacks — одразу годиться для flamegraph.pl / speedscope
+                lines = [f"{stack} {count}" for stack, count in sampler.stacks.most_common()]
+                zf.writestr("stacks.folded", "\n".join(lines) + "\n")
+                zf.writestr("sampling.txt", f"семплів: {sampler.samples}, інтервал: {sampler.interval * 1000:.1f} мс\n")
+
+            top = mem_after.compare_to(mem_before, "lineno")[:PROFILE_TOP]
+            current = mem_after.statistics("lineno")[:PROFILE_TOP]
+            lines = ["# Приріст пам'яті за вікно"] + [str(stat) for stat in top]
+            lines += ["", "# Найбільші алокатори"] + [str(stat) for stat in current]
+            zf.writestr("tracemalloc.txt", "\n".join(lines) + "\n")
+        return buf.getvalue()
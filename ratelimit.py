@@ -0,0 +1,171 @@
+import time
+
+from config import (
+    PASSWORD_FREE_ATTEMPTS, PASSWORD_FORGET, PASSWORD_LOCKOUT_BASE, PASSWORD_LOCKOUT_MAX, RATE_LIMITS,
+)
+
+
+class GCRA:
+    """Generic cell rate algorithm: на ключ зберігається одне число — час, коли відро знову повне (TAT).
+
+    Ключі живуть у двох поколіннях: раз на `period` (час повного наповнення відра) старе покоління
+    відкидається цілком. Запис, що пережив дві ротації, гарантовано має TAT у минулому, тобто
+    відро повне — забуваємо його без втрати точності і без сканування словника.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1, clock=time.monotonic):
+        self.interval = 60.0 / rate_per_minute
+        self.tolerance = self.interval * (burst - 1)
+        self.period = self.interval * burst
+        self.clock = clock
+        self._current = {}
+        self._previous = {}
+        self._rotated = clock()
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def _rotate(self, now):
+        if now - self._rotated >= 2 * self.period:
+            self._previous = {}
+        else:
+            self._previous = self._current
+        self._current = {}
+        self._rotated = now
+
+    def check(self, key, now=None) -> float:
+        """0.0 — дію дозволено і враховано; інакше — скільки секунд чекати. Відмова ліміт не витрачає"""
+        if now is None:
+            now = self.clock()
+        if now - self._rotated >= self.period:
+            self._rotate(now)
+        tat = self._current.get(key)
+        if tat is None:
+            tat = self._previous.get(key, now)
+        if tat < now:
+            tat = now
+        wait = tat - now - self.tolerance
+        if wait > 0:
+            return wait
+        self._current[key] = tat + self.interval
+        return 0.0
+
+
+class RateLimiter:
+    """Ліміти за класами дій (RATE_LIMITS: запитів на хвилину і розмір сплеску) на користувача"""
+
+    def __init__(self, limits=RATE_LIMITS, clock=time.monotonic):
+        self.buckets = {action: GCRA(rate, burst, clock) for action, (rate, burst) in limits.items()}
+        self.denied = dict.fromkeys(limits, 0)
+
+    def check(self, action: str, user_id: int) -> float:
+        bucket = self.buckets.get(action)
+        if bucket is None:
+            return 0.0
+        wait = bucket.check(user_id)
+        if wait:
+            self.denied[action] += 1
+        return wait
+
+
+class Lockout:
+    """Експоненційне блокування після невдалих спроб: перші `free` — без покарання, далі base * 2^n с"""
+
+    def __init__(self, free=PASSWORD_FREE_ATTEMPTS, base=PASSWORD_LOCKOUT_BASE, maximum=PASSWORD_LOCKOUT_MAX,
+                 forget=PASSWORD_FORGET, clock=time.monotonic):
+        self.free = free
+        self.base = base
+        self.maximum = maximum
+        self.forget = forget
+        self.clock = clock
+        # key -> [невдач, заблоковано до, остання невдача]; покоління як у GCRA, з періодом `forget`
+        self._current = {}
+        self._previous = {}
+        self._rotated = clock()
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def _entry(self, key, now):
+        if now - self._rotated >= self.forget:
+            self._previous = {} if now - self._rotated >= 2 * self.forget else self._current
+            self._current = {}
+            self._rotated = now
+        entry = self._current.get(key)
+        if entry is None:
+            entry = self._previous.pop(key, None)
+            if entry is not None:
+                self._current[key] = entry
+        return entry
+
+    def wait(self, key) -> float:
+        now = self.clock()
+        entry = self._entry(key, now)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[1] - now)
+
+    def failure(self, key) -> float:
+        """Фіксує невдалу спробу; повертає тривалість блокування (0 — ще є безкоштовні спроби)"""
+        now = self.clock()
+        entry = self._entry(key, now)
+        if entry is None or now - entry[2] > self.forget:
+            entry = self._current[key] = [0, 0.0, now]
+        entry[0] += 1
+        entry[2] = now
+        lock = self.penalty(entry[0])
+        if lock:
+            entry[1] = now + lock
+        return lock
+
+    def penalty(self, failures) -> float:
+        over = failures - self.free
+        if over <= 0:
+            return 0.0
+        return min(self.maximum, self.base * 2 ** (over - 1))
+
+    def success(self, key):
+        self._current.pop(key, None)
+        self._previous.pop(key, None)
+
+
+class SharedLockout:
+    """Lockout на всі репліки: лічильник невдач і час розблокування у SharedState, інакше кожна репліка
+    дає підбирачу пароля власні безкоштовні спроби. З однією реплікою — звичайний Lockout у пам'яті.
+    """
+
+    def __init__(self, shared, name="password", local=None, clock=time.time):
+        self.shared = shared
+        self.name = name
+        self.local = local or Lockout()
+        self.clock = clock
+
+    async def wait(self, key) -> float:
+        if not self.shared.distributed:
+            return self.local.wait(key)
+        until = await self.shared.get_value(f"lockout:{self.name}:{key}:until")
+        return max(0.0, float(until) - self.clock()) if until else 0.0
+
+    async def failure(self, key) -> float:
+        if not self.shared.distributed:
+            return self.local.failure(key)
+        # Атомарний інкремент: паралельні спроби через різні репліки рахуються всі
+        failures = await self.shared.incr(f"lockout:{self.name}:{key}")
+        await self.shared.expire(f"lockout:{self.name}:{key}", self.local.forget)
+        lock = self.local.penalty(failures)
+        if lock:
+            await self.shared.set_value(f"lockout:{self.name}:{key}:until", self.clock() + lock, ttl=int(lock + 1))
+        return lock
+
+    async def success(self, key):
+        if not self.shared.distributed:
+            return self.local.success(key)
+        await self.shared.delete(f"lockout:{self.name}:{key}", f"lockout:{self.name}:{key}:until")
+
+
+def format_wait(seconds: float) -> str:
+    seconds = int(seconds + 0.999)
+    if seconds < 60:
+        return f"{seconds} с"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes} хв {seconds} с" if seconds else f"{minutes} хв"
@@ -0,0 +1,220 @@
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import (
+    ANSWER_CACHE_SIZE, BREAKER_COOLDOWN, BREAKER_FAILURES, GEMINI_DEADLINE, GEMINI_HEDGE,
+    GEMINI_HEDGE_MIN_DELAY, GEMINI_MAX_WORKERS, GEMINI_RETRIES, GEMINI_RETRY_BASE, GEMINI_RETRY_MAX,
+)
+
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRY_DELAY_RE = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+class GeminiUnavailable(Exception):
+    """Помилка, текст якої можна показати користувачу як є"""
+
+
+class CircuitBreaker:
+    """closed → open після серії збоїв → half_open (одна пробна спроба) → closed"""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """Спроба нічого не довела про сервіс (помилка в самому запиті): стан не змінюється, звільняється
+        лише слот пробної спроби в half_open"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self._failures >= self.max_failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def p95(self):
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+class AnswerCache:
+    """Невеликий LRU успішних відповідей — віддаємо їх, коли API недоступний"""
+
+    def __init__(self, size=ANSWER_CACHE_SIZE):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(key):
+        mode, prompt = key
+        return mode, " ".join(prompt.lower().split())
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(self._key(key))
+            if value is not None:
+                self._data.move_to_end(self._key(key))
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[self._key(key)] = value
+            self._data.move_to_end(self._key(key))
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+
+def classify(error):
+    """Повертає (код, чи варто повторювати, скільки чекати за вказівкою сервера)"""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    text = str(error)
+    if not isinstance(code, int):
+        match = re.search(r"\b(4\d\d|5\d\d)\b", text)
+        code = int(match.group(1)) if match else None
+
+    retry_after = getattr(error, "retry_after", None)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if retry_after is None and headers.get("retry-after"):
+            retry_after = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    if retry_after is None:
+        match = RETRY_DELAY_RE.search(text)
+        if match:
+            retry_after = float(match.group(1))
+
+    name = type(error).__name__.lower()
+    is_network = isinstance(error, (TimeoutError, ConnectionError)) or "timeout" in name or "connect" in name
+    retryable = is_network or code in RETRYABLE_CODES
+    return code, retryable, retry_after
+
+
+class ResilientCaller:
+    """Дедлайн на виклик, повтори з джитером, хеджування і запобіжник над синхронною функцією"""
+
+    def __init__(self, deadline=GEMINI_DEADLINE, retries=GEMINI_RETRIES, hedge=GEMINI_HEDGE,
+                 breaker=None, answers=None):
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker()
+        self.answers = answers or AnswerCache()
+        self.latency = LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=GEMINI_MAX_WORKERS, thread_name_prefix="gemini")
+
+    def _fallback(self, cache_key, message):
+        cached = self.answers.get(cache_key) if cache_key else None
+        if cached:
+            return f"♻️ Збережена відповідь (AI тимчасово недоступний)\n\n{cached}"
+        raise GeminiUnavailable(message)
+
+    def _attempt(self, fn, timeout):
+        started = time.monotonic()
+        futures = [self._pool.submit(fn)]
+        hedge_delay = None
+        if self.hedge:
+            p95 = self.latency.p95()
+            hedge_delay = max(p95, GEMINI_HEDGE_MIN_DELAY) if p95 else None
+
+        if hedge_delay and hedge_delay < timeout:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                futures.append(self._pool.submit(fn))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latency.add(time.monotonic() - started)
+                    return future.result()
+                error = future.exception()
+        # Потоки не скасувати — програвший запит просто доживе у фоні
+        raise error or TimeoutError("Gemini deadline exceeded")
+
+    def call(self, fn, cache_key=None, on_success=None, fallback=True):
+        """on_success(result) викликається лише для справжньої відповіді API, не для збереженої з fallback;
+        fallback=False — замість збереженої відповіді одразу GeminiUnavailable (пакетні завдання)"""
+        saved = cache_key if fallback else None
+        if not self.breaker.allow():
+            return self._fallback(saved, "🤖 AI тимчасово перевантажений. Спробуй за хвилину.")
+
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                result = self._attempt(fn, remaining)
+            except Exception as e:
+                code, retryable, retry_after = classify(e)
+                if not retryable:
+                    # Проблема в запиті, а не в сервісі — запобіжник не чіпаємо
+                    self.breaker.release()
+                    raise GeminiUnavailable("❌ AI не зміг обробити запит. Спробуй переформулювати.") from e
+
+                attempt += 1
+                delay = random.uniform(0, min(GEMINI_RETRY_MAX, GEMINI_RETRY_BASE * 2 ** attempt))
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if attempt > self.retries or time.monotonic() + delay >= deadline:
+                    self.breaker.failure()
+                    if code == 429:
+                        return self._fallback(saved, "Ліміт вичерпано. Почекай і повтори.")
+                    if isinstance(e, TimeoutError):
+                        return self._fallback(saved, "⏱ AI не відповів вчасно. Спробуй ще раз.")
+                    return self._fallback(saved, "❌ AI зараз недоступний. Спробуй пізніше.")
+                time.sleep(delay)
+                continue
+
+            self.breaker.success()
+            if cache_key:
+                self.answers.put(cache_key, result)
+            if on_success:
+                on_success(result)
+            return result
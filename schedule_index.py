@@ -0,0 +1,168 @@
+import asyncio
+import re
+from datetime import datetime, timedelta
+
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+
+from config import ALL_CLASSES, DAYS_UA_REVERSE, INLINE_MAX_RESULTS, MAX_LEN
+from digests import WEEKDAY_KEYS
+
+DAY_ALIASES = {
+    "monday": ["понеділок", "пн", "mon", "monday"],
+    "tuesday": ["вівторок", "вт", "tue", "tuesday"],
+    "wednesday": ["середа", "ср", "wed", "wednesday"],
+    "thursday": ["четвер", "чт", "thu", "thursday"],
+    "friday": ["п'ятниця", "п’ятниця", "пятниця", "пт", "fri", "friday"],
+    "today": ["сьогодні", "today"],
+    "tomorrow": ["завтра", "tomorrow"],
+    "week": ["тиждень", "весь", "все", "week", "all"],
+}
+# Латиниця на місці кириличної літери класу: 9b, 9v...
+LATIN_LETTERS = str.maketrans({"a": "а", "b": "б", "v": "в", "g": "г"})
+CLASS_RE = re.compile(r"(\d{1,2})\s*-?\s*([^\W\d_](?![^\W\d_]))?")
+
+
+def _class_key(class_name: str) -> str:
+    return class_name.replace("-", "").lower()
+
+
+def weekday_key(offset=0):
+    return WEEKDAY_KEYS[(datetime.now() + timedelta(days=offset)).weekday()]
+
+
+class ScheduleIndex:
+    """Готові inline-результати на кожну пару (клас, день) і префіксні індекси для розбору запиту"""
+
+    def __init__(self, render_day, render_week, classes=ALL_CLASSES, render_dated=None, build=True):
+        self.render_day = render_day
+        self.render_week = render_week
+        self.render_dated = render_dated
+        self.classes = list(classes)
+        self.articles = None
+        self._generation = 0
+        self.dated_articles = {}
+        self._dated_on = None
+        self._index_prefixes()
+        if build:
+            self.rebuild()
+
+    def rebuild(self):
+        self._generation += 1
+        generation = self._generation
+        articles = {}
+        for number, class_name in enumerate(self.classes):
+            for day_key, day_name in DAYS_UA_REVERSE.items():
+                articles[class_name, day_key] = self._article(
+                    f"{number}:{day_key}", f"{class_name} — {day_name}", self.render_day(class_name, day_key)
+                )
+            articles[class_name, "week"] = self._article(
+                f"{number}:week", f"{class_name} — весь тиждень", self.render_week(class_name)
+            )
+        # Фонова побудова, яку обігнала новіша (зміна розкладу), свій застарілий результат не ставить
+        if generation == self._generation:
+            self.articles = articles
+            self.dated_articles = {}
+            self._dated_on = None
+
+    async def build_background(self):
+        """Рендер усіх текстів — у потоці після старту, щоб не тримати event loop і health check"""
+        started = datetime.now()
+        await asyncio.to_thread(self.rebuild)
+        print(f"🔎 Inline-індекс готовий: {len(self.articles)} результатів за "
+              f"{(datetime.now() - started).total_seconds():.2f} с")
+
+    def _index_prefixes(self):
+        # "9" -> усі дев'яті, "9б" -> лише 9-Б; ключ без дефіса і в нижньому регістрі
+        self.class_prefixes = {"": list(self.classes)}
+        for class_name in self.classes:
+            key = _class_key(class_name)
+            for i in range(1, len(key) + 1):
+                self.class_prefixes.setdefault(key[:i], []).append(class_name)
+
+        self.day_prefixes = {}
+        for day_key, aliases in DAY_ALIASES.items():
+            for alias in aliases:
+                for i in range(2 if len(alias) > 2 else 1, len(alias) + 1):
+                    keys = self.day_prefixes.setdefault(alias[:i], [])
+                    if day_key not in keys:
+                        keys.append(day_key)
+
+    def invalidate_dated(self, class_name):
+        self.dated_articles.pop((class_name, 0), None)
+        self.dated_articles.pop((class_name, 1), None)
+
+    def _dated_article(self, class_name, offset):
+        """Сьогодні / завтра з урахуванням замін; будується при першому запиті і живе до кінця дня"""
+        today = datetime.now().date()
+        if self._dated_on != today:
+            self.dated_articles = {}
+            self._dated_on = today
+        article = self.dated_articles.get((class_name, offset))
+        if article is None:
+            label = "сьогодні" if offset == 0 else "завтра"
+            article = self.dated_articles[class_name, offset] = self._article(
+                f"{self.classes.index(class_name)}:{offset}d", f"{class_name} — {label}",
+                self.render_dated(class_name, offset),
+            )
+        return article
+
+    @staticmethod
+    def _article(result_id, title, text):
+        lessons = [line.split(". ", 1)[-1] for line in text.splitlines() if line[:1].isdigit()]
+        return InlineQueryResultArticle(
+            id=result_id,
+            title=title,
+            description=", ".join(lessons)[:120] or "Немає уроків",
+            input_message_content=InputTextMessageContent(message_text=text[:MAX_LEN]),
+        )
+
+    def parse(self, query: str):
+        """(класи, ключі днів, чи є у запиті відносний день) для тексту inline-запиту"""
+        text = (query or "").lower()
+        classes = self.classes
+        match = CLASS_RE.search(text)
+        if match:
+            letter = (match.group(2) or "").translate(LATIN_LETTERS)
+            classes = self.class_prefixes.get(match.group(1) + letter, [])
+            text = text[:match.start()] + " " + text[match.end():]
+
+        days = []
+        for word in text.replace("-", " ").split():
+            for day_key in self.day_prefixes.get(word, ()):
+                if day_key not in days:
+                    days.append(day_key)
+
+        relative = not days or "today" in days or "tomorrow" in days
+        if not days:
+            days = ["today", "tomorrow", "week"]
+        if self.render_dated:
+            return classes, days, relative
+        resolved = []
+        for day_key in days:
+            day_key = {"today": weekday_key(0), "tomorrow": weekday_key(1)}.get(day_key, day_key)
+            if day_key not in resolved:
+                resolved.append(day_key)
+        return classes, resolved, relative
+
+    def search(self, query: str):
+        if self.articles is None:
+            # Запит прийшов раніше, ніж фонова побудова закінчилась
+            self.rebuild()
+        classes, days, relative = self.parse(query)
+        results = []
+        for class_name in classes:
+            for day_key in days:
+                if day_key in ("today", "tomorrow"):
+                    article = self._dated_article(class_name, 0 if day_key == "today" else 1)
+                else:
+                    article = self.articles.get((class_name, day_key))
+                if article:
+                    results.append(article)
+                    if len(results) >= INLINE_MAX_RESULTS:
+                        return results, relative
+        return results, relative
+
+
+def seconds_until_midnight():
+    now = datetime.now()
+    return int((datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds())
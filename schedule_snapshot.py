@@ -0,0 +1,162 @@
+"""Знімок розкладу для швидкого старту: розібраний JSON і індекс уроків у pickle з хешем джерел.
+
+    python schedule_snapshot.py            # зібрати знімок після зміни розкладу чи дзвінків
+    python schedule_snapshot.py --check    # чи знімок відповідає поточним json
+
+На старті бот порівнює хеш у заголовку знімка з хешем schedule_full.json і bells_schedule.json:
+збігся — розпаковує знімок, не збігся (або знімка немає) — розбирає JSON і перезаписує знімок.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+
+from config import ALL_CLASSES, BELLS_FILE, SCHEDULE_FILE, SNAPSHOT_FILE
+
+# Змінювати при зміні структури знімка — старі знімки тоді просто не збігаються за хешем
+FORMAT = b"normai-schedule-1"
+MAGIC = b"NSNP"
+HEADER_SIZE = len(MAGIC) + hashlib.sha256().digest_size
+
+DEFAULT_SCHEDULE = {"classes": ALL_CLASSES, "schedule": {}}
+DEFAULT_BELLS = {"shift_1": {}, "shift_2": {}}
+
+
+class Schedule:
+    """Розклад і дзвінки як їх бачить бот, плюс індекс (день, клас) -> {номер: (предмет, кабінет)}"""
+
+    __slots__ = ("data", "bells", "lessons", "digest", "source")
+
+    def __init__(self, data, bells, lessons, digest, source):
+        self.data = data
+        self.bells = bells
+        self.lessons = lessons
+        self.digest = digest
+        self.source = source
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def source_digest(*blobs):
+    h = hashlib.sha256(FORMAT)
+    for blob in blobs:
+        # Довжина перед вмістом: відсутній файл і порожній файл дають різні хеші
+        h.update(b"-" if blob is None else len(blob).to_bytes(8, "little") + blob)
+    return h.digest()
+
+
+def _intern(obj, memo):
+    """Однакові рядки ("РЕЗЕРВ", "", назви класів) — один об'єкт: pickle тоді пише їх раз і вантажиться швидше"""
+    if isinstance(obj, dict):
+        return {_intern(k, memo): _intern(v, memo) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_intern(v, memo) for v in obj]
+    if isinstance(obj, str):
+        return memo.setdefault(obj, obj)
+    return obj
+
+
+def index_lessons(data):
+    lessons = {}
+    for day_key, day in data.get("schedule", {}).items():
+        for lesson in day:
+            number = lesson.get("lesson_number")
+            for class_name, info in lesson.get("classes", {}).items():
+                if info and info.get("subject"):
+                    by_number = lessons.setdefault((day_key, class_name), {})
+                    by_number.setdefault(number, (info["subject"], info.get("room", "")))
+    return lessons
+
+
+def parse(schedule_raw, bells_raw, digest):
+    def loads(raw, default):
+        try:
+            return json.loads(raw) if raw is not None else default
+        except ValueError:
+            return default
+
+    memo = {}
+    data = _intern(loads(schedule_raw, DEFAULT_SCHEDULE), memo)
+    bells = _intern(loads(bells_raw, DEFAULT_BELLS), memo)
+    return Schedule(data, bells, index_lessons(data), digest, "json")
+
+
+def write_snapshot(schedule: Schedule, path=SNAPSHOT_FILE):
+    payload = pickle.dumps((schedule.data, schedule.bells, schedule.lessons), protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + schedule.digest + payload)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, digest):
+    """Знімок, якщо його хеш збігся з джерелами, інакше None; сам pickle розбирається лише після перевірки"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if header != MAGIC + digest:
+                return None
+            data, bells, lessons = pickle.loads(f.read())
+    except (OSError, pickle.UnpicklingError, ValueError, EOFError):
+        return None
+    return Schedule(data, bells, lessons, digest, "snapshot")
+
+
+def load_schedule(schedule_file=SCHEDULE_FILE, bells_file=BELLS_FILE, path=SNAPSHOT_FILE):
+    schedule_raw = _read(schedule_file)
+    bells_raw = _read(bells_file)
+    digest = source_digest(schedule_raw, bells_raw)
+    schedule = read_snapshot(path, digest)
+    if schedule is not None:
+        return schedule
+
+    schedule = parse(schedule_raw, bells_raw, digest)
+    if schedule_raw is not None:
+        try:
+            write_snapshot(schedule, path)
+        except OSError as e:
+            print(f"⚠️ Знімок розкладу не записано: {e}")
+    return schedule
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Знімок розкладу для швидкого старту")
+    parser.add_argument("--schedule", default=SCHEDULE_FILE)
+    parser.add_argument("--bells", default=BELLS_FILE)
+    parser.add_argument("--output", default=SNAPSHOT_FILE)
+    parser.add_argument("--check", action="store_true", help="лише перевірити, що знімок актуальний")
+    args = parser.parse_args()
+
+    schedule_raw = _read(args.schedule)
+    if schedule_raw is None:
+        sys.exit(f"❌ Немає {args.schedule}")
+    digest = source_digest(schedule_raw, _read(args.bells))
+
+    if args.check:
+        fresh = read_snapshot(args.output, digest) is not None
+        print("✅ Знімок актуальний" if fresh else "❌ Знімок застарів або відсутній")
+        sys.exit(0 if fresh else 1)
+
+    started = time.perf_counter()
+    schedule = parse(schedule_raw, _read(args.bells), digest)
+    parsed = time.perf_counter() - started
+    write_snapshot(schedule, args.output)
+
+    started = time.perf_counter()
+    read_snapshot(args.output, digest)
+    loaded = time.perf_counter() - started
+    print(f"✅ {args.output}: {os.path.getsize(args.output)} байт, {len(schedule.lessons)} пар (день, клас); "
+          f"JSON {parsed * 1000:.2f} мс, знімок {loaded * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Семантичний кеш відповідей AI: питання, що відрізняються лише формулюванням, отримують збережену відповідь.
+
+Вмикається SEMANTIC_CACHE=local|gemini і потребує numpy (pip install numpy); без нього кеш просто вимкнено.
+Ключ — саме питання користувача без службових інструкцій; запити з історією діалогу не кешуються,
+бо їхня відповідь залежить від контексту.
+"""
+import re
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from config import (
+    SEMANTIC_CACHE, SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_TTL, SEMANTIC_DIM, SEMANTIC_EMBED_MODEL,
+    SEMANTIC_THRESHOLDS,
+)
+
+WORD_RE = re.compile(r"\w+")
+# Звороти, з яких починають питання, — вони не несуть змісту і лише розводять вектори
+STOP_WORDS = {
+    "поясни", "поясніть", "розкажи", "розкажіть", "що", "таке", "це", "як", "а", "і", "й", "та", "в", "у",
+    "на", "про", "мені", "будь", "ласка", "будьласка", "скажи", "скажіть", "можеш", "можна", "є", "ж",
+    "what", "is", "the", "a", "an", "explain", "please", "tell", "me", "about",
+}
+
+
+class HashingEmbedder:
+    """Локальна легка модель: хешовані слова і триграми символів у нормований вектор, без мережі"""
+
+    name = "local"
+
+    def __init__(self, dim=SEMANTIC_DIM):
+        self.dim = dim
+
+    def __call__(self, text: str):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in WORD_RE.findall(text.lower()):
+            if word in STOP_WORDS:
+                continue
+            vector[zlib.crc32(word.encode()) % self.dim] += 1.0
+            # Триграми ловлять відмінки: "закон Ома" / "закону Ома"
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                vector[zlib.crc32(padded[i:i + 3].encode()) % self.dim] += 0.5
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+
+class GeminiEmbedder:
+    """Ембединги з Gemini API; embed(text, model) ходить через роутер ключів і не тягне SDK на старті"""
+
+    name = "gemini"
+
+    def __init__(self, embed, model=SEMANTIC_EMBED_MODEL):
+        self.embed = embed
+        self.model = model
+
+    def __call__(self, text: str):
+        vector = np.asarray(self.embed(text, self.model), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+
+class VectorIndex:
+    """Нормовані вектори в одній матриці фіксованої місткості; косинус — це просто скалярний добуток"""
+
+    def __init__(self, capacity=SEMANTIC_CACHE_SIZE):
+        self.capacity = capacity
+        self.matrix = None
+        self.answers = [None] * capacity
+        self.created = np.zeros(capacity)
+        self.used = np.zeros(capacity)
+        self.size = 0
+
+    def _slot(self, now, ttl):
+        if self.size < self.capacity:
+            self.size += 1
+            return self.size - 1, False
+        # Спершу прострочені, далі — найдавніше використані
+        expired = np.flatnonzero(now - self.created > ttl)
+        if expired.size:
+            return int(expired[0]), True
+        return int(np.argmin(self.used)), True
+
+    def add(self, vector, answer, now, ttl):
+        if self.matrix is None:
+            self.matrix = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        slot, evicted = self._slot(now, ttl)
+        self.matrix[slot] = vector
+        self.answers[slot] = answer
+        self.created[slot] = now
+        self.used[slot] = now
+        return evicted
+
+    def top(self, vector, k=1):
+        """[(подібність, слот)] k найближчих, від найближчого"""
+        if not self.size:
+            return []
+        scores = self.matrix[:self.size] @ vector
+        if k == 1:
+            best = int(np.argmax(scores))
+            return [(float(scores[best]), best)]
+        k = min(k, self.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        return sorted(((float(scores[i]), int(i)) for i in best), reverse=True)
+
+
+class SemanticCache:
+    """Індекс на кожен (режим, детальність) і метрики влучань"""
+
+    def __init__(self, embedder, threshold=None, capacity=SEMANTIC_CACHE_SIZE, ttl=SEMANTIC_CACHE_TTL,
+                 clock=time.time):
+        self.embedder = embedder
+        self.threshold = threshold if threshold is not None else SEMANTIC_THRESHOLDS.get(embedder.name, 0.9)
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.indexes = {}
+        self._lock = threading.Lock()
+        self.lookups = self.hits = self.stores = self.evictions = self.errors = 0
+
+    @classmethod
+    def from_env(cls, embed):
+        """Кеш за SEMANTIC_CACHE або None, якщо вимкнено чи немає numpy"""
+        if SEMANTIC_CACHE in ("", "0", "off"):
+            return None
+        if np is None:
+            print("⚠️ SEMANTIC_CACHE увімкнено, але numpy не встановлено: pip install numpy")
+            return None
+        if SEMANTIC_CACHE == "gemini":
+            return cls(GeminiEmbedder(embed))
+        return cls(HashingEmbedder())
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def _embed(self, text):
+        try:
+            return self.embedder(text)
+        except Exception as e:
+            # Кеш — лише оптимізація: збій ембедера означає промах, а не помилку для користувача
+            self.errors += 1
+            print(f"⚠️ Семантичний кеш: {str(e)[:100]}")
+            return None
+
+    def lookup(self, key, question: str):
+        """(відповідь, вектор питання); вектор передається в store, щоб не рахувати його двічі"""
+        vector = self._embed(question)
+        with self._lock:
+            self.lookups += 1
+            index = self.indexes.get(key)
+            if vector is None or index is None:
+                return None, vector
+            now = self.clock()
+            for score, slot in index.top(vector):
+                if score >= self.threshold and now - index.created[slot] <= self.ttl:
+                    index.used[slot] = now
+                    self.hits += 1
+                    return index.answers[slot], vector
+        return None, vector
+
+    def store(self, key, vector, answer: str):
+        if vector is None or not answer:
+            return
+        with self._lock:
+            index = self.indexes.get(key)
+            if index is None:
+                index = self.indexes[key] = VectorIndex(self.capacity)
+            if index.add(vector, answer, self.clock(), self.ttl):
+                self.evictions += 1
+            self.stores += 1
+
+    def report(self):
+        entries = sum(index.size for index in self.indexes.values())
+        return (f"🧠 Семантичний кеш ({self.embedder.name}): {self.hits}/{self.lookups} влучань "
+                f"({self.hit_rate:.0%}), {entries} відповідей, витіснено {self.evictions}")
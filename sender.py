@@ -0,0 +1,166 @@
+import asyncio
+import time
+from collections import deque
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import SEND_CHAT_BURST, SEND_CHAT_RATE, SEND_GLOBAL_RATE, SEND_MAX_RETRIES
+
+# Методи, що йдуть через чергу чату; решта (getUpdates, answerCallbackQuery...) — напряму
+QUEUED_METHODS = {
+    "SendMessage", "SendDocument", "SendPhoto", "EditMessageText", "EditMessageReplyMarkup",
+    "DeleteMessage", "SendChatAction",
+}
+# Результат цих методів ніхто не використовує — не змушуємо хендлер чекати на відправку
+FIRE_AND_FORGET = {"EditMessageText", "EditMessageReplyMarkup", "DeleteMessage", "SendChatAction"}
+# Дії, що не рахуються в ліміт повідомлень чату
+UNPACED = {"DeleteMessage", "SendChatAction"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            delay = self.delay()
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+
+class _Job:
+    __slots__ = ("make_request", "bot", "method", "name", "future", "attempts")
+
+    def __init__(self, make_request, bot, method, future):
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.name = type(method).__name__
+        self.future = future
+        self.attempts = 0
+
+    def edits(self, message_id):
+        return self.name in ("EditMessageText", "EditMessageReplyMarkup") and self.method.message_id == message_id
+
+
+class _ChatQueue:
+    __slots__ = ("jobs", "bucket", "paused_until", "task")
+
+    def __init__(self):
+        self.jobs = deque()
+        self.bucket = TokenBucket(SEND_CHAT_RATE, SEND_CHAT_BURST)
+        self.paused_until = 0.0
+        self.task = None
+
+
+class OutboundSender(BaseRequestMiddleware):
+    """Всі вихідні виклики Bot API: черга FIFO на чат, спільний ліміт, злиття правок, RetryAfter"""
+
+    def __init__(self, global_rate=SEND_GLOBAL_RATE):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chats = {}
+        self.coalesced = 0
+        self.retried = 0
+        self._calls = 0
+
+    def pending(self):
+        return sum(len(chat.jobs) for chat in self.chats.values())
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        chat_id = getattr(method, "chat_id", None)
+        if name not in QUEUED_METHODS or chat_id is None:
+            return await make_request(bot, method)
+
+        self._calls += 1
+        if self._calls % 256 == 0:
+            self._prune()
+
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = _ChatQueue()
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(make_request, bot, method, future)
+        message_id = getattr(method, "message_id", None)
+
+        if job.name in ("EditMessageText", "EditMessageReplyMarkup") and chat.jobs and chat.jobs[-1].edits(message_id):
+            # Кілька правок поспіль того самого повідомлення — відправиться лише остання
+            chat.jobs[-1].method = method
+            self.coalesced += 1
+        else:
+            if name == "DeleteMessage" and message_id is not None:
+                before = len(chat.jobs)
+                chat.jobs = deque(j for j in chat.jobs if not j.edits(message_id))
+                self.coalesced += before - len(chat.jobs)
+            chat.jobs.append(job)
+
+        if chat.task is None:
+            chat.task = asyncio.create_task(self._drain(chat))
+
+        if name in FIRE_AND_FORGET:
+            if not future.done():
+                future.set_result(True)
+            return True
+        return await future
+
+    async def _drain(self, chat):
+        try:
+            while chat.jobs:
+                pause = chat.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                if chat.jobs[0].name not in UNPACED:
+                    await chat.bucket.acquire()
+                await self.global_bucket.acquire()
+                if not chat.jobs:
+                    break
+
+                # Голову черги беремо лише після очікування — поки чекали, правки могли злитися
+                job = chat.jobs.popleft()
+                try:
+                    result = await job.make_request(job.bot, job.method)
+                except TelegramRetryAfter as e:
+                    if job.attempts < SEND_MAX_RETRIES:
+                        job.attempts += 1
+                        self.retried += 1
+                        chat.paused_until = time.monotonic() + e.retry_after
+                        chat.jobs.appendleft(job)
+                        continue
+                    self._fail(job, e)
+                except Exception as e:
+                    self._fail(job, e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+        finally:
+            chat.task = None
+
+    def _prune(self):
+        # Чат без черги забуваємо, коли його ліміт уже повністю відновився
+        idle = SEND_CHAT_BURST / SEND_CHAT_RATE
+        now = time.monotonic()
+        for chat_id in [cid for cid, chat in self.chats.items()
+                        if chat.task is None and not chat.jobs and now - chat.bucket.updated >= idle]:
+            del self.chats[chat_id]
+
+    @staticmethod
+    def _fail(job, error):
+        if not job.future.done():
+            job.future.set_exception(error)
+        elif job.name not in ("DeleteMessage", "SendChatAction"):
+            print(f"⚠️ {job.name} не відправлено: {str(error)[:100]}")
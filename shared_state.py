@@ -0,0 +1,407 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime
+
+from config import LEADER_TTL, LOCK_TTL, REDIS_URL, SESSION_TTL
+
+# Атомарні операції над чужим ключем: відпустити / продовжити, лише якщо ключ ще наш
+RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+RENEW_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) "
+                "else return 0 end")
+
+DATETIME_FIELDS = ("first_seen", "last_active")
+
+
+class FakeRedis:
+    """Процесна заміна redis.asyncio.Redis з тим піднабором команд, що потрібен SharedState.
+
+    Використовується як бекенд за замовчуванням (одна репліка), а спільний екземпляр на кілька
+    SharedState(FakeRedis()) дозволяє перевірити поведінку реплік без сервера Redis.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.scripts = {RELEASE_SCRIPT: self._release, RENEW_SCRIPT: self._renew}
+
+    def _alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _set_ttl(self, key, px=None, ex=None):
+        if px is not None or ex is not None:
+            self.expires[key] = time.monotonic() + (px / 1000 if px is not None else ex)
+        else:
+            self.expires.pop(key, None)
+
+    async def get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = value if isinstance(value, str) else str(value)
+        self._set_ttl(key, px, ex)
+        return True
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    async def pexpire(self, key, ms):
+        if not self._alive(key):
+            return 0
+        self._set_ttl(key, px=ms)
+        return 1
+
+    async def incrby(self, key, amount=1):
+        value = int(self.data.get(key, 0) if self._alive(key) else 0) + amount
+        self.data[key] = str(value)
+        return value
+
+    async def hincrby(self, key, field, amount=1):
+        bucket = self.data.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + amount)
+        return int(bucket[field])
+
+    async def hset(self, key, field, value):
+        bucket = self.data.setdefault(key, {})
+        added = field not in bucket
+        bucket[field] = value
+        return int(added)
+
+    async def hdel(self, key, *fields):
+        bucket = self.data.get(key, {})
+        return sum(bucket.pop(field, None) is not None for field in fields)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {})) if self._alive(key) else {}
+
+    async def sadd(self, key, *members):
+        bucket = self.data.setdefault(key, set())
+        before = len(bucket)
+        bucket.update(str(m) for m in members)
+        return len(bucket) - before
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set())) if self._alive(key) else set()
+
+    async def scard(self, key):
+        return len(self.data.get(key, set())) if self._alive(key) else 0
+
+    async def rpush(self, key, *values):
+        bucket = self.data.setdefault(key, deque())
+        bucket.extend(values)
+        return len(bucket)
+
+    async def lpop(self, key):
+        bucket = self.data.get(key)
+        return bucket.popleft() if bucket else None
+
+    async def eval(self, script, numkeys, *args):
+        return self.scripts[script](args[:numkeys], args[numkeys:])
+
+    def _release(self, keys, argv):
+        if self._alive(keys[0]) and self.data[keys[0]] == argv[0]:
+            self.data.pop(keys[0], None)
+            self.expires.pop(keys[0], None)
+            return 1
+        return 0
+
+    def _renew(self, keys, argv):
+        if self._alive(keys[0]) and self.data[keys[0]] == argv[0]:
+            self._set_ttl(keys[0], px=int(argv[1]))
+            return 1
+        return 0
+
+    async def aclose(self):
+        pass
+
+
+def _default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _restore(state: dict) -> dict:
+    for field in DATETIME_FIELDS:
+        if isinstance(state.get(field), str):
+            state[field] = datetime.fromisoformat(state[field])
+    return state
+
+
+def _encode_session(state: dict) -> str:
+    return json.dumps(state, ensure_ascii=False, default=_default)
+
+
+def _decode_session(raw: str) -> dict:
+    return _restore(json.loads(raw))
+
+
+def write_sessions(filename, states: dict):
+    """Сесії однієї репліки на диск при зупинці (з Redis вони й так переживають рестарт)"""
+    tmp = filename + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(states, f, ensure_ascii=False, separators=(",", ":"), default=_default)
+    os.replace(tmp, filename)
+
+
+def read_sessions(filename) -> dict:
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            return {int(uid): _restore(state) for uid, state in json.load(f).items()}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+class _DistributedLock:
+    def __init__(self, redis, key, ttl):
+        self.redis = redis
+        self.key = key
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+
+    async def __aenter__(self):
+        delay = 0.02
+        while not await self.redis.set(self.key, self.token, nx=True, px=int(self.ttl * 1000)):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+
+
+class SharedState:
+    """Стан, спільний для реплік бота: сесії, блокування, лічильники, черги задач і конфіг.
+
+    З REDIS_URL працює через Redis; без нього — через FakeRedis у пам'яті процесу (одна репліка).
+    """
+
+    def __init__(self, redis=None, prefix="normai:"):
+        self.redis = redis or FakeRedis()
+        self.distributed = redis is not None
+        self.prefix = prefix
+        self._local_locks = defaultdict(asyncio.Lock)
+
+    @classmethod
+    def from_env(cls):
+        if not REDIS_URL:
+            return cls()
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("REDIS_URL задано, але пакет redis не встановлено: pip install redis")
+        return cls(aioredis.from_url(REDIS_URL, decode_responses=True))
+
+    def key(self, *parts):
+        return self.prefix + ":".join(str(p) for p in parts)
+
+    # ---------- сесії ----------
+
+    async def load_session(self, user_id: int):
+        raw = await self.redis.get(self.key("session", user_id))
+        return _decode_session(raw) if raw else None
+
+    async def save_session(self, user_id: int, state: dict):
+        await self.redis.set(self.key("session", user_id), _encode_session(state), ex=SESSION_TTL)
+
+    # ---------- блокування ----------
+
+    def lock(self, name: str, ttl=LOCK_TTL):
+        """Блокування на всі репліки; в одному процесі — звичайний asyncio.Lock"""
+        if not self.distributed:
+            return self._local_locks[name]
+        return _DistributedLock(self.redis, self.key("lock", name), ttl)
+
+    # ---------- лічильники і множини ----------
+
+    async def incr(self, name: str, amount=1, field=None):
+        if field is None:
+            return await self.redis.incrby(self.key(name), amount)
+        return await self.redis.hincrby(self.key(name), field, amount)
+
+    async def counters(self, name: str):
+        return {field: int(value) for field, value in (await self.redis.hgetall(self.key(name))).items()}
+
+    async def add_members(self, name: str, *members):
+        return await self.redis.sadd(self.key(name), *members) if members else 0
+
+    async def members(self, name: str):
+        return await self.redis.smembers(self.key(name))
+
+    async def count(self, name: str):
+        return await self.redis.scard(self.key(name))
+
+    async def claim(self, name: str, ttl):
+        """Одноразове захоплення ключа на всі репліки: True лише для першого"""
+        return bool(await self.redis.set(self.key(name), "1", nx=True, ex=ttl))
+
+    async def expire(self, name: str, seconds):
+        return await self.redis.pexpire(self.key(name), int(seconds * 1000))
+
+    async def get_value(self, name: str):
+        return await self.redis.get(self.key(name))
+
+    async def set_value(self, name: str, value, ttl=None):
+        await self.redis.set(self.key(name), value, ex=ttl)
+
+    async def delete(self, *names):
+        return await self.redis.delete(*(self.key(name) for name in names)) if names else 0
+
+    # ---------- записи (підписки, заміни) ----------
+
+    async def put_record(self, name: str, field, value):
+        """Запис у спільній таблиці; кожна зміна збільшує версію, за якою інші репліки помічають її"""
+        await self.redis.hset(self.key(name), str(field), json.dumps(value, ensure_ascii=False))
+        await self.redis.incrby(self.key(name, "version"))
+
+    async def drop_records(self, name: str, *fields):
+        if fields:
+            await self.redis.hdel(self.key(name), *(str(field) for field in fields))
+            await self.redis.incrby(self.key(name, "version"))
+
+    async def records(self, name: str):
+        return {field: json.loads(raw) for field, raw in (await self.redis.hgetall(self.key(name))).items()}
+
+    async def version(self, name: str):
+        return int(await self.redis.get(self.key(name, "version")) or 0)
+
+    # ---------- конфіг ----------
+
+    async def get_json(self, name: str, default=None):
+        raw = await self.redis.get(self.key("config", name))
+        return json.loads(raw) if raw else default
+
+    async def set_json(self, name: str, value):
+        await self.redis.set(self.key("config", name), json.dumps(value, ensure_ascii=False))
+
+    # ---------- черги задач ----------
+
+    async def push_job(self, queue: str, payload: dict):
+        await self.redis.rpush(self.key("jobs", queue), json.dumps(payload, ensure_ascii=False))
+
+    async def pop_job(self, queue: str):
+        raw = await self.redis.lpop(self.key("jobs", queue))
+        return json.loads(raw) if raw else None
+
+
+class StatsSync:
+    """Періодично зливає локальні лічильники STATS у спільні; гарячий шлях хендлерів не змінюється"""
+
+    COUNTERS = ("total_users", "commands_used", "schedule_views", "ai_queries")
+
+    def __init__(self, stats, shared: SharedState):
+        self.stats = stats
+        self.shared = shared
+        self.flushed = {name: 0 for name in self.COUNTERS}
+        self.flushed_active = set()
+        self.flushed_donors = set()
+
+    async def flush(self):
+        for name in self.COUNTERS:
+            value = getattr(self.stats, name)
+            if value != self.flushed[name]:
+                await self.shared.incr("stats", value - self.flushed[name], field=name)
+                self.flushed[name] = value
+        day = datetime.now().date().isoformat()
+        active = self.stats.daily_active - self.flushed_active
+        if active:
+            await self.shared.add_members(f"active:{day}", *active)
+            await self.shared.expire(f"active:{day}", 2 * 86400)
+            # Усі, кого бачила будь-яка репліка, — отримувачі розсилки
+            await self.shared.add_members("users", *active)
+            self.flushed_active |= active
+        donors = self.stats.donors - self.flushed_donors
+        if donors:
+            await self.shared.add_members("donors", *donors)
+            self.flushed_donors |= donors
+
+    async def totals(self):
+        await self.flush()
+        totals = await self.shared.counters("stats")
+        totals["active_today"] = await self.shared.count(f"active:{datetime.now().date().isoformat()}")
+        totals["donors"] = await self.shared.count("donors")
+        return totals
+
+    async def run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Синхронізація статистики: {e}")
+
+
+def replica_id():
+    return os.getenv("RENDER_INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaderElection:
+    """Лідер — власник ключа з TTL; тільки лідер запускає запланові задачі (нагадування, розсилки)"""
+
+    def __init__(self, shared: SharedState, name="scheduler", ttl=LEADER_TTL, identity=None):
+        self.shared = shared
+        self.key = shared.key("leader", name)
+        self.ttl = ttl
+        self.identity = identity or replica_id()
+        self.is_leader = not shared.distributed
+        self._elected = asyncio.Event()
+        self._lost = asyncio.Event()
+        self._set(self.is_leader)
+        self.task = None
+
+    def _set(self, leader):
+        self.is_leader = leader
+        (self._elected if leader else self._lost).set()
+        (self._lost if leader else self._elected).clear()
+
+    async def step(self):
+        redis = self.shared.redis
+        ttl_ms = int(self.ttl * 1000)
+        if self.is_leader:
+            self.is_leader = bool(await redis.eval(RENEW_SCRIPT, 1, self.key, self.identity, ttl_ms))
+        if not self.is_leader:
+            self.is_leader = bool(await redis.set(self.key, self.identity, nx=True, px=ttl_ms))
+        self._set(self.is_leader)
+        return self.is_leader
+
+    async def run(self):
+        while True:
+            try:
+                was_leader = self.is_leader
+                if await self.step() != was_leader:
+                    print(f"👑 {self.identity}: {'лідер' if self.is_leader else 'більше не лідер'}")
+            except Exception as e:
+                # Без зв'язку з Redis не можемо підтвердити лідерство — краще зупинити задачі
+                self._set(False)
+                print(f"⚠️ Вибори лідера: {e}")
+            await asyncio.sleep(self.ttl / 3)
+
+    def start(self):
+        if self.shared.distributed and self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def wait(self):
+        await self._elected.wait()
+
+    async def wait_lost(self):
+        await self._lost.wait()
+
+    async def resign(self):
+        if self.is_leader and self.shared.distributed:
+            await self.shared.redis.eval(RELEASE_SCRIPT, 1, self.key, self.identity)
+        self._set(False)
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def gemini_server():
+    """benchmarks/fake_gemini_server.py на випадковому порту у фоновому потоці; .url — адреса для SDK"""
+    from aiohttp import web
+
+    from benchmarks.fake_gemini_server import FakeGeminiServer
+
+    server = FakeGeminiServer(latency=0, jitter=0, seed=1)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(server.app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    server.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.run_until_complete(runner.cleanup())
+    loop.close()
+
+
+@pytest.fixture
+def long_instruction():
+    """Інструкція, довша за поріг кешу контексту"""
+    return "Ти вчитель фізики. " * 400
+
+
+@pytest.fixture
+def gemini_client(gemini_server, monkeypatch, tmp_path, long_instruction):
+    """GeminiClient з одним ключем, що ходить у фейковий сервер; режим physics — з довгою інструкцією"""
+    import gemini_router
+    from geminiclient import GeminiClient
+
+    monkeypatch.setattr(gemini_router, "GEMINI_BASE_URL", gemini_server.url)
+    monkeypatch.setattr(gemini_router, "CONTEXT_CACHE_ENABLED", True)
+    client = GeminiClient()
+    client.instructions_file = str(tmp_path / "instructions.json")
+    client._save_instructions({"assistant": "Коротко.", "physics": long_instruction})
+    client._router = gemini_router.GeminiRouter(["fake-key-0001"])
+    return client
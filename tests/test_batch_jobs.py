@@ -0,0 +1,94 @@
+import asyncio
+
+from batch_jobs import BatchRunner, BatchStore
+from resilience import CircuitBreaker, GeminiUnavailable, ResilientCaller
+
+
+class ScriptedClient:
+    """ask() кидає помилку для запитів з `fail`, доки fail не скинуть"""
+
+    def __init__(self, fail):
+        self.fail = set(fail)
+        self.asked = []
+
+    def ask(self, prompt, mode, *args, fallback=True):
+        self.asked.append(prompt)
+        if prompt in self.fail:
+            raise GeminiUnavailable("недоступний") if prompt == "503" else ValueError("несподівано")
+        return f"відповідь: {prompt}"
+
+
+def run_job(runner, job):
+    asyncio.run(runner.run(job))
+
+
+def test_unexpected_item_error_is_recorded(tmp_path):
+    client = ScriptedClient({"503", "bug"})
+    runner = BatchRunner(client, BatchStore(str(tmp_path)))
+    job = runner.submit([("assistant", "ok"), ("assistant", "503"), ("assistant", "bug")], chat_id=1)
+    run_job(runner, job)
+    assert job.status == "partial"
+    assert job.errors[1] == "недоступний"
+    assert job.errors[2].startswith("❌ Помилка: несподівано")
+    assert job.results == {0: "відповідь: ok"}
+
+
+def test_partial_job_is_not_resumed_on_boot(tmp_path):
+    client = ScriptedClient({"bug"})
+    runner = BatchRunner(client, BatchStore(str(tmp_path)))
+    run_job(runner, runner.submit([("assistant", "ok"), ("assistant", "bug")], chat_id=1))
+    interrupted = runner.submit([("assistant", "later")], chat_id=1)
+    interrupted.status = "running"
+    runner.store.save_meta(interrupted)
+
+    async def boot():
+        restarted = BatchRunner(client, BatchStore(str(tmp_path)))
+        tasks = restarted.resume()
+        await asyncio.gather(*tasks)
+        return restarted, tasks
+
+    restarted, tasks = asyncio.run(boot())
+    assert len(tasks) == 1
+    assert restarted.jobs[interrupted.id].status == "done"
+    assert client.asked.count("bug") == 1
+
+
+def test_retry_reruns_only_failed_items(tmp_path):
+    client = ScriptedClient({"bug"})
+    runner = BatchRunner(client, BatchStore(str(tmp_path)))
+    job = runner.submit([("assistant", "ok"), ("assistant", "bug")], chat_id=1)
+    run_job(runner, job)
+    client.fail.clear()
+
+    async def retry():
+        await runner.retry(job)
+
+    asyncio.run(retry())
+    assert job.status == "done"
+    assert client.asked == ["ok", "bug", "bug"]
+    assert runner.retry(job) is None
+
+
+def test_saved_answer_is_an_item_error_not_a_result(gemini_client, gemini_server, tmp_path):
+    gemini_client.caller = ResilientCaller(deadline=5, retries=0, breaker=CircuitBreaker(failures=100))
+    gemini_client.caller.answers.put(("assistant", "закон Ома"), "стара відповідь")
+    gemini_server.error_rate = 1.0
+    runner = BatchRunner(gemini_client, BatchStore(str(tmp_path)))
+    job = runner.submit([("assistant", "закон Ома")], chat_id=1)
+    run_job(runner, job)
+    assert job.status == "partial"
+    assert job.results == {}
+    assert "недоступний" in job.errors[0]
+
+
+def test_finished_jobs_beyond_limit_are_evicted(tmp_path):
+    runner = BatchRunner(ScriptedClient(set()), BatchStore(str(tmp_path)), keep=2)
+    jobs = []
+    for n in range(4):
+        job = runner.submit([("assistant", str(n))], chat_id=1)
+        job.created = f"2026-10-19T10:00:0{n}"
+        run_job(runner, job)
+        jobs.append(job)
+    waiting = runner.submit([("assistant", "ще")], chat_id=1)
+    assert set(runner.jobs) == {jobs[2].id, jobs[3].id, waiting.id}
+    assert len(BatchStore(str(tmp_path)).load_all()) == 5
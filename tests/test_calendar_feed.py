@@ -0,0 +1,69 @@
+import asyncio
+import time
+from datetime import date
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import calendar_feed
+from calendar_feed import CalendarFeeds
+
+BELLS = {"shift_1": {"lessons": [{"number": 1, "start": "08:30", "end": "09:15"}]}}
+KEY = ("7-А", 1)
+
+
+class Loader:
+    def __init__(self, subject):
+        self.subject = subject
+
+    def __call__(self):
+        return SimpleNamespace(lessons={("monday", "7-А"): {1: (self.subject, "12")}}, bells=BELLS)
+
+
+def freeze(monkeypatch, day):
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return day
+
+    monkeypatch.setattr(calendar_feed, "date", Today)
+
+
+def not_modified_since(feeds, feed):
+    return CalendarFeeds.fresh(feeds[KEY], None, formatdate(feed.modified, usegmt=True))
+
+
+def test_same_body_keeps_last_modified(monkeypatch):
+    freeze(monkeypatch, date(2026, 10, 19))
+    feeds = CalendarFeeds(classes=["7-А"], loader=Loader("Фізика"))
+    first = feeds.build()[KEY]
+    feeds.invalidate()
+    assert feeds.build()[KEY].modified == first.modified
+
+
+def test_changed_body_bumps_last_modified(monkeypatch):
+    freeze(monkeypatch, date(2026, 10, 19))
+    loader = Loader("Фізика")
+    feeds = CalendarFeeds(classes=["7-А"], loader=loader)
+    first = feeds.build()[KEY]
+
+    loader.subject = "Хімія"
+    feeds.invalidate()
+    second = feeds.build()[KEY]
+    assert second.etag != first.etag
+    assert second.modified > first.modified
+    # Клієнт зі старою датою отримує нове тіло, а не 304
+    assert not not_modified_since(feeds.feeds, first)
+    assert not_modified_since(feeds.feeds, second)
+
+
+def test_new_school_year_bumps_last_modified(monkeypatch):
+    freeze(monkeypatch, date(2026, 5, 20))
+    feeds = CalendarFeeds(classes=["7-А"], loader=Loader("Фізика"))
+    first = asyncio.run(feeds.ready())[KEY]
+
+    freeze(monkeypatch, date(2026, 9, 1))
+    second = asyncio.run(feeds.ready())[KEY]
+    assert b"UNTIL=20270531" in second.body
+    assert second.modified > first.modified
+    assert second.modified >= time.mktime(date(2026, 8, 1).timetuple())
+    assert not not_modified_since(feeds.feeds, first)
@@ -0,0 +1,79 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from context_cache import InstructionCache
+
+MODEL = "gemini-2.5-flash-lite"
+
+
+@pytest.fixture
+def client(gemini_client):
+    return gemini_client
+
+
+def generate(client, prompt="закон Ома"):
+    instruction = client._load_instructions()["physics"]
+    return client._generate(prompt, "physics", instruction, (MODEL,), 100)
+
+
+def test_cache_created_once_and_reused(client, gemini_server):
+    for _ in range(5):
+        generate(client)
+    assert gemini_server.calls["cachedContents.create"] == 1
+    assert gemini_server.calls["generateContent"] == 5
+
+
+def test_transient_error_keeps_cache(client, gemini_server):
+    generate(client)
+    gemini_server.error_rate = 1.0
+    for _ in range(5):
+        with pytest.raises(Exception, match="503"):
+            generate(client)
+    # 503 іде до шару повторів: кеш не видаляється і не створюється заново, запит не дублюється інлайн
+    assert gemini_server.calls["cachedContents.create"] == 1
+    assert gemini_server.calls["cachedContents.delete"] == 0
+    assert gemini_server.calls["generateContent"] == 6
+
+    gemini_server.error_rate = 0.0
+    generate(client)
+    assert gemini_server.calls["cachedContents.create"] == 1
+
+
+def test_expired_cache_falls_back_inline_and_recreates(client, gemini_server):
+    generate(client)
+    gemini_server.caches.clear()
+    assert "модель" in generate(client)
+    # Запит з протухлим кешем + повтор з інструкцією інлайн
+    assert gemini_server.calls["generateContent"] == 3
+    generate(client)
+    assert gemini_server.calls["cachedContents.create"] == 2
+
+
+def test_short_instruction_is_not_cached(client, gemini_server):
+    client._generate("привіт", "assistant", "Коротко.", (MODEL,), 100)
+    assert gemini_server.calls["cachedContents.create"] == 0
+
+
+def test_slow_create_does_not_block_other_modes(long_instruction):
+    release = threading.Event()
+
+    def create(model, config):
+        if config.display_name == "mode-slow":
+            release.wait(5)
+        return SimpleNamespace(name=f"cachedContents/{config.display_name}")
+
+    stub = SimpleNamespace(caches=SimpleNamespace(create=create, update=None, delete=lambda name: None))
+    cache = InstructionCache(stub, min_chars=10)
+    slow = threading.Thread(target=cache.get, args=("slow", long_instruction, MODEL))
+    slow.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    assert cache.get("fast", long_instruction, MODEL) == "cachedContents/mode-fast"
+    assert time.monotonic() - started < 1
+    release.set()
+    slow.join()
+    assert cache.get("slow", long_instruction, MODEL) == "cachedContents/mode-slow"
@@ -0,0 +1,33 @@
+import hashlib
+import os
+import stat
+
+from event_log import EventLog
+
+
+def unsalted(user_id):
+    return hashlib.blake2b(str(user_id).encode(), digest_size=6).hexdigest()
+
+
+def test_random_salt_is_created_once_and_reused(tmp_path):
+    first = EventLog(directory=str(tmp_path), salt="")
+    user = first.user_hash(1259974225)
+    assert user != unsalted(1259974225)
+
+    salt_file = tmp_path / ".salt"
+    assert len(salt_file.read_bytes()) == 64
+    assert stat.S_IMODE(os.stat(salt_file).st_mode) == 0o600
+    # Після рестарту ті самі користувачі мають ті самі хеші
+    assert EventLog(directory=str(tmp_path), salt="").user_hash(1259974225) == user
+
+
+def test_salts_differ_between_deployments(tmp_path):
+    one = EventLog(directory=str(tmp_path / "a"), salt="").user_hash(42)
+    other = EventLog(directory=str(tmp_path / "b"), salt="").user_hash(42)
+    assert one != other
+
+
+def test_configured_salt_wins(tmp_path):
+    log = EventLog(directory=str(tmp_path), salt="shared-secret")
+    assert log.user_hash(42) == hashlib.blake2b(b"42", key=b"shared-secret", digest_size=6).hexdigest()
+    assert not (tmp_path / ".salt").exists()
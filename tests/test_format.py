@@ -0,0 +1,122 @@
+"""Властивості форматера: будь-яка відповідь моделі після format_ai_response і split_chunks —
+валідний Telegram HTML не довший за ліміт, і текст при розрізанні не губиться.
+Генератор і validate використовує й benchmarks/bench_format.py.
+"""
+import random
+import re
+
+import pytest
+
+from config import MAX_LEN
+from utils import format_ai_response, split_chunks, strip_html
+
+ALLOWED_TAGS = {"b", "i", "s", "u", "code", "pre", "a", "blockquote"}
+TAG_RE = re.compile(r"<(/?)([a-zA-Z]+)([^>]*)>")
+ENTITY_RE = re.compile(r"&(?:lt|gt|amp|quot|#\d+);")
+
+WORDS = ["закон", "Ома", "струм", "I = U / R", "a*b", "x_1", "2 < 3", "5 > 4", "A & B", "snake_case",
+         "https://example.com/?a=1&b=2", "**", "*", "_", "__", "`", "~~", "[", "]", "(", ")", "#", ">"]
+LINE_PREFIXES = ["", "", "", "# ", "## ", "### ", "- ", "* ", "+ ", "1. ", "> ", "  - "]
+
+
+def random_answer(rng):
+    lines = []
+    for _ in range(rng.randint(1, 60)):
+        roll = rng.random()
+        if roll < 0.05:
+            lines.append("```" + rng.choice(["", "python", "js"]))
+            continue
+        if roll < 0.08:
+            lines.append("---")
+            continue
+        words = []
+        for _ in range(rng.randint(0, 25)):
+            word = rng.choice(WORDS)
+            style = rng.random()
+            if style < 0.03:
+                word = f"***{word}***"
+            elif style < 0.1:
+                word = f"**{word}**"
+            elif style < 0.15:
+                word = f"*{word}*"
+            elif style < 0.2:
+                word = f"`{word}`"
+            elif style < 0.22:
+                word = f"[{word}](https://t.me/{word.strip('*_`')})"
+            words.append(word)
+        lines.append(rng.choice(LINE_PREFIXES) + " ".join(words))
+    return "\n".join(lines)
+
+
+def validate(chunk, limit):
+    """Повертає текст помилки або None, якщо шматок — валідний Telegram HTML"""
+    if len(chunk) > limit:
+        return f"довжина {len(chunk)} > {limit}"
+    stack = []
+    pos = 0
+    for m in TAG_RE.finditer(chunk):
+        text = chunk[pos:m.start()]
+        if "<" in text or ">" in text:
+            return f"неекранований символ у {text[:40]!r}"
+        if "&" in ENTITY_RE.sub("", text):
+            return f"неекранований & у {text[:40]!r}"
+        pos = m.end()
+        closing, name = m.group(1), m.group(2).lower()
+        if name not in ALLOWED_TAGS:
+            return f"недозволений тег {name}"
+        if closing:
+            if not stack or stack.pop() != name:
+                return f"незбалансований </{name}>"
+        else:
+            stack.append(name)
+    tail = chunk[pos:]
+    if "<" in tail or ">" in tail or "&" in ENTITY_RE.sub("", tail):
+        return f"неекранований символ у {tail[:40]!r}"
+    if stack:
+        return f"незакриті теги {stack}"
+    return None
+
+
+def long_answers(answers):
+    """Склеєні відповіді, щоб розрізання справді спрацьовувало"""
+    return ["\n\n".join(answers[i:i + 12]) for i in range(0, min(len(answers), 1200), 12)]
+
+
+def same_text(chunks, formatted):
+    """Без тегів шматки дають той самий текст з точністю до пробілів на межах"""
+    joined = "".join(strip_html(c) for c in chunks).split()
+    whole = strip_html(formatted).split()
+    return joined == whole or "".join(joined) == "".join(whole)
+
+
+@pytest.mark.parametrize(("text", "expected"), [
+    ("***x***", "<b><i>x</i></b>"),
+    ("___x___", "<b><i>x</i></b>"),
+    ("**a** і *b*", "<b>a</b> і <i>b</i>"),
+    ("`a < b`", "<code>a &lt; b</code>"),
+    ("2 < 3 & 5 > 4", "2 &lt; 3 &amp; 5 &gt; 4"),
+    ("# Закон Ома", "<b>Закон Ома</b>"),
+    ("- пункт", "• пункт"),
+    ("a *** b", "a *** b"),
+])
+def test_format_examples(text, expected):
+    assert format_ai_response(text) == expected
+
+
+def test_random_answers_give_valid_chunks():
+    rng = random.Random(34)
+    answers = [random_answer(rng) for _ in range(600)]
+    for answer in answers + long_answers(answers):
+        formatted = format_ai_response(answer)
+        chunks = list(split_chunks(formatted, MAX_LEN))
+        for chunk in chunks:
+            assert validate(chunk, MAX_LEN) is None, answer[:300]
+        assert same_text(chunks, formatted), answer[:300]
+
+
+def test_small_limit_still_gives_valid_chunks():
+    rng = random.Random(7)
+    for _ in range(150):
+        formatted = format_ai_response(random_answer(rng))
+        for chunk in split_chunks(formatted, 200):
+            assert validate(chunk, 200) is None
@@ -0,0 +1,95 @@
+import pytest
+
+import gemini_router
+from gemini_router import AllKeysLimited, GeminiRouter
+
+LITE = "gemini-2.5-flash-lite"
+
+
+def window(client, model=LITE):
+    window = client.router.routes[0].windows[model]
+    return window.requests, window.tokens, len(window.events)
+
+
+def test_failed_attempt_releases_reservation(gemini_client, gemini_server):
+    gemini_server.error_rate = 1.0
+    with pytest.raises(Exception, match="503"):
+        gemini_client._generate("питання", "assistant", "Коротко.", (LITE,), 500)
+    assert window(gemini_client)[:2] == (0, 0)
+
+
+def test_usage_corrects_the_reserved_entry(gemini_client, gemini_server):
+    gemini_client._generate("питання", "assistant", "Коротко.", (LITE,), 5000)
+    requests, tokens, events = window(gemini_client)
+    # Один запис у вікні з фактичними токенами, а не резерв плюс окрема поправка
+    assert (requests, events) == (1, 1)
+    assert 0 < tokens < 5000
+
+
+def test_free_tier_limits_locally(gemini_client):
+    for _ in range(15):
+        gemini_client.router.pick((LITE,), 10)
+    with pytest.raises(AllKeysLimited):
+        gemini_client.router.pick((LITE,), 10)
+
+
+def test_limits_from_env_and_key_tier(gemini_server, monkeypatch):
+    monkeypatch.setattr(gemini_router, "GEMINI_BASE_URL", gemini_server.url)
+    monkeypatch.setattr(gemini_router, "GEMINI_LIMITS", {LITE: {"rpm": 30}})
+    router = GeminiRouter(["free-key-0001", "paid-key-0002:tier1"])
+    free, paid = router.routes
+    assert free.limits[LITE] == {"rpm": 30, "tpm": 250_000}
+    assert paid.limits[LITE]["tpm"] == 4_000_000
+    assert "tier1" in paid.name
+
+    # 21-е питання за хвилину проходить, коли квота ключа більша за безкоштовну
+    for _ in range(21):
+        router.pick((LITE,), 10, exclude={(paid, LITE)})
+    assert free.windows[LITE].requests == 21
+
+
+def test_unlimited_tier_spreads_across_keys(gemini_server, monkeypatch):
+    monkeypatch.setattr(gemini_router, "GEMINI_BASE_URL", gemini_server.url)
+    router = GeminiRouter(["key-a-0001:none", "key-b-0002:none"])
+    picked = [router.pick((LITE,), 10)[0] for _ in range(100)]
+    assert picked.count(router.routes[0]) == 50
+
+
+def test_unknown_tier_is_rejected(gemini_server, monkeypatch):
+    monkeypatch.setattr(gemini_router, "GEMINI_BASE_URL", gemini_server.url)
+    with pytest.raises(RuntimeError, match="рівень"):
+        GeminiRouter(["key-0001:gold"])
+
+
+def test_keys_report_does_not_build_router(monkeypatch):
+    import bot as bot_module
+    import geminiclient
+    from benchmarks.fake_telegram import BENCH_TOKEN, FakeSession
+
+    def build():
+        raise AssertionError("звіт не повинен будувати роутер")
+
+    monkeypatch.setattr(geminiclient.GeminiRouter, "from_env", staticmethod(build))
+    tg_bot = bot_module.TelegramBot(geminiclient.GeminiClient(), BENCH_TOKEN, session=FakeSession(), sender=False,
+                                    journal_file=None)
+    assert "не ініціалізовані" in tg_bot.gemini_keys_report()
+    assert tg_bot.client.router_if_built is None
+
+
+def test_embeddings_go_through_router(gemini_client, gemini_server, monkeypatch):
+    from config import SEMANTIC_EMBED_MODEL
+    from semantic_cache import GeminiEmbedder
+
+    monkeypatch.setattr(gemini_router, "GEMINI_BASE_URL", gemini_server.url)
+    gemini_client._router = GeminiRouter(["fake-key-0001:none", "fake-key-0002:none"])
+    gemini_server.limited_keys = {"fake-key-0001"}
+    limited, spare = gemini_client.router.routes
+
+    embedder = GeminiEmbedder(gemini_client.embed)
+    for _ in range(3):
+        assert embedder("закон Ома") is not None
+    # Ключ у ліміті відпочиває, а ембединги рахуються у вікні запасного
+    assert limited.limited == 1
+    assert limited.windows[SEMANTIC_EMBED_MODEL].requests == 0
+    assert spare.windows[SEMANTIC_EMBED_MODEL].requests == 3
+    assert gemini_server.calls["batchEmbedContents"] == 4
@@ -0,0 +1,27 @@
+import asyncio
+
+import bot as bot_module
+from benchmarks.fake_telegram import BENCH_TOKEN, FakeSession, StubGeminiClient
+from lifecycle import Lifecycle
+from workers import WorkerPool
+
+
+def test_stop_shuts_down_worker_pool(monkeypatch, tmp_path):
+    lifecycle = Lifecycle(grace=0, deadline=1)
+    pool = WorkerPool(processes=1)
+    monkeypatch.setattr(bot_module, "LIFECYCLE", lifecycle)
+    monkeypatch.setattr(bot_module, "POOL", pool)
+
+    async def scenario():
+        tg_bot = bot_module.TelegramBot(StubGeminiClient(), BENCH_TOKEN, session=FakeSession(), sender=False,
+                                        journal_file=str(tmp_path / "update_journal.json"))
+        # LIFECYCLE зовні, журнал — до завантаження сесії
+        chain = list(tg_bot.dp.update.outer_middleware)
+        assert chain.index(lifecycle) + 1 == chain.index(tg_bot.journal)
+        assert pool.executor() is not None
+        # Чекпойнт пише сесії у робочий каталог
+        monkeypatch.chdir(tmp_path)
+        await lifecycle.stop()
+
+    asyncio.run(scenario())
+    assert pool._executor is None
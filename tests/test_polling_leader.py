@@ -0,0 +1,54 @@
+import asyncio
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+import bot as bot_module
+from benchmarks.fake_api_server import FakeTelegramServer
+from benchmarks.fake_telegram import BENCH_TOKEN, StubGeminiClient
+from shared_state import FakeRedis, SharedState
+
+
+async def until(predicate, timeout=5):
+    for _ in range(int(timeout / 0.02)):
+        if predicate():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("не дочекались")
+
+
+def test_polling_stops_when_leadership_is_lost(monkeypatch, tmp_path):
+    redis = FakeRedis()
+    monkeypatch.setattr(bot_module.SharedState, "from_env", classmethod(lambda cls: SharedState(redis)))
+    monkeypatch.setattr(bot_module, "EVENT_LOG_ENABLED", False)
+
+    async def scenario():
+        server = FakeTelegramServer()
+        session = AiohttpSession(api=TelegramAPIServer.from_base(await server.start()))
+        tg_bot = bot_module.TelegramBot(StubGeminiClient(), BENCH_TOKEN, session=session, sender=False,
+                                        journal_file=None)
+        monkeypatch.chdir(tmp_path)
+        leader = tg_bot.leader
+        running = tg_bot.dp._running_lock.locked
+        polling = asyncio.create_task(tg_bot.start_polling())
+        try:
+            await until(running)
+            # Вибори далі крокуємо вручну
+            leader.task.cancel()
+
+            # Ключ лідера перехопила інша репліка
+            await redis.set(leader.key, "other-replica")
+            assert not await leader.step()
+            await until(lambda: not running())
+            assert not polling.done()
+
+            await redis.delete(leader.key)
+            assert await leader.step()
+            await until(running)
+        finally:
+            await tg_bot.stop_intake()
+            await asyncio.wait_for(polling, 5)
+            await session.close()
+            await server.stop()
+
+    asyncio.run(scenario())
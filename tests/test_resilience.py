@@ -0,0 +1,98 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, GeminiUnavailable, ResilientCaller
+
+
+def script(server, *rolls):
+    """Наступні відповіді сервера: 0.0 — помилка (429 або 503 за налаштуванням), 0.99 — успіх"""
+    rolls = iter(rolls)
+    server.rng = SimpleNamespace(random=lambda: next(rolls, 0.99), expovariate=lambda _: 0)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(resilience, "GEMINI_RETRY_BASE", 0.01)
+
+
+@pytest.fixture
+def client(gemini_client):
+    gemini_client.caller = ResilientCaller(deadline=10, retries=2, breaker=CircuitBreaker(failures=2, cooldown=0.3))
+    return gemini_client
+
+
+def test_retries_503(client, gemini_server):
+    gemini_server.error_rate = 0.5
+    script(gemini_server, 0.0, 0.0)
+    answer = client.ask("закон Ома", question="закон Ома")
+    assert "модель" in answer
+    assert gemini_server.calls["503"] == 2
+    assert gemini_server.calls["generateContent"] == 3
+    assert client.caller.breaker.state == "closed"
+
+
+def test_breaker_opens_and_half_opens(client, gemini_server):
+    gemini_server.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(GeminiUnavailable, match="недоступний"):
+            client.ask("питання")
+    assert client.caller.breaker.state == "open"
+
+    calls = gemini_server.calls["generateContent"]
+    with pytest.raises(GeminiUnavailable, match="перевантажений"):
+        client.ask("питання")
+    # Відкритий запобіжник відповідає сам, сервер не чіпає
+    assert gemini_server.calls["generateContent"] == calls
+
+    time.sleep(0.35)
+    assert client.caller.breaker.allow()
+    assert client.caller.breaker.state == "half_open"
+    # Пробна спроба лише одна: поки вона триває, решта отримує відмову
+    assert not client.caller.breaker.allow()
+    client.caller.breaker.failure()
+    assert client.caller.breaker.state == "open"
+
+    time.sleep(0.35)
+    gemini_server.error_rate = 0.0
+    assert "модель" in client.ask("питання")
+    assert client.caller.breaker.state == "closed"
+
+
+def test_falls_back_to_other_model_on_quota(client, gemini_server):
+    gemini_server.quota_rate = 0.5
+    script(gemini_server, 0.0)
+    # Коротка відповідь іде на lite; 429 на ній — той самий запит на основну модель без очікування
+    started = time.monotonic()
+    answer = client.ask("закон Ома")
+    assert "gemini-2.5-flash" in answer and "lite" not in answer
+    assert time.monotonic() - started < gemini_server.retry_delay
+    rows = {model: cooling for _, model, _, _, cooling, _ in client.router.snapshot()}
+    assert rows["gemini-2.5-flash-lite"] > 0
+
+
+def test_saved_answer_served_when_api_down(client, gemini_server):
+    first = client.ask("закон Ома")
+    gemini_server.error_rate = 1.0
+    answer = client.ask("Закон  ома")
+    assert answer.startswith("♻️ Збережена відповідь")
+    assert first.split("\n")[-1] in answer
+
+
+def test_bad_request_does_not_close_half_open_breaker():
+    class BadRequest(Exception):
+        code = 400
+
+    def fail():
+        raise BadRequest("400 INVALID_ARGUMENT")
+
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    breaker.failure()
+    caller = ResilientCaller(deadline=5, retries=0, breaker=breaker)
+    with pytest.raises(GeminiUnavailable, match="переформулювати"):
+        caller.call(fail)
+    # Пробна спроба нічого не довела: запобіжник лишається напіввідкритим і пускає наступну пробу
+    assert breaker.state == "half_open"
+    assert breaker.allow()
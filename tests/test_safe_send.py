@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
+
+from utils import safe_send
+
+
+class FakeMessage:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.chat = SimpleNamespace(id=42)
+        self.sent = []
+
+    async def answer(self, text, reply_markup=None, parse_mode=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((text, parse_mode))
+
+
+def bad_request(text):
+    return TelegramBadRequest(method=None, message=text)
+
+
+def test_parse_error_resends_plain_text():
+    message = FakeMessage(bad_request("Bad Request: can't parse entities"))
+    asyncio.run(safe_send(message, "<b>Закон</b> Ома &amp; струм", parse_mode=ParseMode.HTML))
+    assert message.sent == [("Закон Ома & струм", None)]
+
+
+def test_other_bad_request_gets_visible_fallback():
+    message = FakeMessage(bad_request("Bad Request: message is too long"))
+    asyncio.run(safe_send(message, "текст", parse_mode=ParseMode.HTML))
+    assert message.sent == [("❌ Помилка відправки", None)]
+
+
+def test_network_error_gets_visible_fallback():
+    message = FakeMessage(TelegramNetworkError(method=None, message="timeout"))
+    asyncio.run(safe_send(message, "текст"))
+    assert message.sent == [("❌ Помилка відправки", None)]
+
+
+def test_failed_fallback_does_not_raise():
+    message = FakeMessage(bad_request("chat not found"), bad_request("chat not found"))
+    asyncio.run(safe_send(message, "текст"))
+    assert message.sent == []
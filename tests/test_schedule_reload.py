@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+import bot as bot_module
+from benchmarks.fake_telegram import BENCH_TOKEN, FakeSession, StubGeminiClient
+from calendar_feed import CALENDARS
+from config import BELLS_FILE, SCHEDULE_FILE
+from schedule_snapshot import load_schedule
+
+
+@pytest.fixture
+def schedule_file(tmp_path, monkeypatch):
+    path = tmp_path / "schedule_full.json"
+    with open(SCHEDULE_FILE, encoding="utf-8") as f:
+        path.write_text(f.read(), encoding="utf-8")
+    snapshot = str(tmp_path / "schedule.snapshot")
+    monkeypatch.setattr(bot_module, "load_schedule", lambda: load_schedule(str(path), BELLS_FILE, snapshot))
+    return path
+
+
+def set_subject(path, subject):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["schedule"]["monday"][0]["classes"]["5-А"] = {"subject": subject, "room": "7"}
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+async def settle():
+    current = asyncio.current_task()
+    await asyncio.gather(*(task for task in asyncio.all_tasks() if task is not current))
+
+
+def test_unchanged_sources_keep_caches(schedule_file):
+    async def scenario():
+        tg_bot = bot_module.TelegramBot(StubGeminiClient(), BENCH_TOKEN, session=FakeSession(), sender=False,
+                                        journal_file=None)
+        version = tg_bot.digests.version
+        assert not await tg_bot.reload_schedule()
+        assert tg_bot.digests.version == version
+
+    asyncio.run(scenario())
+
+
+def test_changed_sources_invalidate_digests_index_and_calendars(schedule_file):
+    async def scenario():
+        tg_bot = bot_module.TelegramBot(StubGeminiClient(), BENCH_TOKEN, session=FakeSession(), sender=False,
+                                        journal_file=None)
+        tg_bot.schedule_index.rebuild()
+        assert "Астрономія" not in tg_bot.digests.day("5-А", "monday")
+        CALENDARS.build()
+
+        set_subject(schedule_file, "Астрономія")
+        assert await tg_bot.reload_schedule()
+        await settle()
+
+        assert "1. Астрономія (каб. 7)" in tg_bot.digests.day("5-А", "monday")
+        assert CALENDARS.feeds is None
+        article = tg_bot.schedule_index.articles["5-А", "monday"]
+        assert "Астрономія" in article.input_message_content.message_text
+        assert tg_bot.get_lesson("5-А", "monday", 1) == ("Астрономія", "7")
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from semantic_cache import SemanticCache  # noqa: E402
+
+KEY = ("assistant", False)
+
+
+class StubEmbedder:
+    """Заздалегідь задані вектори замість моделі; рахує виклики"""
+
+    name = "stub"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        vector = np.asarray(self.vectors[text], dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def angled(cosine):
+    """Вектор під заданим косинусом до (1, 0, 0)"""
+    return [cosine, (1 - cosine ** 2) ** 0.5, 0.0]
+
+
+VECTORS = {
+    "закон Ома": [1.0, 0.0, 0.0],
+    "що таке закон Ома": angled(0.95),
+    "закон Кулона": angled(0.7),
+    "фотосинтез": [0.0, 0.0, 1.0],
+    "мітоз": [0.0, 1.0, 0.0],
+}
+
+
+def make_cache(capacity=10, ttl=3600):
+    clock = Clock()
+    cache = SemanticCache(StubEmbedder(VECTORS), threshold=0.9, capacity=capacity, ttl=ttl, clock=clock)
+    return cache, clock
+
+
+def remember(cache, question, answer):
+    _, vector = cache.lookup(KEY, question)
+    cache.store(KEY, vector, answer)
+
+
+def test_similar_question_above_threshold_hits():
+    cache, _ = make_cache()
+    remember(cache, "закон Ома", "I = U / R")
+    assert cache.lookup(KEY, "що таке закон Ома")[0] == "I = U / R"
+    assert (cache.hits, cache.lookups) == (1, 2)
+
+
+def test_question_below_threshold_misses():
+    cache, _ = make_cache()
+    remember(cache, "закон Ома", "I = U / R")
+    answer, vector = cache.lookup(KEY, "закон Кулона")
+    assert answer is None and vector is not None
+    assert cache.lookup(("physics", False), "закон Ома")[0] is None
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache, clock = make_cache(capacity=2)
+    remember(cache, "закон Ома", "I = U / R")
+    clock.now += 1
+    remember(cache, "фотосинтез", "світло -> глюкоза")
+    clock.now += 1
+    assert cache.lookup(KEY, "закон Ома")[0] == "I = U / R"
+    clock.now += 1
+    remember(cache, "мітоз", "поділ клітини")
+
+    assert cache.evictions == 1
+    assert cache.lookup(KEY, "фотосинтез")[0] is None
+    assert cache.lookup(KEY, "закон Ома")[0] == "I = U / R"
+    assert cache.lookup(KEY, "мітоз")[0] == "поділ клітини"
+
+
+def test_expired_answer_misses_and_its_slot_is_reused_first():
+    cache, clock = make_cache(capacity=2, ttl=60)
+    remember(cache, "закон Ома", "I = U / R")
+    clock.now += 30
+    remember(cache, "фотосинтез", "світло -> глюкоза")
+    clock.now += 45
+    assert cache.lookup(KEY, "закон Ома")[0] is None
+
+    # Прострочений слот іде під нову відповідь раніше, ніж свіжий, хоч той і давніше використаний
+    remember(cache, "мітоз", "поділ клітини")
+    assert cache.lookup(KEY, "фотосинтез")[0] == "світло -> глюкоза"
+    assert cache.lookup(KEY, "мітоз")[0] == "поділ клітини"
+
+
+def test_ask_with_history_bypasses_semantic_cache(gemini_client, gemini_server):
+    embedder = StubEmbedder(VECTORS)
+    gemini_client.semantic = SemanticCache(embedder, threshold=0.9)
+    remember(gemini_client.semantic, "закон Ома", "Збережена відповідь")
+    embedder.calls = 0
+
+    assert "Збережена відповідь" in gemini_client.ask("що таке закон Ома", question="що таке закон Ома")
+    assert gemini_server.calls["generateContent"] == 0
+
+    history = [("а напруга?", "U = I * R")]
+    answer = gemini_client.ask("що таке закон Ома", history=history, question="що таке закон Ома")
+    assert "Збережена відповідь" not in answer
+    assert gemini_server.calls["generateContent"] == 1
+    # З історією питання навіть не рахується в ембедер
+    assert embedder.calls == 1
+    assert gemini_client.semantic.lookups == 2
@@ -0,0 +1,26 @@
+import asyncio
+from datetime import datetime
+
+from aiogram.types import Chat, Message
+
+import bot as bot_module
+from benchmarks.fake_telegram import BENCH_TOKEN, FakeSession, StubGeminiClient
+from sender import OutboundSender
+
+
+def test_loading_does_not_spend_chat_limit_with_sender():
+    async def scenario():
+        session = FakeSession()
+        sender = OutboundSender()
+        tg_bot = bot_module.TelegramBot(StubGeminiClient(), BENCH_TOKEN, session=session, sender=sender,
+                                        journal_file=None)
+        message = Message(message_id=1, date=datetime.now(), chat=Chat(id=42, type="private"),
+                          text="📆 Сьогодні").as_(tg_bot.bot)
+        await tg_bot.loading(message)
+        while sender.pending():
+            await asyncio.sleep(0.01)
+        assert dict(session.calls) == {"SendChatAction": 1}
+        # Ліміт чату лишається цілим для справжньої відповіді
+        assert sender.chats[42].bucket.tokens == sender.chats[42].bucket.capacity
+
+    asyncio.run(scenario())
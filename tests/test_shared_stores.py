@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+from notifier import SubscriptionStore
+from overrides import OverrideStore
+from ratelimit import Lockout, SharedLockout
+from shared_state import FakeRedis, SharedState
+
+
+def replicas(count=2):
+    # Один FakeRedis на кілька SharedState — як кілька реплік з одним Redis
+    redis = FakeRedis()
+    return [SharedState(redis) for _ in range(count)]
+
+
+def test_subscription_from_one_replica_reaches_the_leader(tmp_path):
+    async def scenario():
+        a, b = replicas()
+        follower = SubscriptionStore(str(tmp_path / "a.json"), shared=a)
+        leader = SubscriptionStore(str(tmp_path / "b.json"), shared=b)
+
+        await follower.set(1, "7-А", shift=2, remind=True)
+        await follower.set(2, "9-Б", digest=True)
+        assert await leader.refresh()
+        assert leader.reminders(2) == {"7-А": {1}}
+        assert leader.digests() == {"9-Б": {2}}
+
+        # Хто заблокував бота — прибирається для всіх реплік
+        await leader.remove([1])
+        await follower.refresh()
+        assert follower.get(1) is None
+        assert not (tmp_path / "a.json").exists()
+
+    asyncio.run(scenario())
+
+
+def test_local_subscriptions_are_seeded_once(tmp_path):
+    async def scenario():
+        path = tmp_path / "subs.json"
+        path.write_text(json.dumps({"5": {"class": "5-А", "shift": 1, "remind": True, "digest": False}}))
+        a, b = replicas()
+        await SubscriptionStore(str(path), shared=a).seed()
+        fresh = SubscriptionStore(str(tmp_path / "none.json"), shared=b)
+        await fresh.refresh()
+        assert fresh.get(5)["class"] == "5-А"
+
+    asyncio.run(scenario())
+
+
+def test_override_from_one_replica_is_visible_on_another(tmp_path):
+    async def scenario():
+        a, b = replicas()
+        first = OverrideStore(str(tmp_path / "a.jsonl"), shared=a)
+        second = OverrideStore(str(tmp_path / "b.jsonl"), shared=b)
+        tomorrow = date.today() + timedelta(days=1)
+
+        entry = await first.add({"date": tomorrow.isoformat(), "class": "9-Б", "lesson": 3, "subject": "ФІЗИКА"})
+        changed = await second.refresh()
+        assert [e["class"] for e in changed] == ["9-Б"]
+        assert second.get(tomorrow, "9-Б", 3)["subject"] == "ФІЗИКА"
+        assert await second.refresh() == []
+
+        assert await second.remove(entry["id"])
+        assert [e["id"] for e in await first.refresh()] == [entry["id"]]
+        assert first.get(tomorrow, "9-Б", 3) is None
+
+    asyncio.run(scenario())
+
+
+def test_password_lockout_is_shared_between_replicas():
+    async def scenario():
+        a, b = replicas()
+        policy = Lockout(free=3, base=30)
+        first, second = SharedLockout(a, local=policy), SharedLockout(b, local=policy)
+
+        assert await first.failure(42) == 0
+        assert await second.failure(42) == 0
+        assert await first.failure(42) == 0
+        # Четверта спроба, хоч і через іншу репліку, вже блокує
+        assert await second.failure(42) == 30
+        assert await first.wait(42) > 29
+        await first.success(42)
+        assert await second.wait(42) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,15 @@
+from benchmarks.bench_startup import IMPORT_BUDGET_MS, measure_import
+
+
+def test_import_main_fits_budget_without_heavy_modules():
+    """main імпортується до bind порту health server: aiogram і SDK Gemini мають вантажитися вже після"""
+    report = measure_import("main", repeats=3)
+    assert "error" not in report, report.get("error")
+    assert "aiogram" not in report["heavy"] and "google.genai" not in report["heavy"]
+    assert report["heavy"] == []
+    assert report["ms"] <= IMPORT_BUDGET_MS, report["top"]
+
+
+def test_heavy_modules_are_detected():
+    # Перевірка самої перевірки: bot тягне aiogram
+    assert "aiogram" in measure_import("bot", repeats=1)["heavy"]
@@ -0,0 +1,51 @@
+import asyncio
+
+from update_journal import UpdateJournal
+
+
+def claim_all(journal, ids):
+    async def scenario():
+        return [await journal.claim(update_id) for update_id in ids]
+
+    return asyncio.run(scenario())
+
+
+def test_duplicates_survive_restart(tmp_path):
+    path = str(tmp_path / "journal.json")
+    journal = UpdateJournal(path, size=4, bot_id=1)
+    assert claim_all(journal, range(100, 110)) == [True] * 10
+    journal.save()
+
+    restarted = UpdateJournal(path, size=4, bot_id=1)
+    assert claim_all(restarted, [105, 109, 110]) == [False, False, True]
+
+
+def test_random_restart_of_update_ids_resets_journal(tmp_path):
+    path = str(tmp_path / "journal.json")
+    journal = UpdateJournal(path, size=4, bot_id=1)
+    claim_all(journal, range(900_000, 900_020))
+    journal.save()
+
+    # Після тижня тиші Telegram почав з випадкового меншого id
+    restarted = UpdateJournal(path, size=4, bot_id=1)
+    assert claim_all(restarted, [1234, 1235, 1234]) == [True, True, False]
+    assert restarted.resets == 1
+    restarted.save()
+    assert claim_all(UpdateJournal(path, size=4, bot_id=1), [1236]) == [True]
+
+
+def test_journal_of_another_bot_is_ignored(tmp_path):
+    path = str(tmp_path / "journal.json")
+    journal = UpdateJournal(path, bot_id=1)
+    claim_all(journal, [1, 2, 3])
+    journal.save()
+    assert claim_all(UpdateJournal(path, bot_id=2), [1, 2, 3]) == [True, True, True]
+
+
+def test_memory_only_journal_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal = UpdateJournal(None, bot_id=1)
+    assert claim_all(journal, [1, 1]) == [True, False]
+    journal.save()
+    assert journal.start() is None
+    assert list(tmp_path.iterdir()) == []
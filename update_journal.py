@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+from aiogram import BaseMiddleware
+
+from config import UPDATE_BACKLOG_RATE, UPDATE_CLAIM_TTL, UPDATE_JOURNAL_FILE, UPDATE_JOURNAL_FLUSH, UPDATE_RECENT_SIZE
+from sender import TokenBucket
+
+
+class UpdateJournal(BaseMiddleware):
+    """Ідемпотентна обробка апдейтів: кожен update_id обробляється не більше одного разу, навіть після рестарту.
+
+    Стан — поріг (усі id до нього вже оброблені) і обмежена множина недавніх id над ним; на диск
+    пишеться атомарно раз на UPDATE_JOURNAL_FLUSH с. Апдейт позначається на вході, а не після
+    хендлера: краще загубити один апдейт при аварії, ніж двічі відправити розсилку.
+    З кількома репліками id додатково "захоплюється" в спільному сховищі (SET NX з TTL).
+
+    Апдейти, надіслані до старту (накопичені за час деплою), пропускаються через відро з
+    UPDATE_BACKLOG_RATE на секунду, щоб черга розсмоктувалась без сплеску навантаження.
+
+    Після тижня без апдейтів Bot API починає update_id з випадкового числа (у школи — кожного літа):
+    id, що впав набагато нижче порогу, означає новий відлік, і журнал скидається, а не відкидає все підряд.
+    Файл прив'язаний до id бота; filename=None — журнал лише в пам'яті (бенчмарки, тести).
+    """
+
+    def __init__(self, filename=UPDATE_JOURNAL_FILE, size=UPDATE_RECENT_SIZE, shared=None,
+                 backlog_rate=UPDATE_BACKLOG_RATE, bot_id=None):
+        self.filename = filename
+        self.bot_id = bot_id
+        self.size = size
+        self.shared = shared if shared is not None and shared.distributed else None
+        self.watermark = 0
+        self.recent = set()
+        self.started = datetime.now(timezone.utc)
+        self.backlog = TokenBucket(backlog_rate, backlog_rate)
+        self.duplicates = 0
+        self.replayed = 0
+        self.resets = 0
+        self.dirty = False
+        self.task = None
+        self._load()
+
+    def _load(self):
+        if self.filename is None:
+            return
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("bot") != self.bot_id:
+                # Журнал іншого бота (або до зміни токена) — його поріг до наших id не стосується
+                return
+            self.watermark = int(data.get("watermark", 0))
+            self.recent = {self.watermark + delta for delta in data.get("recent", [])}
+        except (FileNotFoundError, ValueError, TypeError):
+            pass
+
+    def snapshot(self):
+        """Стан для запису або None, якщо нічого не змінилось; знімається в event loop, пишеться в потоці"""
+        if not self.dirty:
+            return None
+        self.dirty = False
+        # Недавні id — різницями від порогу: короткі числа замість дев'ятизначних
+        return {"bot": self.bot_id, "watermark": self.watermark,
+                "recent": sorted(i - self.watermark for i in self.recent)}
+
+    def _write(self, data):
+        tmp = self.filename + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.filename)
+
+    def save(self):
+        if self.filename is None:
+            return
+        data = self.snapshot()
+        if data is not None:
+            self._write(data)
+
+    def seen(self, update_id: int) -> bool:
+        if update_id < self.watermark - self.size:
+            self.reset(update_id)
+            return False
+        return update_id <= self.watermark or update_id in self.recent
+
+    def reset(self, update_id: int):
+        """Telegram почав відлік заново: старий поріг відкидав би кожен новий апдейт"""
+        print(f"⚠️ update_id {update_id} набагато нижчий за поріг {self.watermark} — журнал апдейтів скинуто")
+        self.watermark = 0
+        self.recent = set()
+        self.dirty = True
+        self.resets += 1
+
+    def mark(self, update_id: int):
+        self.recent.add(update_id)
+        self.dirty = True
+        if len(self.recent) > self.size:
+            # id ростуть послідовно: старша половина множини згортається в поріг
+            ordered = sorted(self.recent)
+            half = len(ordered) // 2
+            self.watermark = max(self.watermark, ordered[half - 1])
+            self.recent = set(ordered[half:])
+
+    async def claim(self, update_id: int) -> bool:
+        """True, якщо апдейт ще ніхто не обробляв і тепер він наш"""
+        if self.seen(update_id):
+            return False
+        if self.shared and not await self.shared.claim(f"update:{update_id}", UPDATE_CLAIM_TTL):
+            # Інша репліка вже взяла (повтор вебхука) — запам'ятовуємо, щоб не питати знову
+            self.mark(update_id)
+            return False
+        self.mark(update_id)
+        return True
+
+    def _sent_before_start(self, update):
+        message = update.message or update.edited_message or update.channel_post
+        return message is not None and message.date < self.started
+
+    async def __call__(self, handler, event, data):
+        if not await self.claim(event.update_id):
+            self.duplicates += 1
+            return None
+        if self._sent_before_start(event):
+            self.replayed += 1
+            await self.backlog.acquire()
+        return await handler(event, data)
+
+    def start(self):
+        if self.task is None and self.filename is not None:
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(UPDATE_JOURNAL_FLUSH)
+            data = self.snapshot()
+            if data is None:
+                continue
+            try:
+                await asyncio.to_thread(self._write, data)
+            except Exception as e:
+                self.dirty = True
+                print(f"⚠️ Журнал апдейтів: {e}")
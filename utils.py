@@ -1,20 +1,25 @@
 import asyncio
+import html
+import logging
 import re
 from aiogram.types import Message
 from aiogram.enums import ParseMode
-from config import LOADING_FRAMES, LOADING_ICON
+from aiogram.exceptions import TelegramBadRequest
+from config import LOADING_FRAMES, LOADING_ICON, LOADING_FRAME_DELAY, MAX_LEN
+
+log = logging.getLogger("norm_ai")
 
 async def loading_animation(message: Message, text="Завантаження"):
     try:
         msg = await message.answer(f"{LOADING_ICON} {text}...")
         for _ in range(2):
             for frame in LOADING_FRAMES:
-                await asyncio.sleep(0.2)
+                await asyncio.sleep(LOADING_FRAME_DELAY)
                 try:
                     await msg.edit_text(f"{frame} {text}...")
                 except:
                     pass
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(LOADING_FRAME_DELAY / 2)
         try:
             await msg.delete()
         except:
@@ -22,60 +27,212 @@ async def loading_animation(message: Message, text="Завантаження"):
     except:
         pass
 
-def split_chunks(text: str, size: int = 3900):
-    text = text or ""
-    for i in range(0, len(text), size):
-        yield text[i:i + size]
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_MD_ESCAPE = str.maketrans({c: f"\\{c}" for c in "_*[]()~`>#+-=|{}.!"})
+
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$")
+_BULLET_RE = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_QUOTE_RE = re.compile(r"^\s*>\s?(.*)$")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_INLINE_RE = re.compile(
+    r"(?P<tick>`+)(?P<code>.+?)(?P=tick)"
+    r"|\*\*\*(?P<bold_italic>.+?)\*\*\*"
+    r"|___(?P<bold_italic2>.+?)___"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>.+?)__"
+    r"|~~(?P<strike>.+?)~~"
+    r"|\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>https?://[^)\s]+)\)"
+    r"|(?<![\w*])\*(?![\s*])(?P<italic>.+?)(?<![\s*])\*(?![\w*])"
+    r"|(?<![\w_])_(?![\s_])(?P<italic2>.+?)(?<![\s_])_(?![\w_])"
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+_ATOM_RE = re.compile(r"<[^>]+>|&(?:[a-zA-Z]+|#\d+);|\n+|[^\S\n]+|[^\s<&]+|[<&]")
+
+
+def escape_html(text: str) -> str:
+    return (text or "").translate(_HTML_ESCAPE)
+
+
+def strip_html(text: str) -> str:
+    return html.unescape(_TAG_RE.sub("", text or ""))
+
 
 def escape_markdown(text: str) -> str:
-    """Екранує спеціальні символи для Telegram Markdown"""
+    """Екранує спеціальні символи для Telegram MarkdownV2 за один прохід"""
     if not text:
         return ""
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-    for char in special_chars:
-        text = text.replace(char, f'\\{char}')
-    return text
+    return text.translate(_MD_ESCAPE)
+
+
+def _inline(text: str) -> str:
+    out = []
+    pos = 0
+    for m in _INLINE_RE.finditer(text):
+        out.append(escape_html(text[pos:m.start()]))
+        pos = m.end()
+        if m.group("code") is not None:
+            out.append(f"<code>{escape_html(m.group('code'))}</code>")
+        elif m.group("bold_italic") is not None or m.group("bold_italic2") is not None:
+            out.append(f"<b><i>{_inline(m.group('bold_italic') or m.group('bold_italic2'))}</i></b>")
+        elif m.group("bold") is not None or m.group("bold2") is not None:
+            out.append(f"<b>{_inline(m.group('bold') or m.group('bold2'))}</b>")
+        elif m.group("strike") is not None:
+            out.append(f"<s>{_inline(m.group('strike'))}</s>")
+        elif m.group("link_url") is not None:
+            url = escape_html(m.group("link_url")).replace('"', "&quot;")
+            out.append(f'<a href="{url}">{_inline(m.group("link_text"))}</a>')
+        else:
+            out.append(f"<i>{_inline(m.group('italic') or m.group('italic2'))}</i>")
+    out.append(escape_html(text[pos:]))
+    return "".join(out)
+
+
+def _code_block(lines, lang):
+    body = escape_html("\n".join(lines))
+    if lang:
+        return f'<pre><code class="language-{escape_html(lang.split()[0])}">{body}</code></pre>'
+    return f"<pre>{body}</pre>"
+
 
 def format_ai_response(text: str) -> str:
-    """Форматує відповідь AI для красивого виведення"""
+    """Перетворює markdown відповіді AI на валідний Telegram HTML за один прохід по рядках"""
     if not text:
         return ""
-    
-    lines = text.split('\n')
+
     formatted_lines = []
-    
-    for line in lines:
-        if line.startswith('# '):
-            formatted_lines.append(f"*{line[2:]}*")
-        elif line.startswith('## '):
-            formatted_lines.append(f"*{line[3:]}*")
-        elif line.startswith('### '):
-            formatted_lines.append(f"*{line[4:]}*")
-        elif line.startswith('- ') or line.startswith('* '):
-            formatted_lines.append(f"• {line[2:]}")
-        elif re.match(r'^\d+\. ', line):
-            parts = line.split('. ', 1)
-            if len(parts) == 2:
-                formatted_lines.append(f"{parts[0]}\\. {parts[1]}")
+    code_lines = None
+    code_lang = ""
+
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if code_lines is None:
+                code_lines, code_lang = [], stripped[3:].strip()
             else:
-                formatted_lines.append(line)
-        elif '**' in line:
-            formatted_lines.append(line.replace('**', '*'))
+                formatted_lines.append(_code_block(code_lines, code_lang))
+                code_lines = None
+            continue
+        if code_lines is not None:
+            code_lines.append(line)
+            continue
+
+        heading = _HEADING_RE.match(line)
+        bullet = _BULLET_RE.match(line)
+        quote = _QUOTE_RE.match(line)
+        if heading:
+            formatted_lines.append(f"<b>{_inline(heading.group(1).replace('**', ''))}</b>")
+        elif _RULE_RE.match(line):
+            formatted_lines.append("———")
+        elif bullet:
+            formatted_lines.append(f"{bullet.group(1)}• {_inline(bullet.group(2))}")
+        elif quote:
+            formatted_lines.append(f"<i>{_inline(quote.group(1))}</i>")
         else:
-            formatted_lines.append(line)
-    
+            formatted_lines.append(_inline(line))
+
+    # Незакритий блок коду (обрізана відповідь) — все одно закриваємо
+    if code_lines is not None:
+        formatted_lines.append(_code_block(code_lines, code_lang))
+
     return '\n'.join(formatted_lines)
 
+
+def split_chunks(text: str, size: int = MAX_LEN):
+    """Ріже текст на шматки ≤ size по рядках і словах, не розриваючи HTML-теги й сутності.
+
+    Відкриті на межі теги закриваються в кінці шматка й відкриваються знову на початку наступного.
+    """
+    text = text or ""
+    if len(text) <= size:
+        if text:
+            yield text
+        return
+
+    # stack — відкриті теги (назва, відкриваючий тег, довжина закриваючого)
+    stack = []
+    close_len = 0
+    parts = []
+    length = 0
+    base = 0
+    newline_at = None
+
+    def closing(tags):
+        return "".join(f"</{name}>" for name, _, _ in reversed(tags))
+
+    def opening(tags):
+        return "".join(tag for _, tag, _ in tags)
+
+    def atoms():
+        step = max(size // 2, 1)
+        for atom in _ATOM_RE.findall(text):
+            # Одне "слово", довше за шматок, доводиться різати
+            if len(atom) > step and atom[0] not in "<&":
+                for i in range(0, len(atom), step):
+                    yield atom[i:i + step]
+            else:
+                yield atom
+
+    for atom in atoms():
+        after = stack
+        after_close = close_len
+        if atom[0] == "<" and len(atom) > 1:
+            if atom[1] == "/":
+                name = atom[2:-1].strip().lower()
+                if stack and stack[-1][0] == name:
+                    after = stack[:-1]
+                    after_close -= stack[-1][2]
+            else:
+                name = atom[1:-1].split()[0].lower().rstrip("/")
+                after = stack + [(name, atom, len(name) + 3)]
+                after_close += len(name) + 3
+
+        if length + len(atom) + after_close > size and length > base:
+            if newline_at and newline_at[1] > size // 2:
+                index, _, tags = newline_at
+                yield "".join(parts[:index]) + closing(tags)
+                parts = [opening(tags)] + parts[index + 1:]
+            else:
+                yield "".join(parts) + closing(stack)
+                parts = [opening(stack)]
+                if atom.isspace():
+                    length = base = len(parts[0])
+                    newline_at = None
+                    continue
+            base = len(parts[0])
+            length = sum(len(p) for p in parts)
+            newline_at = None
+
+        if atom[0] == "\n":
+            newline_at = (len(parts), length, stack)
+        parts.append(atom)
+        length += len(atom)
+        stack = after
+        close_len = after_close
+
+    rest = "".join(parts)
+    if rest.strip():
+        yield rest
+
+
 async def safe_send(message: Message, text: str, reply_markup=None, parse_mode=None):
-    """Безпечна відправка з підтримкою маркдауну"""
+    """Безпечна відправка з підтримкою розмітки"""
     try:
         if parse_mode:
             await message.answer(text, reply_markup=reply_markup, parse_mode=parse_mode)
         else:
             await message.answer(text, reply_markup=reply_markup)
     except Exception as e:
+        if isinstance(e, TelegramBadRequest) and parse_mode and "parse" in str(e).lower():
+            # Telegram не розібрав розмітку — той самий текст без неї
+            if parse_mode == ParseMode.HTML:
+                fallback = strip_html(text)[:4000]
+            else:
+                fallback = re.sub(r'[*_`\\[\\]()~>#+=|{}.!-]', '', text)[:4000]
+        else:
+            # Інша помилка: текст не повторюємо (він міг і дійти), але користувач не лишається без відповіді
+            log.warning("Помилка відправки в чат %s: %s", message.chat.id, e)
+            fallback = "❌ Помилка відправки"
         try:
-            clean_text = re.sub(r'[*_`\\[\\]()~>#+=|{}.!-]', '', text)
-            await message.answer(clean_text[:4000], reply_markup=reply_markup)
-        except:
-            await message.answer("❌ Помилка відправки", reply_markup=reply_markup)
\ No newline at end of file
+            await message.answer(fallback, reply_markup=reply_markup)
+        except Exception as e:
+            log.warning("Запасна відповідь у чат %s теж не пішла: %s", message.chat.id, e)
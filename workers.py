@@ -0,0 +1,85 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import MAX_LEN, OFFLOAD_MIN_CHARS, WORKER_PROCESSES
+from utils import format_ai_response, split_chunks
+
+
+# Функції для воркерів: лише модульні, з компактними аргументами (рядок і числа), щоб pickle був дешевим
+
+def format_text(text: str) -> str:
+    return format_ai_response(text)
+
+
+def split_text(text: str, size: int = MAX_LEN):
+    return list(split_chunks(text, size))
+
+
+def format_and_split(text: str, size: int = MAX_LEN):
+    return list(split_chunks(format_ai_response(text), size))
+
+
+def _warmup():
+    return True
+
+
+class WorkerPool:
+    """Необов'язковий пул процесів для CPU-важких етапів: великі payload-и — у воркер, дрібні — на місці.
+
+    Поріг за розміром (OFFLOAD_MIN_CHARS) підбирається benchmarks/bench_workers.py: нижче нього
+    передача в процес коштує дорожче за саму роботу.
+    """
+
+    def __init__(self, processes=WORKER_PROCESSES, threshold=OFFLOAD_MIN_CHARS):
+        self.processes = processes
+        self.threshold = threshold
+        self._executor = None
+        self.offloaded = 0
+        self.inline = 0
+
+    @property
+    def enabled(self):
+        return self.processes > 0
+
+    def executor(self):
+        if self._executor is None and self.enabled:
+            # spawn, а не fork: форк процесу з працюючим event loop і потоками небезпечний
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def offload(self, size: int) -> bool:
+        return self.enabled and size >= self.threshold
+
+    def call(self, fn, *args, size=0):
+        """Синхронний виклик — для коду, що вже працює в потоці (GeminiClient.ask)"""
+        if not self.offload(size):
+            self.inline += 1
+            return fn(*args)
+        self.offloaded += 1
+        return self.executor().submit(fn, *args).result()
+
+    async def run(self, fn, *args, size=0):
+        if not self.offload(size):
+            self.inline += 1
+            return fn(*args)
+        self.offloaded += 1
+        return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+
+    async def warmup(self):
+        """Піднімає процеси заздалегідь, щоб перший великий запит не чекав на spawn"""
+        if not self.enabled:
+            return 0.0
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor(), _warmup) for _ in range(self.processes)))
+        return time.perf_counter() - started
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+POOL = WorkerPool()